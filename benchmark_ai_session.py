@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+قياس أداء جلسة HTTP المشتركة لمزودي الذكاء الاصطناعي
+يقارن زمن الطلب الواحد بين جلسة جديدة لكل طلب (السلوك القديم) والجلسة المشتركة في AIService
+مقابل خادم HTTP محلي يحاكي استجابة OpenAI
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import aiohttp
+from aiohttp import web
+from config import Config
+from services.ai_service import AIService
+
+CALLS = 200
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+
+STUB_RESPONSE = {
+    "choices": [{
+        "message": {
+            "content": json.dumps({
+                "المنطقة": "احياء تجمع",
+                "نوع الوحدة": "شقة",
+                "حالة الوحدة": "تمليك"
+            }, ensure_ascii=False)
+        }
+    }]
+}
+
+async def stub_completion(request: web.Request) -> web.Response:
+    """محاكاة نقطة chat/completions"""
+    await request.json()
+    return web.json_response(STUB_RESPONSE)
+
+async def start_stub_server() -> web.AppRunner:
+    """تشغيل الخادم المحلي"""
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stub_completion)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    return runner
+
+async def call_with_new_session(url: str, payload: dict) -> float:
+    """طلب بجلسة جديدة (DNS + TCP لكل طلب)"""
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=payload) as response:
+            await response.json()
+    return time.perf_counter() - started
+
+async def call_with_pooled_session(ai_service: AIService, url: str, payload: dict) -> float:
+    """طلب عبر الجلسة المشتركة (إعادة استخدام الاتصال)"""
+    started = time.perf_counter()
+    session = await ai_service._get_session()
+    async with session.post(url, json=payload) as response:
+        await response.json()
+    return time.perf_counter() - started
+
+def print_results(label: str, latencies: list):
+    """طباعة ملخص الأزمنة بالمللي ثانية"""
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<20} mean={statistics.mean(ordered) * 1000:7.2f}ms "
+          f"p50={statistics.median(ordered) * 1000:7.2f}ms p95={p95 * 1000:7.2f}ms")
+
+async def main():
+    """الدالة الرئيسية"""
+    print(f"📊 قياس زمن الطلب لمزودي الذكاء الاصطناعي ({CALLS} طلب)")
+    print("=" * 60)
+
+    runner = await start_stub_server()
+    url = f"http://{STUB_HOST}:{STUB_PORT}/v1/chat/completions"
+    payload = {"messages": [{"role": "user", "content": "نص تجريبي"}]}
+
+    ai_service = AIService(Config())
+    await ai_service.start()
+
+    try:
+        # تسخين
+        await call_with_new_session(url, payload)
+        await call_with_pooled_session(ai_service, url, payload)
+
+        new_session = [await call_with_new_session(url, payload) for _ in range(CALLS)]
+        pooled = [await call_with_pooled_session(ai_service, url, payload) for _ in range(CALLS)]
+
+        print_results("جلسة لكل طلب", new_session)
+        print_results("جلسة مشتركة", pooled)
+        print(f"⚡ التحسن: {statistics.mean(new_session) / statistics.mean(pooled):.1f}x")
+    finally:
+        await ai_service.close()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
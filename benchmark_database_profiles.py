@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+قياس سرعة الكتابة لكل ملف إعدادات أداء في قاعدة البيانات المحلية
+يحفظ العقارات ويسجل خطوات المعالجة كمعاملة مستقلة لكل عملية (كما يفعل المعالج)
+على قاعدة بيانات مؤقتة
+"""
+
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+from models.property import PropertyData, PropertyStatus
+from utils.database import DatabaseManager
+
+INSERTS = 2_000
+
+def make_property(message_id: int) -> PropertyData:
+    """إنشاء عقار معلق تجريبي"""
+    property_data = PropertyData()
+    property_data.telegram_message_id = message_id
+    property_data.raw_text = f"شقة للبيع في التجمع الخامس مساحة {100 + message_id % 200} متر"
+    property_data.status = PropertyStatus.PENDING
+    return property_data
+
+async def run(profile: str) -> float:
+    """تشغيل الكتابة على قاعدة بيانات مؤقتة بملف الإعدادات المحدد"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = DatabaseManager(str(Path(tmp) / "benchmark.db"), profile)
+        await database.initialize()
+        journal_mode = (await database.get_pragma_settings())["journal_mode"]
+
+        started = time.perf_counter()
+        for message_id in range(1, INSERTS + 1):
+            property_id = await database.save_property(make_property(message_id))
+            await database.log_processing_step(property_id, "receive", "success")
+        elapsed = time.perf_counter() - started
+
+        await database.close()
+
+    rate = INSERTS * 2 / elapsed
+    print(f"{profile:<12} journal={journal_mode:<7} {elapsed:7.2f}s  {rate:9.0f} إدراج/ثانية")
+    return rate
+
+async def main():
+    """الدالة الرئيسية"""
+    # إخفاء سجلات الحفظ لكل عقار
+    logging.disable(logging.INFO)
+
+    print(f"📊 قياس {INSERTS} عقار + {INSERTS} سجل معالجة لكل ملف إعدادات")
+    print("=" * 60)
+
+    rates = {profile: await run(profile) for profile in DatabaseManager.PRAGMA_PROFILES}
+    print(f"⚡ التحسن (performance مقابل default): {rates['performance'] / rates['default']:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+قياس زمن وذاكرة مسح قوائم العقارات من قاعدة البيانات المحلية
+يقارن SELECT * مع PropertyData كاملة لكل صف (السلوك القديم)
+بإسقاط أعمدة العرض مع عروض PropertyRow الخفيفة
+على قاعدة بيانات مؤقتة
+"""
+
+import asyncio
+import json
+import logging
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from utils.database import DatabaseManager
+
+ROWS = 100_000
+
+def fill(connection):
+    """إدراج عقارات تجريبية بنص خام وتفاصيل ورسائل خطأ بأحجام واقعية"""
+    connection.executemany(
+        """
+        INSERT INTO properties (
+            telegram_message_id, region, unit_type, owner_name, price, statement,
+            status, raw_text, full_details, error_messages, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now', ?))
+        """,
+        (
+            (
+                i, f"منطقة {i % 50}", "شقة", f"مالك {i}", str(1_000_000 + i),
+                f"شقة للبيع في منطقة {i % 50}", "قيد المعالجة",
+                "شقة للبيع في التجمع الخامس " * 40,
+                "تفاصيل كاملة للوحدة " * 25,
+                json.dumps([f"خطأ في المحاولة {n}" for n in range(3)], ensure_ascii=False),
+                f"-{i} seconds"
+            )
+            for i in range(ROWS)
+        )
+    )
+
+async def read_listing(list_properties) -> list:
+    """تحميل القائمة وقراءة حقول العرض لكل عقار"""
+    properties = await list_properties()
+    return [(p.telegram_message_id, p.region, p.status.value, p.created_at.isoformat()) for p in properties]
+
+async def scan(label: str, list_properties) -> float:
+    """قياس الزمن ثم ذروة الذاكرة (في تشغيل منفصل لأن tracemalloc يبطئ التنفيذ)"""
+    started = time.perf_counter()
+    rows = await read_listing(list_properties)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    await read_listing(list_properties)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<22} {elapsed:7.2f}s  ذروة الذاكرة={peak / 1024 / 1024:7.1f}MB  (صفوف={len(rows)})")
+    return elapsed
+
+async def main():
+    """الدالة الرئيسية"""
+    # إخفاء سجلات التهيئة والإغلاق
+    logging.disable(logging.INFO)
+
+    print(f"📊 قياس مسح {ROWS} عقار معلق")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = DatabaseManager(str(Path(tmp) / "benchmark.db"))
+        await database.initialize()
+        await database.writer.submit(fill)
+
+        before = await scan("SELECT * + PropertyData", lambda: database.get_pending_properties())
+        after = await scan(
+            "إسقاط + PropertyRow",
+            lambda: database.get_pending_properties(columns=DatabaseManager.LISTING_COLUMNS)
+        )
+        print(f"⚡ التحسن: {before / after:.1f}x")
+
+        await database.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
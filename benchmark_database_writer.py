@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+قياس سرعة الكتابة المتزامنة في قاعدة البيانات المحلية
+يقارن اتصالاً مشتركاً مع asyncio.to_thread لكل عبارة (السلوك القديم)
+بخيط الكتابة المخصص الذي يجمع الكتابات المنتظرة في معاملة واحدة
+على قاعدة بيانات مؤقتة لكل ملف إعدادات
+"""
+
+import asyncio
+import logging
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from utils.database import DatabaseManager
+
+WORKERS = 8
+WRITES_PER_WORKER = 500
+PROFILES = ("default", "performance")
+
+LOG_SQL = """
+INSERT INTO processing_log (property_id, operation, status, details)
+VALUES (?, ?, ?, ?)
+"""
+
+async def run_shared_connection(db_path: Path, profile: str) -> tuple:
+    """السلوك القديم: اتصال autocommit مشترك وكل عبارة معاملة مستقلة"""
+
+    # إنشاء الجداول ثم فتح اتصال مشترك بنفس الإعدادات
+    database = DatabaseManager(str(db_path), profile)
+    await database.initialize()
+    await database.close()
+
+    connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    database._apply_pragmas(connection)
+
+    async def worker(worker_id: int):
+        for i in range(WRITES_PER_WORKER):
+            await asyncio.to_thread(connection.execute, LOG_SQL, (worker_id, "receive", "success", str(i)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(WORKERS)))
+    elapsed = time.perf_counter() - started
+
+    connection.close()
+    return elapsed, WORKERS * WRITES_PER_WORKER
+
+async def run_writer_thread(db_path: Path, profile: str) -> tuple:
+    """السلوك الجديد: خيط كتابة واحد يثبت الكتابات المنتظرة معاً"""
+
+    database = DatabaseManager(str(db_path), profile)
+    await database.initialize()
+
+    async def worker(worker_id: int):
+        for i in range(WRITES_PER_WORKER):
+            await database.log_processing_step(worker_id, "receive", "success", str(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(WORKERS)))
+    elapsed = time.perf_counter() - started
+
+    transactions = database.writer.transactions
+    await database.close()
+    return elapsed, transactions
+
+async def run(label: str, scenario, profile: str) -> float:
+    """تشغيل سيناريو على قاعدة بيانات مؤقتة جديدة"""
+    with tempfile.TemporaryDirectory() as tmp:
+        elapsed, transactions = await scenario(Path(tmp) / "benchmark.db", profile)
+
+    rate = WORKERS * WRITES_PER_WORKER / elapsed
+    print(f"{profile:<12} {label:<16} {elapsed:7.2f}s  {rate:9.0f} كتابة/ثانية  (معاملات={transactions})")
+    return rate
+
+async def main():
+    """الدالة الرئيسية"""
+    # إخفاء سجلات التهيئة والإغلاق
+    logging.disable(logging.INFO)
+
+    print(f"📊 قياس {WORKERS} عمال × {WRITES_PER_WORKER} كتابة متزامنة")
+    print("=" * 60)
+
+    for profile in PROFILES:
+        before = await run("اتصال مشترك", run_shared_connection, profile)
+        after = await run("خيط كتابة", run_writer_thread, profile)
+        print(f"⚡ التحسن ({profile}): {after / before:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+قياس أداء استلام رسائل Telegram في قاعدة البيانات المحلية
+يقارن الفحص والإدراج رسالة برسالة (السلوك القديم) بالفحص الجماعي والإدراج في معاملة واحدة
+على قاعدة بيانات مؤقتة
+"""
+
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+from models.property import PropertyData, PropertyStatus
+from utils.database import DatabaseManager
+
+MESSAGES = 10_000
+BATCH_SIZE = 100  # حد getUpdates
+
+def make_batches(first_id: int):
+    """توليد رسائل تجريبية على دفعات"""
+    messages = [
+        {"message_id": first_id + i, "text": f"شقة للبيع في التجمع الخامس مساحة {100 + i % 200} متر"}
+        for i in range(MESSAGES)
+    ]
+    return [messages[i:i + BATCH_SIZE] for i in range(0, MESSAGES, BATCH_SIZE)]
+
+def make_property(message: dict) -> PropertyData:
+    """إنشاء عقار معلق من رسالة"""
+    property_data = PropertyData()
+    property_data.telegram_message_id = message["message_id"]
+    property_data.raw_text = message["text"]
+    property_data.status = PropertyStatus.PENDING
+    return property_data
+
+async def ingest_per_message(database: DatabaseManager, batches) -> int:
+    """السلوك القديم: استعلام وإدراج لكل رسالة"""
+    saved = 0
+    for batch in batches:
+        for message in batch:
+            existing = await database.get_property_by_telegram_id(message["message_id"])
+            if not existing:
+                await database.save_property(make_property(message))
+                saved += 1
+    return saved
+
+async def ingest_bulk(database: DatabaseManager, batches) -> int:
+    """السلوك الجديد: استعلام IN واحد وإدراج جماعي لكل دفعة"""
+    saved = 0
+    for batch in batches:
+        existing_ids = await database.get_existing_telegram_ids([m["message_id"] for m in batch])
+        new_properties = [make_property(m) for m in batch if m["message_id"] not in existing_ids]
+        saved += len(await database.save_properties_bulk(new_properties))
+    return saved
+
+async def run(label: str, ingest, first_id: int) -> float:
+    """تشغيل سيناريو على قاعدة بيانات مؤقتة جديدة"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database = DatabaseManager(str(Path(tmp) / "benchmark.db"))
+        await database.initialize()
+        batches = make_batches(first_id)
+
+        started = time.perf_counter()
+        saved = await ingest(database, batches)
+        elapsed = time.perf_counter() - started
+
+        # إعادة الاستلام للتأكد من تجاهل المكرر
+        duplicates = await ingest(database, batches)
+        await database.close()
+
+    print(f"{label:<20} {elapsed:7.2f}s  {saved / elapsed:9.0f} رسالة/ثانية  (محفوظ={saved}, مكرر محفوظ={duplicates})")
+    return elapsed
+
+async def main():
+    """الدالة الرئيسية"""
+    # إخفاء سجلات الحفظ لكل عقار
+    logging.disable(logging.INFO)
+
+    print(f"📊 قياس استلام {MESSAGES} رسالة على دفعات من {BATCH_SIZE}")
+    print("=" * 60)
+
+    before = await run("رسالة برسالة", ingest_per_message, 1)
+    after = await run("دفعة واحدة", ingest_bulk, 1)
+    print(f"⚡ التحسن: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+قياس عدد طلبات Notion البعيدة لكل نوع تصنيف (جديد / متعدد / مكرر)
+مقابل خادم محلي يحاكي Notion، بنفس تسلسل الاستدعاءات في PropertyProcessor
+"""
+
+import asyncio
+import itertools
+import logging
+from datetime import datetime, timezone
+from aiohttp import web
+from services.notion_service import NotionService
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8767
+BASE_URL = f"http://{STUB_HOST}:{STUB_PORT}"
+
+LISTING = {
+    "البيان": "شقة للبيع",
+    "المنطقة": "احياء تجمع",
+    "نوع الوحدة": "شقة",
+    "حالة الوحدة": "تمليك",
+    "المساحة": "150",
+    "الدور": "3",
+    "السعر": "2500000",
+    "رقم المالك": "01012345678",
+    "اسم المالك": "أحمد",
+    "تفاصيل كاملة": "شقة 150 متر الدور الثالث"
+}
+
+class FakeNotion:
+    """خادم Notion وهمي يحفظ الصفحات في الذاكرة"""
+    
+    def __init__(self):
+        self.pages = {}
+        self.ids = itertools.count(1)
+    
+    def _page(self, parent: str, properties: dict) -> dict:
+        page_id = f"00000000-0000-0000-0000-{next(self.ids):012d}"
+        page = {
+            "object": "page",
+            "id": page_id,
+            "parent": {"database_id": parent},
+            "properties": properties,
+            "last_edited_time": datetime.now(timezone.utc).isoformat()
+        }
+        self.pages[page_id] = page
+        return page
+    
+    async def query(self, request: web.Request) -> web.Response:
+        """databases.query (بدون تطبيق الفلاتر)"""
+        database_id = request.match_info["database_id"]
+        results = [p for p in self.pages.values() if p["parent"]["database_id"] == database_id]
+        return web.json_response({"object": "list", "results": results, "has_more": False, "next_cursor": None})
+    
+    async def create(self, request: web.Request) -> web.Response:
+        """pages.create"""
+        body = await request.json()
+        return web.json_response(self._page(body["parent"]["database_id"], body["properties"]))
+    
+    async def update(self, request: web.Request) -> web.Response:
+        """pages.update"""
+        body = await request.json()
+        page = self.pages[request.match_info["page_id"]]
+        page["properties"].update(body.get("properties", {}))
+        return web.json_response(page)
+    
+    async def append(self, request: web.Request) -> web.Response:
+        """blocks.children.append"""
+        await request.read()
+        return web.json_response({"object": "list", "results": []})
+
+async def start_server(fake: FakeNotion) -> web.AppRunner:
+    """تشغيل الخادم المحلي"""
+    app = web.Application()
+    app.router.add_post("/v1/databases/{database_id}/query", fake.query)
+    app.router.add_post("/v1/pages", fake.create)
+    app.router.add_patch("/v1/pages/{page_id}", fake.update)
+    app.router.add_patch("/v1/blocks/{block_id}/children", fake.append)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    return runner
+
+async def classify(notion: NotionService, listing: dict) -> str:
+    """التصنيف كما في _classify_property_via_notion"""
+    duplicates = await notion.find_duplicate_properties(
+        listing["رقم المالك"], listing["المنطقة"], listing["نوع الوحدة"],
+        listing["حالة الوحدة"], listing["المساحة"], listing["الدور"]
+    )
+    if duplicates:
+        return "عقار مكرر"
+    if await notion.find_owner_properties(listing["رقم المالك"]):
+        return "عقار متعدد"
+    return "عقار جديد"
+
+async def process(notion: NotionService, listing: dict, classification: str):
+    """خطوات Notion لكل تصنيف كما في PropertyProcessor"""
+    if classification == "عقار جديد":
+        await notion.create_owner_and_property(listing)
+    elif classification == "عقار متعدد":
+        owner = await notion.search_owner(listing["رقم المالك"])
+        await notion.create_property_page(listing, owner["id"])
+        await notion.update_owner_properties_count(owner["id"])
+    else:
+        await notion.find_duplicate_properties(
+            listing["رقم المالك"], listing["المنطقة"], listing["نوع الوحدة"],
+            listing["حالة الوحدة"], listing["المساحة"], listing["الدور"]
+        )
+
+async def main():
+    """الدالة الرئيسية"""
+    logging.disable(logging.INFO)
+    
+    fake = FakeNotion()
+    runner = await start_server(fake)
+    notion = NotionService("secret", "properties", "owners", rate_limit=100, rate_burst=100, base_url=BASE_URL)
+    
+    print("📊 طلبات Notion البعيدة لكل تصنيف")
+    print("=" * 60)
+    
+    try:
+        await notion.sync_mirror(force=True)
+        
+        # جديد ثم مكرر (نفس الإعلان) ثم متعدد (نفس المالك بمساحة مختلفة)
+        scenarios = [LISTING, LISTING, {**LISTING, "المساحة": "200"}]
+        for listing in scenarios:
+            before = dict(notion.request_counts)
+            classification = await classify(notion, listing)
+            await process(notion, listing, classification)
+            
+            calls = {
+                name: count - before.get(name, 0)
+                for name, count in notion.request_counts.items()
+                if count - before.get(name, 0)
+            }
+            details = ", ".join(f"{name}={count}" for name, count in calls.items()) or "-"
+            print(f"{classification:<12} {sum(calls.values())} طلب  ({details})")
+    finally:
+        await notion.close()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
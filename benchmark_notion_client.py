@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+اختبار حمل لعميل Notion مقابل خادم محلي يحاكي Notion بحد 3 طلبات/ثانية
+يقارن العميل المتزامن داخل asyncio.to_thread (السلوك القديم) بالعميل غير المتزامن
+مع دلو الرموز ومعالجة Retry-After في NotionService
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from aiohttp import web
+from notion_client import Client
+from services.notion_service import NotionService
+from utils.rate_limiter import TokenBucket
+
+REQUESTS = 60
+SERVER_RATE = 3.0  # حد Notion المعلن
+SERVER_BURST = 3
+RESPONSE_LATENCY = 0.2  # زمن استجابة Notion التقريبي
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8766
+BASE_URL = f"http://{STUB_HOST}:{STUB_PORT}"
+
+class FakeNotion:
+    """خادم Notion وهمي يرد 429 مع Retry-After عند تجاوز الحد"""
+    
+    def __init__(self):
+        self.tokens = float(SERVER_BURST)
+        self.updated = time.monotonic()
+        self.accepted = 0
+        self.rejected = 0
+    
+    async def query(self, request: web.Request) -> web.Response:
+        """محاكاة databases.query"""
+        await request.read()
+        await asyncio.sleep(RESPONSE_LATENCY)
+        
+        now = time.monotonic()
+        self.tokens = min(SERVER_BURST, self.tokens + (now - self.updated) * SERVER_RATE)
+        self.updated = now
+        
+        if self.tokens < 1:
+            self.rejected += 1
+            return web.json_response(
+                {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+                status=429,
+                headers={"Retry-After": "1"}
+            )
+        
+        self.tokens -= 1
+        self.accepted += 1
+        return web.json_response({"object": "list", "results": [], "has_more": False, "next_cursor": None})
+
+async def start_server(fake: FakeNotion) -> web.AppRunner:
+    """تشغيل الخادم المحلي"""
+    app = web.Application()
+    app.router.add_post("/v1/databases/{database_id}/query", fake.query)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    return runner
+
+async def sample_threads(peak: list, stop: asyncio.Event):
+    """رصد أقصى عدد خيوط أثناء الاختبار"""
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.05)
+
+async def run(label: str, make_call):
+    """تشغيل REQUESTS طلب متزامن وطباعة المعدل"""
+    fake = FakeNotion()
+    runner = await start_server(fake)
+    peak, stop = [threading.active_count()], asyncio.Event()
+    sampler = asyncio.create_task(sample_threads(peak, stop))
+    
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(make_call() for _ in range(REQUESTS)), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+    finally:
+        stop.set()
+        await sampler
+        await runner.cleanup()
+    
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    print(
+        f"{label:<26} {elapsed:6.1f}s  ناجح={REQUESTS - failed:3d} فاشل={failed:3d}  "
+        f"المعدل={(REQUESTS - failed) / elapsed:4.2f} طلب/ث  429={fake.rejected:3d}  أقصى خيوط={peak[0]}"
+    )
+
+async def main():
+    """الدالة الرئيسية"""
+    logging.disable(logging.WARNING)
+    
+    print(f"📊 اختبار حمل Notion: {REQUESTS} طلب متزامن بحد خادم {SERVER_RATE:g} طلب/ثانية")
+    print("=" * 80)
+    
+    # العميل غير المتزامن مع دلو الرموز
+    notion = NotionService("secret", "properties", "owners", base_url=BASE_URL)
+    await run(
+        "AsyncClient + دلو",
+        lambda: notion._request(notion.client.databases.query, database_id="properties")
+    )
+    
+    # دلو أسرع من حد الخادم: يعتمد على Retry-After
+    notion.rate_limiter = TokenBucket(SERVER_RATE * 3, SERVER_BURST)
+    await run(
+        "AsyncClient + Retry-After",
+        lambda: notion._request(notion.client.databases.query, database_id="properties")
+    )
+    await notion.close()
+    
+    # السلوك القديم بعد العميل الجديد حتى لا تُحسب خيوطه المتبقية في القياس
+    # عميل متزامن داخل خيوط بدون حد معدل
+    sync_client = Client(auth="secret", base_url=BASE_URL)
+    await run(
+        "to_thread + Client",
+        lambda: asyncio.to_thread(sync_client.databases.query, database_id="properties")
+    )
+    sync_client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
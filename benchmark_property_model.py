@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+قياس ذاكرة وزمن نموذج PropertyData لمليون كائن
+يقارن نسخة dataclass عادية بـ __dict__ وتحويل صف بصف (السلوك القديم)
+بالنموذج ذي slots والبناء الجماعي من صفوف SQLite وذاكرة التوقيع
+"""
+
+import asyncio
+import dataclasses
+import gc
+import json
+import logging
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from models.property import PropertyData, PropertyStatus
+from utils.database import DatabaseManager
+
+INSTANCES = 1_000_000
+FETCH_SIZE = 100_000
+
+# نسخة dataclass بدون slots بنفس الحقول (مثل النموذج قبل التحسين)
+LegacyPropertyData = dataclasses.make_dataclass(
+    "LegacyPropertyData",
+    [
+        (f.name, f.type, dataclasses.field(default=f.default, default_factory=f.default_factory))
+        for f in dataclasses.fields(PropertyData) if f.init
+    ]
+)
+
+def legacy_signature(property_data) -> str:
+    """توقيع التكرار كما كان يُحسب في كل استدعاء"""
+    signature_parts = [
+        property_data.owner_phone, property_data.region, property_data.unit_type,
+        property_data.unit_condition, property_data.area, property_data.floor
+    ]
+    return "|".join(part.strip().lower() for part in signature_parts if part)
+
+def legacy_from_row(row):
+    """تحويل صف واحد كما كان في DatabaseManager._row_to_property_data"""
+    property_data = LegacyPropertyData()
+    for name in ("region", "unit_code", "unit_type", "unit_condition", "area", "floor", "price",
+                 "features", "address", "employee_name", "owner_name", "owner_phone",
+                 "full_details", "statement", "raw_text"):
+        setattr(property_data, name, row[name] or "")
+    property_data.availability = row['availability'] or "متاح"
+    property_data.photos_status = row['photos_status'] or "بدون صور"
+    property_data.status = PropertyStatus(row['status'])
+    if row['created_at']:
+        property_data.created_at = datetime.fromisoformat(row['created_at'])
+    if row['updated_at']:
+        property_data.updated_at = datetime.fromisoformat(row['updated_at'])
+    property_data.telegram_message_id = row['telegram_message_id']
+    property_data.notion_property_id = row['notion_property_id']
+    property_data.notion_owner_id = row['notion_owner_id']
+    property_data.zoho_lead_id = row['zoho_lead_id']
+    property_data.processing_attempts = row['processing_attempts'] or 0
+    property_data.ai_extracted = bool(row['ai_extracted'])
+    if row['error_messages']:
+        try:
+            property_data.error_messages = json.loads(row['error_messages'])
+        except:
+            property_data.error_messages = []
+    return property_data
+
+def make_instances(cls) -> tuple:
+    """بناء مليون كائن وقياس الزمن وذروة الذاكرة"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    instances = [
+        cls(region=f"منطقة {i % 50}", unit_type="شقة", area=str(100 + i % 200),
+            owner_phone=f"0100{i:07d}", telegram_message_id=i)
+        for i in range(INSTANCES)
+    ]
+
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return instances, elapsed, peak
+
+def time_signatures(instances, signature) -> float:
+    """حساب توقيع التكرار مرتين لكل كائن (كما في التصنيف ثم الحفظ)"""
+    started = time.perf_counter()
+    for property_data in instances:
+        signature(property_data)
+        signature(property_data)
+    return time.perf_counter() - started
+
+def time_from_rows(db_path: Path, convert) -> float:
+    """تحويل كل الصفوف على دفعات fetchmany"""
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    cursor = connection.execute("SELECT * FROM properties")
+
+    started = time.perf_counter()
+    converted = 0
+    while rows := cursor.fetchmany(FETCH_SIZE):
+        converted += len(convert(rows))
+    elapsed = time.perf_counter() - started
+
+    connection.close()
+    return elapsed
+
+def fill(connection):
+    """إدراج مليون عقار تجريبي"""
+    connection.executemany(
+        """
+        INSERT INTO properties (telegram_message_id, region, unit_type, area, owner_phone, error_messages)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            (i, f"منطقة {i % 50}", "شقة", str(100 + i % 200), f"0100{i:07d}", '["خطأ"]')
+            for i in range(INSTANCES)
+        )
+    )
+
+async def main():
+    """الدالة الرئيسية"""
+    # إخفاء سجلات التهيئة والإغلاق
+    logging.disable(logging.INFO)
+
+    print(f"📊 قياس نموذج العقار لـ {INSTANCES} كائن")
+    print("=" * 60)
+
+    for label, cls, signature in (
+        ("dataclass عادية", LegacyPropertyData, legacy_signature),
+        ("slots + ذاكرة", PropertyData, PropertyData.get_duplicate_check_signature)
+    ):
+        instances, elapsed, peak = make_instances(cls)
+        signatures = time_signatures(instances, signature)
+        print(f"{label:<18} إنشاء={elapsed:6.2f}s  ذاكرة={peak / 1024 / 1024:7.1f}MB ({peak / INSTANCES:5.0f}B/كائن)  توقيع×2={signatures:6.2f}s")
+        del instances
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "benchmark.db"
+        database = DatabaseManager(str(db_path))
+        await database.initialize()
+        await database.writer.submit(fill)
+        await database.close()
+
+        before = time_from_rows(db_path, lambda rows: [legacy_from_row(row) for row in rows])
+        after = time_from_rows(db_path, PropertyData.from_rows)
+
+    print(f"{'صف بصف':<18} تحويل الصفوف={before:6.2f}s")
+    print(f"{'from_rows':<18} تحويل الصفوف={after:6.2f}s")
+    print(f"⚡ التحسن في التحويل: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
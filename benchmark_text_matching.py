@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+قياس مطابقة المناطق والموظفين والمميزات المعتمدة في نصوص الإعلانات
+يقارن البحث الخطي (keyword in text لكل كلمة مع re.search غير مُجمَّعة)
+بالتطبيع ومطابق Aho-Corasick بمرور واحد، على سجل القناة المحفوظ في قاعدة البيانات
+مكمَّلاً بإعلانات تجريبية، مع قاموس المعتمدين وقاموس أكبر 100 مرة
+"""
+
+import logging
+import random
+import re
+import sqlite3
+import sys
+import time
+from config import Config
+from utils.arabic_text import ApprovedTermsMatcher, KeywordMatcher, normalize_arabic
+
+MESSAGES = 20_000
+LARGE_DICTIONARY_FACTOR = 100
+
+TEMPLATE = """🏠 {type} {condition}
+المنطقة: {region}
+المساحة: {area} متر
+السعر: {price} جنيه
+المميزات: {features}
+التليفون: 010{phone:08d}
+تبع {employee}"""
+
+def load_channel_history(db_path: str) -> list:
+    """نصوص الإعلانات المحفوظة في جدول العقارات"""
+    try:
+        connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        rows = connection.execute("SELECT raw_text FROM properties WHERE raw_text != ''").fetchall()
+        connection.close()
+        return [row[0] for row in rows]
+    except sqlite3.Error:
+        return []
+
+def synthetic_listings(config: Config, count: int) -> list:
+    """إعلانات بقالب الموظفين من القيم المعتمدة"""
+    rng = random.Random(42)
+    regions = [region for regions in config.APPROVED_REGIONS.values() for region in regions]
+    return [
+        TEMPLATE.format(
+            type=rng.choice(["شقة", "فيلا", "دوبلكس"]),
+            condition=rng.choice(["مفروشة", "فاضية", "تمليك"]),
+            region=rng.choice(regions),
+            area=rng.randint(80, 400),
+            price=rng.randint(5, 5000) * 1000,
+            features="، ".join(rng.sample(config.APPROVED_FEATURES, 3)),
+            phone=rng.randint(0, 99_999_999),
+            employee=rng.choice(config.APPROVED_EMPLOYEES)
+        )
+        for _ in range(count)
+    ]
+
+def large_vocabulary(config: Config) -> list:
+    """قاموس المعتمدين مع كلمات عربية عشوائية لمحاكاة قاموس أكبر"""
+    rng = random.Random(7)
+    letters = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+    terms = [region for regions in config.APPROVED_REGIONS.values() for region in regions]
+    terms += config.APPROVED_EMPLOYEES + config.APPROVED_FEATURES
+    extra = [
+        " ".join("".join(rng.choices(letters, k=rng.randint(3, 7))) for _ in range(rng.randint(1, 2)))
+        for _ in range(len(terms) * (LARGE_DICTIONARY_FACTOR - 1))
+    ]
+    return terms + extra
+
+def legacy_match(texts: list, terms: list) -> int:
+    """بحث خطي لكل كلمة مع أنماط regex غير مُجمَّعة (السلوك القديم)"""
+    found = 0
+    for text in texts:
+        found += sum(1 for term in terms if term in text)
+        re.search(r'01[0-9]{9}', text)
+        re.search(r'(\d+)\s*متر', text)
+    return found
+
+def automaton_match(texts: list, matcher: KeywordMatcher) -> int:
+    """تطبيع ثم مرور واحد على النص"""
+    found = 0
+    for text in texts:
+        found += len(matcher.find_all(text))
+    return found
+
+def timed(func, *args) -> tuple:
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+def main():
+    """الدالة الرئيسية"""
+    # إخفاء سجلات التهيئة
+    logging.disable(logging.INFO)
+
+    config = Config()
+    db_path = sys.argv[1] if len(sys.argv) > 1 else config.DATABASE_PATH
+    history = load_channel_history(db_path)
+    texts = history[:MESSAGES]
+    texts += synthetic_listings(config, MESSAGES - len(texts))
+    characters = sum(len(text) for text in texts)
+
+    print(f"📊 مطابقة النصوص: {len(texts)} إعلان ({len(history)} من سجل القناة في {db_path}) - {characters / 1e6:.1f}M حرف")
+    print("=" * 60)
+
+    approved_terms = ApprovedTermsMatcher(config)
+    small_terms = [region for regions in config.APPROVED_REGIONS.values() for region in regions]
+    small_terms += config.APPROVED_EMPLOYEES + config.APPROVED_FEATURES
+    large_terms = large_vocabulary(config)
+    large_matcher = KeywordMatcher()
+    large_matcher.add_all(large_terms)
+    large_matcher.build()
+
+    started = time.perf_counter()
+    for text in texts:
+        normalize_arabic(text)
+    normalize_time = time.perf_counter() - started
+    print(f"{'تطبيع فقط':<22} {normalize_time:6.2f}s  ({normalize_time / len(texts) * 1e6:5.1f}µs/إعلان)")
+
+    for label, terms, matcher in (
+        (f"قاموس {len(small_terms)} كلمة", small_terms, approved_terms.matcher),
+        (f"قاموس {len(large_terms)} كلمة", large_terms, large_matcher)
+    ):
+        before, legacy_found = timed(legacy_match, texts, terms)
+        after, found = timed(automaton_match, texts, matcher)
+        print(
+            f"{label:<22} خطي={before:6.2f}s ({legacy_found} مطابقة)  "
+            f"تطبيع+Aho-Corasick={after:6.2f}s ({found} مطابقة، {after / len(texts) * 1e6:5.1f}µs/إعلان)  "
+            f"⚡ {before / after:.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,41 @@
 
 import os
 from typing import Optional
+from utils.region_index import RegionIndex
+
+# القيم المعتمدة المشتركة بين Config وRealConfig (مصدر واحد للمناطق)
+
+# قائمة المناطق المعتمدة
+APPROVED_REGIONS = {
+    "z1": ["دار قرنفل", "قرنفل فيلات", "بنفسج", "ياسمين", "ج ش اكاديميه"],
+    "z3": ["سكن شباب", "مستقبل", "هناجر", "نزهه ثالث"],
+    "z4": ["رحاب", "جاردينيا سيتي"],
+    "z5": ["كمباوندات", "احياء تجمع", "بيت وطن", "نرجس", "لوتس", "شويفات", 
+           "زيزينيا", "اندلس", "دار اندلس", "سكن اندلس", "سكن معارض", 
+           "جنه", "جاردينيا هايتس"]
+}
+
+# أسماء بديلة للمناطق المعتمدة
+REGION_ALIASES = {
+    "اسكان شباب": "سكن شباب",
+    "التجمع الخامس": "احياء تجمع"
+}
+
+# فهرس المناطق (يُبنى مرة واحدة): منطقة → زون مع الأسماء البديلة والأخطاء الإملائية
+REGION_INDEX = RegionIndex(APPROVED_REGIONS, REGION_ALIASES)
+
+# قائمة أسماء الموظفين المعتمدة
+APPROVED_EMPLOYEES = [
+    "بلبل", "اسلام", "ايمن", "تاحه", "علياء", 
+    "محمود سامي", "يوسف", "عماد", "يوسف الجوهري"
+]
+
+# قائمة المميزات المعتمدة
+APPROVED_FEATURES = [
+    "تشطيب سوبر لوكس", "مدخل خاص", "دبل فيس", "اسانسير", 
+    "حصه في ارض", "حديقه", "فيو مفتوح", "فيو جاردن", 
+    "مسجله شهر عقاري", "تقسيط", "مكيفه", "باقي اقساط"
+]
 
 class Config:
     """فئة إعدادات النظام المحدثة"""
@@ -48,11 +83,66 @@ class Config:
 
         # Database Configuration
         self.DATABASE_PATH = os.getenv("DATABASE_PATH", "real_estate.db")
+        self.DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "performance")  # default / safe / performance
+        self.DATABASE_FLUSH_INTERVAL_MS = int(os.getenv("DATABASE_FLUSH_INTERVAL_MS", "0"))  # انتظار كتابات إضافية قبل التثبيت (0 = تثبيت المنتظر فوراً)
+        self.DATABASE_READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", "4"))  # اتصالات القراءة فقط
         
         # Processing Configuration
         self.MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "3"))
         self.PROCESSING_INTERVAL = int(os.getenv("PROCESSING_INTERVAL", "300"))  # 5 minutes
-        self.AI_RETRY_DELAY = int(os.getenv("AI_RETRY_DELAY", "15"))  # 15 seconds
+        self.AI_RETRY_DELAY = int(os.getenv("AI_RETRY_DELAY", "15"))  # أقصى تراجع بين المحاولات (ثوانٍ)
+        self.AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "1"))  # أساس التراجع الأسي (ثوانٍ)
+        self.AI_RETRY_AFTER_MAX = float(os.getenv("AI_RETRY_AFTER_MAX", "60"))  # Retry-After أطول من ذلك = الانتقال للمزود التالي
+        
+        # Concurrency Configuration - المعالجة المتوازية
+        self.PROCESSING_CONCURRENCY = int(os.getenv("PROCESSING_CONCURRENCY", "4"))  # عدد العمال المتوازيين
+        self.NOTION_CONCURRENCY = int(os.getenv("NOTION_CONCURRENCY", "3"))  # حد Notion (3 طلبات/ثانية)
+        self.ZOHO_CONCURRENCY = int(os.getenv("ZOHO_CONCURRENCY", "5"))  # حد Zoho
+        
+        # Notion Mirror Configuration - المرآة المحلية لتصنيف العقارات
+        self.NOTION_MIRROR_SYNC_INTERVAL = int(os.getenv("NOTION_MIRROR_SYNC_INTERVAL", "60"))  # ثواني بين المزامنات
+        
+        # Notion Client Configuration - حد المعدل ومجمع الاتصالات
+        self.NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))  # طلبات/ثانية
+        self.NOTION_RATE_BURST = int(os.getenv("NOTION_RATE_BURST", "3"))  # أقصى دفعة متتالية
+        self.NOTION_HTTP_POOL_LIMIT = int(os.getenv("NOTION_HTTP_POOL_LIMIT", "10"))
+        self.NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "3"))  # إعادة المحاولة عند 429
+        self.NOTION_OWNER_RECONCILE_INTERVAL = int(os.getenv("NOTION_OWNER_RECONCILE_INTERVAL", "21600"))  # 6 ساعات
+        
+        # AI Race Configuration - السباق المتوازي بين مزودي الذكاء الاصطناعي
+        self.AI_RACE_MODE = os.getenv("AI_RACE_MODE", "false").lower() == "true"
+        self.AI_RACE_PROVIDERS = int(os.getenv("AI_RACE_PROVIDERS", "3"))  # عدد المزودين في السباق
+        self.AI_HEDGE_PERCENTILE = float(os.getenv("AI_HEDGE_PERCENTILE", "95"))  # 0 = إطلاق الجميع فوراً
+        self.AI_HEDGE_DELAY = float(os.getenv("AI_HEDGE_DELAY", "8"))  # ثوانٍ قبل توفر قياسات كافية
+        
+        # AI Provider Health Configuration - صحة المزودين وقاطع الدائرة
+        self.AI_HEALTH_WINDOW = int(os.getenv("AI_HEALTH_WINDOW", "50"))  # عدد الاستدعاءات في النافذة المتحركة
+        self.AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "3"))  # إخفاقات متتالية تفتح الدائرة
+        self.AI_CIRCUIT_COOLDOWN = float(os.getenv("AI_CIRCUIT_COOLDOWN", "120"))  # ثوانٍ قبل محاولة الاختبار
+        self.AI_HEALTH_PERSIST_INTERVAL = float(os.getenv("AI_HEALTH_PERSIST_INTERVAL", "30"))  # ثوانٍ بين مرات الحفظ
+        
+        # AI HTTP Pool Configuration - جلسة HTTP مشتركة لمزودي الذكاء الاصطناعي
+        self.AI_HTTP_POOL_LIMIT = int(os.getenv("AI_HTTP_POOL_LIMIT", "20"))  # إجمالي الاتصالات
+        self.AI_HTTP_LIMIT_PER_HOST = int(os.getenv("AI_HTTP_LIMIT_PER_HOST", "5"))  # اتصالات لكل مزود
+        self.AI_HTTP_KEEPALIVE = float(os.getenv("AI_HTTP_KEEPALIVE", "60"))  # ثوانٍ
+        self.AI_HTTP_DNS_TTL = int(os.getenv("AI_HTTP_DNS_TTL", "300"))  # ثوانٍ
+        self.AI_HTTP_CONNECT_TIMEOUT = float(os.getenv("AI_HTTP_CONNECT_TIMEOUT", "10"))
+        self.AI_HTTP_TIMEOUT = float(os.getenv("AI_HTTP_TIMEOUT", "60"))  # المهلة الكلية للطلب
+        
+        # Extraction Cache Configuration - ذاكرة نتائج الاستخراج
+        self.EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(30 * 24 * 3600)))  # 30 يوم
+        self.EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "10000"))
+        
+        # AI Batch Configuration - عدد الإعلانات في طلب ذكاء اصطناعي واحد (1 = تعطيل)
+        self.AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "5"))
+        
+        # Fast Path Configuration - الاستخراج بالقواعد لإعلانات القالب قبل مزودي الذكاء الاصطناعي
+        self.FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+        self.FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))  # أقل ثقة لتخطي المزودين
+        
+        # Telegram Ingestion Configuration - الانتظار الطويل في getUpdates (0 = تعطيل)
+        self.TELEGRAM_LONG_POLL_TIMEOUT = int(os.getenv("TELEGRAM_LONG_POLL_TIMEOUT", "30"))
+        self.TELEGRAM_POLL_ERROR_DELAY = float(os.getenv("TELEGRAM_POLL_ERROR_DELAY", "5"))  # أساس التراجع عند فشل الجلب (ثوانٍ)
         
         # Success Tag Configuration - نظام الوسم الجديد
         self.SUCCESS_TAG = "عقار ناجح ✅"
@@ -88,28 +178,12 @@ class Config:
             "status": "Status"
         }
         
-        # قائمة المناطق المعتمدة
-        self.APPROVED_REGIONS = {
-            "z1": ["دار قرنفل", "قرنفل فيلات", "بنفسج", "ياسمين", "ج ش اكاديميه"],
-            "z3": ["سكن شباب", "مستقبل", "هناجر", "نزهه ثالث"],
-            "z4": ["رحاب", "جاردينيا سيتي"],
-            "z5": ["كمباوندات", "احياء تجمع", "بيت وطن", "نرجس", "لوتس", "شويفات", 
-                   "زيزينيا", "اندلس", "دار اندلس", "سكن اندلس", "سكن معارض", 
-                   "جنه", "جاردينيا هايتس"]
-        }
-        
-        # قائمة أسماء الموظفين المعتمدة
-        self.APPROVED_EMPLOYEES = [
-            "بلبل", "اسلام", "ايمن", "تاحه", "علياء", 
-            "محمود سامي", "يوسف", "عماد", "يوسف الجوهري"
-        ]
-        
-        # قائمة المميزات المعتمدة
-        self.APPROVED_FEATURES = [
-            "تشطيب سوبر لوكس", "مدخل خاص", "دبل فيس", "اسانسير", 
-            "حصه في ارض", "حديقه", "فيو مفتوح", "فيو جاردن", 
-            "مسجله شهر عقاري", "تقسيط", "مكيفه", "باقي اقساط"
-        ]
+        # المناطق والموظفون والمميزات المعتمدة (القوائم المشتركة أعلى الملف)
+        self.APPROVED_REGIONS = APPROVED_REGIONS
+        self.REGION_ALIASES = REGION_ALIASES
+        self.region_index = REGION_INDEX
+        self.APPROVED_EMPLOYEES = APPROVED_EMPLOYEES
+        self.APPROVED_FEATURES = APPROVED_FEATURES
     
     def validate(self) -> bool:
         """التحقق من صحة الإعدادات"""
@@ -168,10 +242,5 @@ class Config:
         return providers
     
     def get_region_zone(self, region: str) -> str:
-        """الحصول على زون المنطقة"""
-        
-        for zone, regions in self.APPROVED_REGIONS.items():
-            if region in regions:
-                return zone.replace("z", "")
-        
-        return "5"  # افتراضي
+        """الحصول على زون المنطقة (5 افتراضياً)"""
+        return self.region_index.zone(region)
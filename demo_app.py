@@ -251,7 +251,7 @@ class DemoRealEstateSystem:
         print("📊 إنشاء السجل في Zoho CRM...")
         async with self.zoho_service as zoho:
             record_id = await zoho.create_record(property_data.to_dict())
-            property_data.zoho_record_id = record_id
+            property_data.zoho_lead_id = record_id
         
         # إرسال إشعار نجاح
         print("📲 إرسال إشعار النجاح...")
@@ -277,7 +277,7 @@ class DemoRealEstateSystem:
         print("📊 تحديث السجل في Zoho CRM...")
         async with self.zoho_service as zoho:
             record_id = await zoho.create_record(property_data.to_dict())
-            property_data.zoho_record_id = record_id
+            property_data.zoho_lead_id = record_id
         
         # إرسال إشعار
         print("📲 إرسال إشعار العقار المتعدد...")
@@ -11,8 +11,7 @@ import os
 from datetime import datetime
 from utils.logger import setup_logger
 from config import Config
-from processors.property_processor import PropertyProcessor
-from web_interface import app
+from web_interface import app, processor
 
 logger = setup_logger(__name__)
 
@@ -21,7 +20,8 @@ class RealEstateSystem:
     
     def __init__(self):
         self.config = Config()
-        self.processor = PropertyProcessor()
+        # نفس معالج الواجهة الويب (ومدير قاعدة بياناتها) حتى لا يعمل معالجان على نفس الملف
+        self.processor = processor
         self.is_running = False
         
     async def start(self):
@@ -52,7 +52,8 @@ class RealEstateSystem:
         """إيقاف النظام"""
         logger.info("🛑 إيقاف النظام...")
         self.is_running = False
-        if self.processor:
+        # قد يكون أُوقف مسبقاً عند إغلاق الواجهة الويب
+        if self.processor and self.processor.is_running:
             await self.processor.stop()
         logger.info("✅ تم إيقاف النظام")
 
@@ -2,8 +2,10 @@
 نماذج البيانات - Data Models
 """
 
+import json
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List
+from operator import attrgetter, itemgetter
+from typing import Dict, Any, Optional, List, Iterable
 from datetime import datetime
 from enum import Enum
 
@@ -37,7 +39,50 @@ class PropertyType(Enum):
     WAREHOUSE = "مخزن"
     LAND = "أرض"
 
-@dataclass
+# خريطة الحقول: الاسم العربي ↔ اسم الخاصية
+FIELD_TO_ARABIC = {
+    "region": "المنطقة",
+    "unit_code": "كود الوحدة",
+    "unit_type": "نوع الوحدة",
+    "unit_condition": "حالة الوحدة",
+    "area": "المساحة",
+    "floor": "الدور",
+    "price": "السعر",
+    "features": "المميزات",
+    "address": "العنوان",
+    "employee_name": "اسم الموظف",
+    "owner_name": "اسم المالك",
+    "owner_phone": "رقم المالك",
+    "availability": "اتاحة العقار",
+    "photos_status": "حالة الصور",
+    "full_details": "تفاصيل كاملة",
+    "statement": "البيان"
+}
+ARABIC_TO_FIELD = {arabic: name for name, arabic in FIELD_TO_ARABIC.items()}
+
+_ARABIC_KEYS = tuple(FIELD_TO_ARABIC.values())
+_dict_values = attrgetter(*FIELD_TO_ARABIC)
+
+# حقول توقيع التكرار
+_signature_values = attrgetter("owner_phone", "region", "unit_type", "unit_condition", "area", "floor")
+
+# أجزاء البيان بالترتيب: (العنوان، الخاصية)
+_STATEMENT_PARTS = (
+    ("نوع الوحدة", "unit_type"),
+    ("حالة الوحدة", "unit_condition"),
+    ("المنطقة", "region"),
+    ("المساحة", "area"),
+    ("الدور", "floor"),
+    ("السعر", "price"),
+    ("كود الوحدة", "unit_code"),
+    ("اسم الموظف", "employee_name"),
+    ("حالة الصور", "photos_status")
+)
+_statement_values = attrgetter(*(name for _, name in _STATEMENT_PARTS))
+
+_STATUS_BY_VALUE = {status.value: status for status in PropertyStatus}
+
+@dataclass(slots=True)
 class PropertyData:
     """نموذج بيانات العقار"""
     
@@ -82,26 +127,14 @@ class PropertyData:
     raw_text: str = ""
     ai_extracted: bool = False
     
+    # ذاكرة التوقيع والبيان مع قيم الحقول المصدر - تُهمل تلقائياً عند تغير أي حقل
+    _signature_key: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _signature: str = field(default="", init=False, repr=False, compare=False)
+    _statement_cache: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    
     def to_dict(self) -> Dict[str, Any]:
         """تحويل إلى قاموس"""
-        return {
-            "المنطقة": self.region,
-            "كود الوحدة": self.unit_code,
-            "نوع الوحدة": self.unit_type,
-            "حالة الوحدة": self.unit_condition,
-            "المساحة": self.area,
-            "الدور": self.floor,
-            "السعر": self.price,
-            "المميزات": self.features,
-            "العنوان": self.address,
-            "اسم الموظف": self.employee_name,
-            "اسم المالك": self.owner_name,
-            "رقم المالك": self.owner_phone,
-            "اتاحة العقار": self.availability,
-            "حالة الصور": self.photos_status,
-            "تفاصيل كاملة": self.full_details,
-            "البيان": self.statement
-        }
+        return dict(zip(_ARABIC_KEYS, _dict_values(self)))
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'PropertyData':
@@ -109,31 +142,80 @@ class PropertyData:
         property_data = cls()
         
         # تحديث الحقول من القاموس
-        field_mapping = {
-            "المنطقة": "region",
-            "كود الوحدة": "unit_code", 
-            "نوع الوحدة": "unit_type",
-            "حالة الوحدة": "unit_condition",
-            "المساحة": "area",
-            "الدور": "floor",
-            "السعر": "price",
-            "المميزات": "features",
-            "العنوان": "address",
-            "اسم الموظف": "employee_name",
-            "اسم المالك": "owner_name",
-            "رقم المالك": "owner_phone",
-            "اتاحة العقار": "availability",
-            "حالة الصور": "photos_status",
-            "تفاصيل كاملة": "full_details",
-            "البيان": "statement"
-        }
-        
-        for arabic_key, english_attr in field_mapping.items():
-            if arabic_key in data:
-                setattr(property_data, english_attr, data[arabic_key])
+        for arabic_key, value in data.items():
+            english_attr = ARABIC_TO_FIELD.get(arabic_key)
+            if english_attr:
+                setattr(property_data, english_attr, value)
         
         return property_data
     
+    @classmethod
+    def from_rows(cls, rows: Iterable) -> List['PropertyData']:
+        """إنشاء دفعة عقارات من صفوف SQLite (sqlite3.Row من جدول properties) بدون المرور على __init__"""
+        
+        new = cls.__new__
+        statuses = _STATUS_BY_VALUE
+        parse_timestamp = datetime.fromisoformat
+        decode_errors = decode_error_messages
+        pick = None
+        properties = []
+        
+        for row in rows:
+            # ترتيب الأعمدة يُحسب مرة واحدة من أول صف
+            if pick is None:
+                keys = row.keys()
+                pick = itemgetter(*(keys.index(column) for column in PROPERTY_COLUMNS))
+            
+            (_, telegram_message_id, region, unit_code, unit_type, unit_condition,
+             area, floor, price, features, address, employee_name, owner_name,
+             owner_phone, availability, photos_status, full_details, statement,
+             status, notion_property_id, notion_owner_id, zoho_lead_id,
+             processing_attempts, error_messages, raw_text, ai_extracted,
+             _, created_at, updated_at) = pick(row)
+            
+            property_data = new(cls)
+            property_data.region = region or ""
+            property_data.unit_code = unit_code or ""
+            property_data.unit_type = unit_type or ""
+            property_data.unit_condition = unit_condition or ""
+            property_data.area = area or ""
+            property_data.floor = floor or ""
+            property_data.price = price or ""
+            property_data.features = features or ""
+            property_data.address = address or ""
+            property_data.employee_name = employee_name or ""
+            property_data.owner_name = owner_name or ""
+            property_data.owner_phone = owner_phone or ""
+            property_data.availability = availability or "متاح"
+            property_data.photos_status = photos_status or "بدون صور"
+            property_data.full_details = full_details or ""
+            property_data.statement = statement or ""
+            property_data.status = statuses.get(status) or PropertyStatus(status)
+            now = None
+            if created_at:
+                property_data.created_at = parse_timestamp(created_at)
+            else:
+                property_data.created_at = now = datetime.now()
+            if updated_at:
+                property_data.updated_at = parse_timestamp(updated_at)
+            else:
+                property_data.updated_at = now or datetime.now()
+            property_data.telegram_message_id = telegram_message_id
+            property_data.notion_property_id = notion_property_id
+            property_data.notion_owner_id = notion_owner_id
+            property_data.zoho_lead_id = zoho_lead_id
+            property_data.serial_number = None
+            property_data.processing_attempts = processing_attempts or 0
+            property_data.error_messages = decode_errors(error_messages)
+            property_data.raw_text = raw_text or ""
+            property_data.ai_extracted = bool(ai_extracted)
+            property_data._signature_key = None
+            property_data._signature = ""
+            property_data._statement_cache = None
+            properties.append(property_data)
+        
+        return properties
+    
     def is_valid(self) -> tuple[bool, List[str]]:
         """التحقق من صحة البيانات"""
         required_fields = [
@@ -172,44 +254,50 @@ class PropertyData:
     
     def generate_statement(self) -> str:
         """إنشاء البيان"""
-        statement_parts = []
+        values = _statement_values(self)
         
-        if self.unit_type:
-            statement_parts.append(f"نوع الوحدة: {self.unit_type}")
-        if self.unit_condition:
-            statement_parts.append(f"حالة الوحدة: {self.unit_condition}")
-        if self.region:
-            statement_parts.append(f"المنطقة: {self.region}")
-        if self.area:
-            statement_parts.append(f"المساحة: {self.area}")
-        if self.floor:
-            statement_parts.append(f"الدور: {self.floor}")
-        if self.price:
-            statement_parts.append(f"السعر: {self.price}")
-        if self.unit_code:
-            statement_parts.append(f"كود الوحدة: {self.unit_code}")
-        if self.employee_name:
-            statement_parts.append(f"اسم الموظف: {self.employee_name}")
-        if self.photos_status:
-            statement_parts.append(f"حالة الصور: {self.photos_status}")
+        cache = self._statement_cache
+        if cache is None or cache[0] != values:
+            statement = " | ".join(
+                f"{label}: {value}"
+                for (label, _), value in zip(_STATEMENT_PARTS, values)
+                if value
+            )
+            cache = self._statement_cache = (values, statement)
         
-        self.statement = " | ".join(statement_parts)
+        self.statement = cache[1]
         return self.statement
     
     def get_duplicate_check_signature(self) -> str:
         """إنشاء توقيع للتحقق من التكرار"""
         # الحقول المطلوبة للتحقق من التكرار
-        signature_parts = [
-            self.owner_phone,
-            self.region,
-            self.unit_type,
-            self.unit_condition,
-            self.area,
-            self.floor
-        ]
+        signature_parts = _signature_values(self)
+        
+        if self._signature_key != signature_parts:
+            self._signature = "|".join(part.strip().lower() for part in signature_parts if part)
+            self._signature_key = signature_parts
         
-        return "|".join(part.strip().lower() for part in signature_parts if part)
+        return self._signature
     
     def update_timestamp(self):
         """تحديث وقت التعديل"""
         self.updated_at = datetime.now()
+
+# أعمدة جدول properties في قاعدة البيانات المحلية (بالترتيب الذي يقرأه from_rows)
+PROPERTY_COLUMNS = (
+    "id", "telegram_message_id", "region", "unit_code", "unit_type", "unit_condition",
+    "area", "floor", "price", "features", "address", "employee_name", "owner_name",
+    "owner_phone", "availability", "photos_status", "full_details", "statement",
+    "status", "notion_property_id", "notion_owner_id", "zoho_lead_id",
+    "processing_attempts", "error_messages", "raw_text", "ai_extracted",
+    "duplicate_signature", "created_at", "updated_at"
+)
+
+def decode_error_messages(value: Optional[str]) -> List[str]:
+    """فك رسائل الخطأ المحفوظة كـ JSON"""
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return []
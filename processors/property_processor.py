@@ -4,11 +4,14 @@
 """
 
 import asyncio
+import contextlib
+import re
+import time
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from models.property import PropertyData, PropertyStatus
 from services.telegram_service import TelegramService
-from services.ai_service import AIService
+from services.ai_service import AIService, DEFAULT_OWNER_PHONE
 from services.notion_service import NotionService
 from services.zoho_service import ZohoService
 from utils.database import DatabaseManager
@@ -20,9 +23,17 @@ logger = setup_logger(__name__)
 class PropertyProcessor:
     """معالج العقارات الرئيسي مع التحديثات الجديدة"""
     
-    def __init__(self):
+    def __init__(self, database: Optional[DatabaseManager] = None):
         self.config = Config()
-        self.database = DatabaseManager(self.config.DATABASE_PATH)
+        
+        # مدير قاعدة بيانات واحد لكل عملية (الواجهة الويب تمرر مديرها)؛ يُغلق هنا فقط إذا أنشأه المعالج
+        self._owns_database = database is None
+        self.database = database or DatabaseManager(
+            self.config.DATABASE_PATH,
+            self.config.DATABASE_PROFILE,
+            flush_interval_ms=self.config.DATABASE_FLUSH_INTERVAL_MS,
+            read_pool_size=self.config.DATABASE_READ_POOL_SIZE
+        )
         self.is_running = False
         
         # الخدمات المحدثة
@@ -38,9 +49,18 @@ class PropertyProcessor:
             "failed": 0,
             "duplicate": 0,
             "multiple": 0,
-            "ai_providers_used": {}
+            "ai_providers_used": {},
+            "last_cycle_throughput": 0.0,  # عقار/دقيقة في آخر دورة
+            "last_cycle_fast_path": {"listings": 0, "hits": 0, "ai_calls_saved": 0}  # المسار السريع في آخر دورة
         }
-        
+
+        # حدود التوازي لكل خدمة خارجية (احترام حدود المعدل في Notion وZoho)
+        self.notion_semaphore = asyncio.Semaphore(self.config.NOTION_CONCURRENCY)
+        self.zoho_semaphore = asyncio.Semaphore(self.config.ZOHO_CONCURRENCY)
+
+        # أقفال المالكين - لضمان صحة تصنيف جديد/متعدد لعقارات نفس المالك
+        self._owner_locks: Dict[str, asyncio.Lock] = {}
+
     async def start(self):
         """بدء المعالج"""
         try:
@@ -48,7 +68,8 @@ class PropertyProcessor:
             await self.database.initialize()
             
             # تهيئة الخدمات المحدثة
-            self.ai_service = AIService(self.config)
+            self.ai_service = AIService(self.config, self.database)
+            await self.ai_service.start()
             
             self.telegram_service = TelegramService(self.config)
             
@@ -56,17 +77,20 @@ class PropertyProcessor:
                 self.notion_service = NotionService(
                     self.config.NOTION_INTEGRATION_SECRET,
                     self.config.NOTION_PROPERTIES_DB_ID,
-                    self.config.NOTION_OWNERS_DB_ID
+                    self.config.NOTION_OWNERS_DB_ID,
+                    self.config.NOTION_MIRROR_SYNC_INTERVAL,
+                    rate_limit=self.config.NOTION_RATE_LIMIT,
+                    rate_burst=self.config.NOTION_RATE_BURST,
+                    pool_limit=self.config.NOTION_HTTP_POOL_LIMIT,
+                    max_retries=self.config.NOTION_MAX_RETRIES,
+                    database=self.database
                 )
+                await self.notion_service.sync_mirror(force=True)
             
             if self.config.ZOHO_CLIENT_ID:
-                self.zoho_service = ZohoService(
-                    self.config.ZOHO_CLIENT_ID,
-                    self.config.ZOHO_CLIENT_SECRET,
-                    self.config.ZOHO_REFRESH_TOKEN,
-                    self.config.ZOHO_ACCESS_TOKEN,
-                    self.config.ZOHO_MODULE_NAME  # موديول Aqar الجديد
-                )
+                # عميل Zoho واحد طويل العمر (جلسة مشتركة وتوكن مخزن)
+                self.zoho_service = self._create_zoho_service()
+                await self.zoho_service.start()
             
             self.is_running = True
             logger.info("✅ تم بدء معالج العقارات المحدث")
@@ -79,10 +103,28 @@ class PropertyProcessor:
             logger.error(f"❌ خطأ في بدء المعالج: {e}")
             raise
     
+    def _create_zoho_service(self) -> ZohoService:
+        """إنشاء عميل Zoho"""
+        return ZohoService(
+            self.config.ZOHO_CLIENT_ID,
+            self.config.ZOHO_CLIENT_SECRET,
+            self.config.ZOHO_REFRESH_TOKEN,
+            self.config.ZOHO_ACCESS_TOKEN,
+            self.config.ZOHO_MODULE_NAME,  # موديول Aqar الجديد
+            database=self.database  # طابور upsert الدائم
+        )
+
     async def stop(self):
         """إيقاف المعالج"""
         self.is_running = False
-        if self.database:
+        await self._flush_zoho_upserts()
+        if self.zoho_service:
+            await self.zoho_service.close()
+        if self.ai_service:
+            await self.ai_service.close()
+        if self.notion_service:
+            await self.notion_service.close()
+        if self.database and self._owns_database:
             await self.database.close()
         logger.info("✅ تم إيقاف معالج العقارات")
         
@@ -92,78 +134,267 @@ class PropertyProcessor:
     async def process_all_pending(self):
         """معالجة جميع العقارات المعلقة مع السير المحدث"""
         
+        last_full_cycle = 0.0
+        last_owner_reconcile = time.monotonic()
+        fetch_errors = 0
+        
         while self.is_running:
             try:
-                logger.info("🔄 بدء دورة معالجة جديدة...")
+                # جلب رسائل جديدة من Telegram (انتظار طويل حتى وصول تحديث)
+                new_messages_count = await self.fetch_new_messages()
+                fetch_errors = fetch_errors + 1 if new_messages_count is None else 0
                 
-                # جلب رسائل جديدة من Telegram
-                await self.fetch_new_messages()
+                # الدورة الكاملة (تشمل العقارات الفاشلة) كل PROCESSING_INTERVAL فقط
+                full_cycle = time.monotonic() - last_full_cycle >= self.config.PROCESSING_INTERVAL
+                if not full_cycle and not new_messages_count:
+                    await self._wait_before_poll(fetch_errors)
+                    continue
+                
+                logger.info("🔄 بدء دورة معالجة جديدة...")
+                if full_cycle:
+                    last_full_cycle = time.monotonic()
+                    
+                    # مطابقة دورية لأعداد عقارات الملاك مع Notion
+                    if (self.notion_service and
+                            time.monotonic() - last_owner_reconcile >= self.config.NOTION_OWNER_RECONCILE_INTERVAL):
+                        last_owner_reconcile = time.monotonic()
+                        await self.notion_service.reconcile_owner_counts()
                 
                 # الحصول على العقارات المعلقة
-                pending_properties = await self.database.get_pending_properties()
+                pending_properties = await self.database.get_pending_properties(
+                    include_failed=full_cycle
+                )
                 
                 if pending_properties:
-                    logger.info(f"🔄 معالجة {len(pending_properties)} عقار معلق")
-                    
-                    batch_results = []
-                    
-                    for property_data in pending_properties:
-                        if not self.is_running:
-                            break
-                            
-                        result = await self.process_property(property_data)
-                        batch_results.append(result)
-                        
-                        await asyncio.sleep(1)  # توقف قصير بين العقارات
+                    logger.info(
+                        f"🔄 معالجة {len(pending_properties)} عقار معلق "
+                        f"({self.config.PROCESSING_CONCURRENCY} عامل متوازي)"
+                    )
+
+                    cycle_start = time.monotonic()
+                    fast_path_before = dict(self.ai_service.fast_path_stats)
+                    batch_results = await self._process_batch_concurrently(pending_properties)
+                    elapsed = time.monotonic() - cycle_start
+
+                    # إعادة معالجة العقارات الفاشلة في الدورة الكاملة فقط
+                    if full_cycle:
+                        await self._reprocess_failed_properties()
                     
-                    # إعادة معالجة العقارات الفاشلة في نفس الدفعة
-                    await self._reprocess_failed_properties()
+                    # إرسال طابور Zoho للدورة دفعة واحدة
+                    await self._flush_zoho_upserts()
+
+                    throughput = len(batch_results) / (elapsed / 60) if elapsed > 0 else 0.0
+                    self.processing_stats["last_cycle_throughput"] = throughput
+
+                    logger.info(
+                        f"✅ انتهت دورة المعالجة - نجح: {sum(1 for r in batch_results if r)} "
+                        f"- المعدل: {throughput:.1f} عقار/دقيقة"
+                    )
                     
-                    logger.info(f"✅ انتهت دورة المعالجة - نجح: {sum(1 for r in batch_results if r)}")
+                    fast_path = {
+                        key: value - fast_path_before[key]
+                        for key, value in self.ai_service.fast_path_stats.items()
+                    }
+                    self.processing_stats["last_cycle_fast_path"] = fast_path
+                    if fast_path["listings"]:
+                        logger.info(
+                            f"⚡ المسار السريع: {fast_path['hits']}/{fast_path['listings']} إعلان "
+                            f"({fast_path['hits'] / fast_path['listings']:.0%}) "
+                            f"- تم توفير {fast_path['ai_calls_saved']} طلب ذكاء اصطناعي"
+                        )
                 
-                # انتظار قبل المحاولة التالية
-                await asyncio.sleep(self.config.PROCESSING_INTERVAL)
+                await self._wait_before_poll(fetch_errors)
                 
             except Exception as e:
                 logger.error(f"❌ خطأ في حلقة المعالجة: {e}")
                 await asyncio.sleep(60)  # انتظار دقيقة في حالة الخطأ
+
+    def _poll_delay(self, fetch_errors: int) -> float:
+        """مدة الانتظار قبل جلب Telegram التالي"""
+        
+        # تراجع أسي عند فشل الجلب المتتالي (بحد أقصى PROCESSING_INTERVAL)
+        if fetch_errors:
+            return min(
+                self.config.PROCESSING_INTERVAL,
+                self.config.TELEGRAM_POLL_ERROR_DELAY * 2 ** (fetch_errors - 1)
+            )
+        
+        # الانتظار الطويل في getUpdates يغني عن النوم الثابت
+        if self.config.TELEGRAM_LONG_POLL_TIMEOUT <= 0:
+            return self.config.PROCESSING_INTERVAL
+        return 0.0
+
+    async def _wait_before_poll(self, fetch_errors: int):
+        """الانتظار قبل جلب Telegram التالي حتى لا تدور الحلقة بدون توقف"""
+        
+        delay = self._poll_delay(fetch_errors)
+        if delay:
+            if fetch_errors:
+                logger.warning(f"⏳ فشل جلب الرسائل {fetch_errors} مرة متتالية - انتظار {delay:.0f} ثانية")
+            await asyncio.sleep(delay)
+
+    async def _flush_zoho_upserts(self):
+        """إرسال طابور upsert في Zoho (المحفوظ في قاعدة البيانات) وأرشفة العقارات بمعرفات سجلاتها"""
+        
+        if not self.zoho_service:
+            return
+        
+        try:
+            async with self.zoho_semaphore, self.zoho_service as zoho:
+                updated = await zoho.flush_upserts(self.config.MAX_RETRY_ATTEMPTS)
+            
+            # معرفات السجلات محفوظة في قاعدة البيانات؛ الأرشفة بعد الحفظ في Zoho
+            for property_data in updated:
+                await self._send_to_archive(
+                    property_data, PropertyLogger(str(property_data.telegram_message_id))
+                )
+            
+            queue_stats = await self.database.get_zoho_upsert_queue_stats(self.config.MAX_RETRY_ATTEMPTS)
+            if queue_stats["pending"] or queue_stats["exhausted"]:
+                logger.warning(
+                    f"⚠️ طابور Zoho: {queue_stats['pending']} عقار ينتظر إعادة المحاولة، "
+                    f"{queue_stats['exhausted']} استنفد المحاولات (راجع zoho_upsert_queue)"
+                )
+                
+        except Exception as e:
+            logger.error(f"❌ خطأ في إرسال طابور Zoho: {e}")
     
+    async def _process_batch_concurrently(self, pending_properties: List[PropertyData]) -> List[bool]:
+        """معالجة دفعة عقارات بمجموعة عمال متوازية مع الحفاظ على ترتيب عقارات كل مالك"""
+
+        # استخراج مسبق بدفعات متعددة الإعلانات لتقليل طلبات الذكاء الاصطناعي
+        await self._prefetch_batch_extractions(pending_properties)
+
+        # كل مجموعة (عقارات نفس المالك) تُعالج بالتتابع داخل عامل واحد
+        queue: asyncio.Queue = asyncio.Queue()
+        for group in self._group_by_owner(pending_properties):
+            queue.put_nowait(group)
+
+        results: List[bool] = []
+
+        async def worker():
+            while self.is_running:
+                try:
+                    group = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                for property_data in group:
+                    if not self.is_running:
+                        break
+                    results.append(await self.process_property(property_data))
+
+        workers_count = max(1, min(self.config.PROCESSING_CONCURRENCY, queue.qsize()))
+        await asyncio.gather(*(worker() for _ in range(workers_count)))
+
+        # الأقفال خاصة بالدورة الحالية فقط
+        self._owner_locks.clear()
+
+        return results
+
+    @staticmethod
+    def _owner_key(property_data: PropertyData) -> Optional[str]:
+        """مفتاح المالك للتجميع والقفل معاً (None للرقم المجهول أو الافتراضي)"""
+
+        phone = property_data.owner_phone
+        if not phone and not property_data.ai_extracted:
+            # الرقم غير مستخرج بعد - نبحث عنه في النص الخام
+            phone_match = re.search(r'01[0-9]{9}', property_data.raw_text or "")
+            phone = phone_match.group() if phone_match else ""
+
+        phone = "".join(char for char in phone if char.isdigit())
+        if not phone or phone == DEFAULT_OWNER_PHONE:
+            return None
+        return phone
+
+    def _group_by_owner(self, properties: List[PropertyData]) -> List[List[PropertyData]]:
+        """تجميع العقارات حسب مفتاح المالك مع الحفاظ على ترتيب الاستلام"""
+
+        groups: Dict[str, List[PropertyData]] = {}
+
+        for index, property_data in enumerate(properties):
+            owner_key = self._owner_key(property_data) or f"unknown-{index}"
+            groups.setdefault(owner_key, []).append(property_data)
+
+        return list(groups.values())
+
+    def _get_owner_lock(self, owner_key: Optional[str]):
+        """قفل المالك (ينشأ عند أول طلب)؛ بدون قفل للرقم المجهول أو الافتراضي حتى لا تصطف إعلاناته على قفل واحد"""
+
+        if owner_key is None:
+            return contextlib.nullcontext()
+
+        lock = self._owner_locks.get(owner_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._owner_locks[owner_key] = lock
+        return lock
+
     async def fetch_new_messages(self):
         """جلب رسائل جديدة من Telegram مع تطبيق الفلترة"""
         
         try:
             async with TelegramService(self.config) as telegram:
                 
-                # جلب الرسائل مع تطبيق فلتر الوسم
-                messages = await telegram.get_channel_messages(limit=100, apply_filter=True)
+                # آخر تحديث مؤكد محفوظ في إعدادات النظام
+                offset = await self.database.get_setting("telegram_update_offset")
+                
+                # جلب الرسائل الجديدة فقط مع تطبيق فلتر الوسم
+                messages = await telegram.get_channel_messages(
+                    limit=100,
+                    apply_filter=True,
+                    offset=int(offset) if offset else None,
+                    timeout=self.config.TELEGRAM_LONG_POLL_TIMEOUT
+                )
+                if messages is None:
+                    # فشل الجلب يُحسب في عداد الأخطاء لتطبيق التراجع
+                    return None
+                
+                # التحقق من الرسائل المعالجة مسبقاً باستعلام واحد للدفعة
+                existing_ids = await self.database.get_existing_telegram_ids(
+                    [message['message_id'] for message in messages]
+                )
                 
-                new_messages_count = 0
+                new_properties = []
+                next_serial = None
                 
                 for message in messages:
-                    # التحقق من عدم معالجة الرسالة مسبقاً
-                    existing = await self.database.get_property_by_telegram_id(
-                        message['message_id']
-                    )
-                    
-                    if not existing and message['text'].strip():
+                    if message['message_id'] not in existing_ids and message['text'].strip():
+                        if next_serial is None:
+                            next_serial = await self._get_next_serial_number()
+                        
                         # إنشاء عقار جديد من الرسالة
                         property_data = PropertyData()
                         property_data.telegram_message_id = message['message_id']
                         property_data.raw_text = message['text']
                         property_data.status = PropertyStatus.PENDING
-                        property_data.serial_number = await self._get_next_serial_number()
-                        
-                        # حفظ في قاعدة البيانات
-                        await self.database.save_property(property_data)
-                        new_messages_count += 1
+                        property_data.serial_number = next_serial
+                        next_serial += 1
                         
-                        logger.info(f"📥 تم استلام رسالة جديدة: {message['message_id']}")
+                        new_properties.append(property_data)
+                
+                # حفظ الدفعة في معاملة واحدة
+                inserted = await self.database.save_properties_bulk(new_properties)
+                new_messages_count = len(inserted)
+                
+                for message_id in inserted:
+                    logger.info(f"📥 تم استلام رسالة جديدة: {message_id}")
                 
                 if new_messages_count > 0:
                     logger.info(f"📥 تم استلام {new_messages_count} رسالة جديدة للمعالجة")
+                
+                # حفظ الإزاحة ثم تأكيد التحديثات لدى Telegram بعد حفظ الرسائل
+                if telegram.last_update_id is not None:
+                    await self.database.set_setting(
+                        "telegram_update_offset", str(telegram.last_update_id + 1)
+                    )
+                    await telegram.acknowledge_updates(telegram.last_update_id)
+                
+                return new_messages_count
         
         except Exception as e:
             logger.error(f"❌ خطأ في جلب الرسائل: {e}")
+            return None
     
     async def _get_next_serial_number(self) -> int:
         """الحصول على الرقم التسلسلي التالي"""
@@ -201,17 +432,20 @@ class PropertyProcessor:
                 property_logger.log_error("التحقق من البيانات", f"بيانات ناقصة: {', '.join(errors)}")
                 return await self._mark_as_failed(property_data, property_logger)
             
-            # الخطوة 3: البحث في Notion للمطابقة (بدلاً من قاعدة البيانات المحلية)
-            classification = await self._classify_property_via_notion(property_data, property_logger)
-            
-            # الخطوة 4: معالجة حسب التصنيف الجديد
-            success = await self._process_by_classification(
-                property_data, classification, property_logger
-            )
+            # الخطوتان 3 و4 تحت قفل المالك حتى لا يُصنَّف عقاران لنفس المالك كجديدين معاً
+            async with self._get_owner_lock(self._owner_key(property_data)):
+                # الخطوة 3: البحث في Notion للمطابقة (بدلاً من قاعدة البيانات المحلية)
+                classification = await self._classify_property_via_notion(property_data, property_logger)
+
+                # الخطوة 4: معالجة حسب التصنيف الجديد
+                success = await self._process_by_classification(
+                    property_data, classification, property_logger
+                )
             
             if success:
-                # إرسال إلى القناة الأرشيفية
-                await self._send_to_archive(property_data, property_logger)
+                # إرسال إلى القناة الأرشيفية (العقار المُضاف لطابور Zoho يُؤرشف بعد إرسال الطابور)
+                if not (self.zoho_service and property_data.status == PropertyStatus.SUCCESSFUL):
+                    await self._send_to_archive(property_data, property_logger)
                 
                 property_logger.log_processing_complete(True, property_data.status.value)
                 self.processing_stats["successful"] += 1
@@ -233,32 +467,14 @@ class PropertyProcessor:
             # تمرير الرقم التسلسلي للذكاء الاصطناعي
             enhanced_text = f"الرقم التسلسلي: {property_data.serial_number}\n\n{property_data.raw_text}"
             
-            extracted_data = await self.ai_service.extract_property_data(enhanced_text)
+            # البصمة تُحسب من النص الخام فقط حتى تتطابق الرسائل المعاد نشرها
+            extracted_data = await self.ai_service.extract_property_data(
+                enhanced_text, cache_text=property_data.raw_text,
+                serial_number=property_data.serial_number
+            )
             
             if extracted_data:
-                # تحديث بيانات العقار
-                temp_property = PropertyData.from_dict(extracted_data)
-                
-                # نسخ البيانات المستخرجة
-                property_data.region = temp_property.region
-                property_data.unit_code = temp_property.unit_code
-                property_data.unit_type = temp_property.unit_type
-                property_data.unit_condition = temp_property.unit_condition
-                property_data.area = temp_property.area
-                property_data.floor = temp_property.floor
-                property_data.price = temp_property.price
-                property_data.features = temp_property.features
-                property_data.address = temp_property.address
-                property_data.employee_name = temp_property.employee_name
-                property_data.owner_name = temp_property.owner_name
-                property_data.owner_phone = temp_property.owner_phone
-                property_data.availability = temp_property.availability
-                property_data.photos_status = temp_property.photos_status
-                property_data.full_details = temp_property.full_details
-                
-                # إنشاء البيان المدمج الجديد
-                property_data.statement = extracted_data.get("البيان", "")
-                property_data.ai_extracted = True
+                self._apply_extracted_data(property_data, extracted_data)
                 
                 property_logger.log_success("استخراج البيانات", "تم بنجاح")
                 return True
@@ -270,18 +486,80 @@ class PropertyProcessor:
             property_logger.log_error("استخراج البيانات", str(e))
             return False
     
+    def _apply_extracted_data(self, property_data: PropertyData, extracted_data: Dict[str, Any]):
+        """نسخ البيانات المستخرجة إلى العقار"""
+        
+        temp_property = PropertyData.from_dict(extracted_data)
+        
+        property_data.region = temp_property.region
+        property_data.unit_code = temp_property.unit_code
+        property_data.unit_type = temp_property.unit_type
+        property_data.unit_condition = temp_property.unit_condition
+        property_data.area = temp_property.area
+        property_data.floor = temp_property.floor
+        property_data.price = temp_property.price
+        property_data.features = temp_property.features
+        property_data.address = temp_property.address
+        property_data.employee_name = temp_property.employee_name
+        property_data.owner_name = temp_property.owner_name
+        property_data.owner_phone = temp_property.owner_phone
+        property_data.availability = temp_property.availability
+        property_data.photos_status = temp_property.photos_status
+        property_data.full_details = temp_property.full_details
+        
+        # إنشاء البيان المدمج الجديد
+        property_data.statement = extracted_data.get("البيان", "")
+        property_data.ai_extracted = True
+    
+    async def _prefetch_batch_extractions(self, properties: List[PropertyData]):
+        """استخراج مسبق للعقارات غير المستخرجة بدفعات متعددة الإعلانات"""
+        
+        to_extract = [p for p in properties if not p.ai_extracted and p.raw_text]
+        batch_size = self.config.AI_BATCH_SIZE
+        if batch_size <= 1 or len(to_extract) < 2:
+            return
+        
+        by_message_id = {p.telegram_message_id: p for p in to_extract}
+        chunks = [to_extract[i:i + batch_size] for i in range(0, len(to_extract), batch_size)]
+        semaphore = asyncio.Semaphore(self.config.PROCESSING_CONCURRENCY)
+        
+        async def extract_chunk(chunk: List[PropertyData]) -> Dict[int, Optional[Dict[str, Any]]]:
+            listings = [
+                {
+                    "telegram_message_id": p.telegram_message_id,
+                    "raw_text": p.raw_text,
+                    "serial_number": p.serial_number
+                }
+                for p in chunk
+            ]
+            async with semaphore:
+                # العناصر الفاشلة تبقى بدون استخراج لتمر بالمسار الفردي في process_property
+                return await self.ai_service.extract_property_data_batch(listings, fallback_single=False)
+        
+        extracted_count = 0
+        for chunk_results in await asyncio.gather(*(extract_chunk(c) for c in chunks)):
+            for message_id, extracted_data in chunk_results.items():
+                if extracted_data and message_id in by_message_id:
+                    self._apply_extracted_data(by_message_id[message_id], extracted_data)
+                    extracted_count += 1
+        
+        logger.info(
+            f"📦 استخراج بالدفعات: {extracted_count}/{len(to_extract)} عقار "
+            f"في {len(chunks)} طلب بدلاً من {len(to_extract)}"
+        )
+    
     async def _classify_property_via_notion(self, property_data: PropertyData, 
                                           property_logger: PropertyLogger) -> str:
-        """تصنيف العقار عبر البحث المباشر في Notion"""
+        """تصنيف العقار عبر المرآة المحلية لـ Notion"""
         
         try:
-            property_logger.log_processing_step("تصنيف العقار", "البحث في Notion")
+            property_logger.log_processing_step("تصنيف العقار", "البحث في مرآة Notion")
             
             if not self.notion_service:
                 property_logger.log_classification("عقار جديد", "Notion غير متاح")
                 return "عقار جديد"
             
-            # البحث عن عقارات مكررة (تطابق جميع الشروط)
+            # البحث عن عقارات مكررة (تطابق جميع الشروط) - استعلام محلي
             duplicate_properties = await self.notion_service.find_duplicate_properties(
                 property_data.owner_phone,
                 property_data.region,
@@ -296,7 +574,7 @@ class PropertyProcessor:
                 property_logger.log_classification("عقار مكرر", "وجد عقار مطابق تماماً في Notion")
                 return "عقار مكرر"
             
-            # البحث عن عقارات للمالك نفسه
+            # البحث عن عقارات للمالك نفسه - استعلام محلي
             owner_properties = await self.notion_service.find_owner_properties(property_data.owner_phone)
             
             if owner_properties:
@@ -340,27 +618,21 @@ class PropertyProcessor:
         """معالجة عقار جديد"""
         
         try:
-            # إنشاء صفحة مالك في Notion
-            owner_id = None
+            # إنشاء صفحة المالك ثم صفحة العقار بمحتواها في Notion (طلبان)
             if self.notion_service:
-                owner_id = await self.notion_service.create_owner_page(property_data.to_dict())
+                async with self.notion_semaphore:
+                    owner_id, property_id = await self.notion_service.create_owner_and_property(
+                        property_data.to_dict()
+                    )
                 property_data.notion_owner_id = owner_id
-                property_logger.log_success("إنشاء صفحة المالك", f"Notion ID: {owner_id}")
-            
-            # إنشاء صفحة عقار في Notion
-            if self.notion_service:
-                property_id = await self.notion_service.create_property_page(
-                    property_data.to_dict(), owner_id
-                )
                 property_data.notion_property_id = property_id
+                property_logger.log_success("إنشاء صفحة المالك", f"Notion ID: {owner_id}")
                 property_logger.log_success("إنشاء صفحة العقار", f"Notion ID: {property_id}")
             
-            # إرسال البيانات إلى Zoho موديول Aqar
+            # إضافة البيانات لطابور upsert موديول Aqar (يُرسل في نهاية الدورة)
             if self.zoho_service:
-                async with self.zoho_service as zoho:
-                    record_id = await zoho.create_record(property_data.to_dict())
-                    property_data.zoho_record_id = record_id
-                    property_logger.log_success("إنشاء السجل في Zoho", f"Aqar ID: {record_id}")
+                await self.zoho_service.queue_upsert(property_data)
+                property_logger.log_success("إضافة إلى طابور Zoho", "upsert في نهاية الدورة")
             
             # تحديث الحالة
             property_data.status = PropertyStatus.SUCCESSFUL
@@ -385,36 +657,28 @@ class PropertyProcessor:
             # البحث عن المالك الموجود في Notion
             existing_owner = None
             if self.notion_service:
-                existing_owner = await self.notion_service.search_owner(property_data.owner_phone)
+                async with self.notion_semaphore:
+                    existing_owner = await self.notion_service.search_owner(property_data.owner_phone)
             
             # إنشاء صفحة عقار جديدة مرتبطة بالمالك الموجود
             if self.notion_service and existing_owner:
-                property_id = await self.notion_service.create_property_page(
-                    property_data.to_dict(), existing_owner['id']
-                )
+                async with self.notion_semaphore:
+                    property_id = await self.notion_service.create_property_page(
+                        property_data.to_dict(), existing_owner['id']
+                    )
                 property_data.notion_property_id = property_id
                 property_data.notion_owner_id = existing_owner['id']
                 
                 # تحديث عدد عقارات المالك
-                await self.notion_service.update_owner_properties_count(existing_owner['id'])
+                async with self.notion_semaphore:
+                    await self.notion_service.update_owner_properties_count(existing_owner['id'])
                 
                 property_logger.log_success("ربط العقار بالمالك الموجود", f"Property: {property_id}")
             
-            # إرسال البيانات إلى Zoho مع تحديث السجل الموجود أو إنشاء جديد
+            # upsert في Zoho بمفتاح رقم المالك (إلحاق الوحدة بسجل المالك الموجود أو إنشاء جديد)
             if self.zoho_service:
-                async with self.zoho_service as zoho:
-                    existing_record = await zoho.search_record("Owner_Phone", property_data.owner_phone)
-                    
-                    if existing_record:
-                        # تحديث السجل الموجود بعقار إضافي
-                        await zoho.add_property_to_record(existing_record['id'], property_data.to_dict())
-                        property_data.zoho_record_id = existing_record['id']
-                        property_logger.log_success("تحديث السجل في Zoho", f"Aqar ID: {existing_record['id']}")
-                    else:
-                        # إنشاء سجل جديد
-                        record_id = await zoho.create_record(property_data.to_dict())
-                        property_data.zoho_record_id = record_id
-                        property_logger.log_success("إنشاء السجل في Zoho", f"Aqar ID: {record_id}")
+                await self.zoho_service.queue_upsert(property_data, merge_existing=True)
+                property_logger.log_success("إضافة إلى طابور Zoho", "upsert في نهاية الدورة")
             
             # تحديث الحالة
             property_data.status = PropertyStatus.SUCCESSFUL
@@ -437,14 +701,16 @@ class PropertyProcessor:
         
         try:
             # البحث عن العقار المطابق في Notion
-            duplicate_properties = await self.notion_service.find_duplicate_properties(
-                property_data.owner_phone,
-                property_data.region,
-                property_data.unit_type,
-                property_data.unit_condition,
-                property_data.area,
-                property_data.floor
-            ) if self.notion_service else []
+            duplicate_properties = []
+            if self.notion_service:
+                duplicate_properties = await self.notion_service.find_duplicate_properties(
+                    property_data.owner_phone,
+                    property_data.region,
+                    property_data.unit_type,
+                    property_data.unit_condition,
+                    property_data.area,
+                    property_data.floor
+                )
             
             similar_property = duplicate_properties[0] if duplicate_properties else None
             
@@ -542,7 +808,8 @@ class PropertyProcessor:
                 if property_data.telegram_message_id:
                     await telegram.add_message_tag(
                         property_data.telegram_message_id, 
-                        self.config.DUPLICATE_TAG
+                        self.config.DUPLICATE_TAG,
+                        property_data.raw_text
                     )
                 
                 property_logger.log_success("إرسال إشعار التكرار", classification)
@@ -594,7 +861,7 @@ class PropertyProcessor:
                     "اسم المالك": property_data.owner_name,
                     "رقم المالك": property_data.owner_phone,
                     "notion_id": property_data.notion_property_id,
-                    "zoho_id": property_data.zoho_record_id
+                    "zoho_id": property_data.zoho_lead_id
                 }
                 
                 import json
@@ -649,3 +916,10 @@ class PropertyProcessor:
             logger.info("🤖 مزودو الذكاء الاصطناعي المستخدمون:")
             for provider, count in self.processing_stats['ai_providers_used'].items():
                 logger.info(f"   {provider}: {count}")
+        
+        if self.ai_service:
+            retry_stats = self.ai_service.get_retry_stats()
+            logger.info(
+                f"   ⏱️ انتظار بين المحاولات: {retry_stats['sleep_seconds']} ثانية "
+                f"({retry_stats['avg_sleep_per_listing']} ثانية/إعلان، الأقصى {retry_stats['max_sleep_seconds']})"
+            )
@@ -5,6 +5,7 @@
 
 import os
 from datetime import datetime
+import config
 
 class RealConfig:
     """إعدادات النظام الحقيقي لمعالجة الرسائل"""
@@ -53,6 +54,66 @@ class RealConfig:
 
     PROCESSING_INTERVAL = 30  # ثانية
     MAX_RETRY_ATTEMPTS = 3
+    AI_RETRY_DELAY = int(os.getenv("AI_RETRY_DELAY", "15"))
+    AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "1"))
+    AI_RETRY_AFTER_MAX = float(os.getenv("AI_RETRY_AFTER_MAX", "60"))
+
+    # المعالجة المتوازية
+    PROCESSING_CONCURRENCY = int(os.getenv("PROCESSING_CONCURRENCY", "4"))
+    NOTION_CONCURRENCY = int(os.getenv("NOTION_CONCURRENCY", "3"))
+    ZOHO_CONCURRENCY = int(os.getenv("ZOHO_CONCURRENCY", "5"))
+
+    # المرآة المحلية لتصنيف العقارات (ثواني بين المزامنات)
+    NOTION_MIRROR_SYNC_INTERVAL = int(os.getenv("NOTION_MIRROR_SYNC_INTERVAL", "60"))
+
+    # حد معدل Notion ومجمع الاتصالات
+    NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+    NOTION_RATE_BURST = int(os.getenv("NOTION_RATE_BURST", "3"))
+    NOTION_HTTP_POOL_LIMIT = int(os.getenv("NOTION_HTTP_POOL_LIMIT", "10"))
+    NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "3"))
+    NOTION_OWNER_RECONCILE_INTERVAL = int(os.getenv("NOTION_OWNER_RECONCILE_INTERVAL", "21600"))
+
+    # السباق المتوازي بين مزودي الذكاء الاصطناعي
+    AI_RACE_MODE = os.getenv("AI_RACE_MODE", "false").lower() == "true"
+    AI_RACE_PROVIDERS = int(os.getenv("AI_RACE_PROVIDERS", "3"))
+    AI_HEDGE_PERCENTILE = float(os.getenv("AI_HEDGE_PERCENTILE", "95"))
+    AI_HEDGE_DELAY = float(os.getenv("AI_HEDGE_DELAY", "8"))
+
+    # صحة مزودي الذكاء الاصطناعي وقاطع الدائرة
+    AI_HEALTH_WINDOW = int(os.getenv("AI_HEALTH_WINDOW", "50"))
+    AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "3"))
+    AI_CIRCUIT_COOLDOWN = float(os.getenv("AI_CIRCUIT_COOLDOWN", "120"))
+    AI_HEALTH_PERSIST_INTERVAL = float(os.getenv("AI_HEALTH_PERSIST_INTERVAL", "30"))
+
+    # جلسة HTTP مشتركة لمزودي الذكاء الاصطناعي
+    AI_HTTP_POOL_LIMIT = int(os.getenv("AI_HTTP_POOL_LIMIT", "20"))
+    AI_HTTP_LIMIT_PER_HOST = int(os.getenv("AI_HTTP_LIMIT_PER_HOST", "5"))
+    AI_HTTP_KEEPALIVE = float(os.getenv("AI_HTTP_KEEPALIVE", "60"))
+    AI_HTTP_DNS_TTL = int(os.getenv("AI_HTTP_DNS_TTL", "300"))
+    AI_HTTP_CONNECT_TIMEOUT = float(os.getenv("AI_HTTP_CONNECT_TIMEOUT", "10"))
+    AI_HTTP_TIMEOUT = float(os.getenv("AI_HTTP_TIMEOUT", "60"))
+
+    # ذاكرة نتائج الاستخراج
+    EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(30 * 24 * 3600)))
+    EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "10000"))
+
+    # عدد الإعلانات في طلب ذكاء اصطناعي واحد (1 = تعطيل)
+    AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "5"))
+
+    # الاستخراج بالقواعد لإعلانات القالب قبل مزودي الذكاء الاصطناعي
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.9"))
+
+    # المناطق والموظفون والمميزات المعتمدة (نفس قوائم وفهرس config.py)
+    APPROVED_REGIONS = config.APPROVED_REGIONS
+    REGION_ALIASES = config.REGION_ALIASES
+    region_index = config.REGION_INDEX
+    APPROVED_EMPLOYEES = config.APPROVED_EMPLOYEES
+    APPROVED_FEATURES = config.APPROVED_FEATURES
+
+    # الانتظار الطويل في getUpdates (0 = تعطيل)
+    TELEGRAM_LONG_POLL_TIMEOUT = int(os.getenv("TELEGRAM_LONG_POLL_TIMEOUT", "30"))
+    TELEGRAM_POLL_ERROR_DELAY = float(os.getenv("TELEGRAM_POLL_ERROR_DELAY", "5"))  # أساس التراجع عند فشل الجلب
 
     # فلتر التاريخ
     APPLY_DATE_FILTER = False
@@ -60,6 +121,9 @@ class RealConfig:
 
     # قاعدة البيانات
     DATABASE_PATH = "real_estate_real.db"
+    DATABASE_PROFILE = "performance"  # default / safe / performance
+    DATABASE_FLUSH_INTERVAL_MS = 0  # انتظار كتابات إضافية قبل التثبيت
+    DATABASE_READ_POOL_SIZE = 4  # اتصالات القراءة فقط
 
     def validate(self) -> bool:
         """التحقق من صحة الإعدادات"""
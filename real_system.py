@@ -6,6 +6,7 @@
 
 import asyncio
 import sys
+import time
 from datetime import datetime
 from real_config import RealConfig
 from services.telegram_service import TelegramService
@@ -32,6 +33,12 @@ class RealEstateRealSystem:
         self.notion_service = None
         self.zoho_service = None
         
+        # آخر تحديث Telegram تم تأكيده
+        self._acknowledged_update_id = None
+        
+        # آخر مطابقة لأعداد عقارات الملاك
+        self._last_owner_reconcile = time.monotonic()
+        
         # إحصائيات
         self.stats = {
             "total_processed": 0,
@@ -52,11 +59,17 @@ class RealEstateRealSystem:
             raise Exception("إعدادات غير صحيحة")
         
         # تهيئة قاعدة البيانات
-        self.database = DatabaseManager(self.config.DATABASE_PATH)
+        self.database = DatabaseManager(
+            self.config.DATABASE_PATH,
+            self.config.DATABASE_PROFILE,
+            flush_interval_ms=self.config.DATABASE_FLUSH_INTERVAL_MS,
+            read_pool_size=self.config.DATABASE_READ_POOL_SIZE
+        )
         await self.database.initialize()
         
         # تهيئة الخدمات
-        self.ai_service = AIService(self.config)
+        self.ai_service = AIService(self.config, self.database)
+        await self.ai_service.start()
         self.telegram_service = TelegramService(self.config)
         
         # تهيئة Notion إذا كان متاحاً
@@ -66,8 +79,15 @@ class RealEstateRealSystem:
             self.notion_service = NotionService(
                 self.config.NOTION_INTEGRATION_SECRET,
                 self.config.NOTION_PROPERTIES_DB_ID,
-                self.config.NOTION_OWNERS_DB_ID
+                self.config.NOTION_OWNERS_DB_ID,
+                self.config.NOTION_MIRROR_SYNC_INTERVAL,
+                rate_limit=self.config.NOTION_RATE_LIMIT,
+                rate_burst=self.config.NOTION_RATE_BURST,
+                pool_limit=self.config.NOTION_HTTP_POOL_LIMIT,
+                max_retries=self.config.NOTION_MAX_RETRIES,
+                database=self.database
             )
+            await self.notion_service.sync_mirror(force=True)
             logger.info("✅ تم تهيئة خدمة Notion")
         else:
             logger.warning("⚠️ Notion غير مُعد - سيتم تخطيه")
@@ -81,8 +101,10 @@ class RealEstateRealSystem:
                 self.config.ZOHO_CLIENT_SECRET,
                 self.config.ZOHO_REFRESH_TOKEN,
                 self.config.ZOHO_ACCESS_TOKEN,
-                self.config.ZOHO_MODULE_NAME
+                self.config.ZOHO_MODULE_NAME,
+                database=self.database  # طابور upsert الدائم
             )
+            await self.zoho_service.start()
             logger.info("✅ تم تهيئة خدمة Zoho CRM")
         else:
             logger.warning("⚠️ Zoho CRM غير مُعد - سيتم تخطيه")
@@ -97,28 +119,44 @@ class RealEstateRealSystem:
         logger.info(f"📱 القناة: {self.config.TELEGRAM_CHANNEL_ID}")
         logger.info(f"🤖 مزودو AI متاحون: {', '.join(self.config.get_available_ai_providers())}")
         
+        fetch_errors = 0
         while self.is_running:
             try:
-                # جلب الرسائل الجديدة
+                # جلب الرسائل الجديدة (None عند فشل الجلب)
                 new_messages = await self._fetch_new_messages()
+                fetch_errors = fetch_errors + 1 if new_messages is None else 0
                 
+                saved = True
                 if new_messages:
                     logger.info(f"📥 تم العثور على {len(new_messages)} رسالة جديدة")
                     
-                    # معالجة كل رسالة
-                    for message in new_messages:
-                        if not self.is_running:
-                            break
-                        
-                        await self._process_single_message(message)
-                        await asyncio.sleep(2)  # توقف بين الرسائل
+                    # حفظ الرسائل دفعة واحدة
+                    saved = await self._save_new_messages(new_messages)
+                
+                # تأكيد التحديثات بعد حفظ الرسائل
+                if saved:
+                    await self._commit_update_offset()
                 
                 # معالجة العقارات المعلقة
                 await self._process_pending_properties()
                 
-                # انتظار قبل الدورة التالية
-                logger.info(f"⏳ انتظار {self.config.PROCESSING_INTERVAL} ثانية...")
-                await asyncio.sleep(self.config.PROCESSING_INTERVAL)
+                # مطابقة دورية لأعداد عقارات الملاك مع Notion
+                if (self.notion_service and
+                        time.monotonic() - self._last_owner_reconcile >= self.config.NOTION_OWNER_RECONCILE_INTERVAL):
+                    self._last_owner_reconcile = time.monotonic()
+                    await self.notion_service.reconcile_owner_counts()
+                
+                # تراجع أسي عند فشل الجلب المتتالي؛ الانتظار الطويل في getUpdates يغني عن النوم الثابت
+                if fetch_errors:
+                    delay = min(
+                        self.config.PROCESSING_INTERVAL,
+                        self.config.TELEGRAM_POLL_ERROR_DELAY * 2 ** (fetch_errors - 1)
+                    )
+                    logger.warning(f"⏳ فشل جلب الرسائل {fetch_errors} مرة متتالية - انتظار {delay:.0f} ثانية")
+                    await asyncio.sleep(delay)
+                elif self.config.TELEGRAM_LONG_POLL_TIMEOUT <= 0:
+                    logger.info(f"⏳ انتظار {self.config.PROCESSING_INTERVAL} ثانية...")
+                    await asyncio.sleep(self.config.PROCESSING_INTERVAL)
                 
             except KeyboardInterrupt:
                 logger.info("🛑 تم طلب إيقاف النظام...")
@@ -134,45 +172,90 @@ class RealEstateRealSystem:
         
         try:
             async with self.telegram_service as telegram:
-                # جلب الرسائل مع تطبيق الفلترة
-                messages = await telegram.get_channel_messages(limit=50, apply_filter=True)
+                # جلب الرسائل الجديدة فقط بعد آخر تحديث مؤكد
+                offset = await self.database.get_setting("telegram_update_offset")
+                messages = await telegram.get_channel_messages(
+                    limit=50,
+                    apply_filter=True,
+                    offset=int(offset) if offset else None,
+                    timeout=self.config.TELEGRAM_LONG_POLL_TIMEOUT
+                )
+                if messages is None:
+                    # فشل الجلب يُحسب في عداد الأخطاء لتطبيق التراجع
+                    return None
                 
-                new_messages = []
-                for message in messages:
-                    # التحقق من عدم معالجة الرسالة مسبقاً
-                    existing = await self.database.get_property_by_telegram_id(
-                        message['message_id']
-                    )
-                    
-                    if not existing and message['text'].strip():
-                        new_messages.append(message)
+                # التحقق من الرسائل المعالجة مسبقاً باستعلام واحد للدفعة
+                existing_ids = await self.database.get_existing_telegram_ids(
+                    [message['message_id'] for message in messages]
+                )
                 
-                return new_messages
+                return [
+                    message for message in messages
+                    if message['message_id'] not in existing_ids and message['text'].strip()
+                ]
                 
         except Exception as e:
             logger.error(f"❌ خطأ في جلب الرسائل: {e}")
-            return []
+            return None
     
-    async def _process_single_message(self, message):
-        """معالجة رسالة واحدة"""
+    async def _commit_update_offset(self):
+        """حفظ إزاحة Telegram وتأكيد التحديثات المعالجة"""
         
         try:
-            logger.info(f"📝 معالجة الرسالة {message['message_id']}")
+            last_update_id = self.telegram_service.last_update_id
+            if last_update_id is None or last_update_id == self._acknowledged_update_id:
+                return
             
-            # إنشاء عقار جديد
-            property_data = PropertyData()
-            property_data.telegram_message_id = message['message_id']
-            property_data.raw_text = message['text']
-            property_data.status = PropertyStatus.PENDING
-            property_data.serial_number = await self._get_next_serial()
+            await self.database.set_setting("telegram_update_offset", str(last_update_id + 1))
+            async with self.telegram_service as telegram:
+                await telegram.acknowledge_updates(last_update_id)
+            self._acknowledged_update_id = last_update_id
+                
+        except Exception as e:
+            logger.error(f"❌ خطأ في تأكيد تحديثات Telegram: {e}")
+    
+    async def _save_new_messages(self, messages) -> bool:
+        """حفظ الرسائل الجديدة كعقارات معلقة في معاملة واحدة"""
+        
+        try:
+            next_serial = await self._get_next_serial()
+            
+            properties = []
+            for offset, message in enumerate(messages):
+                # إنشاء عقار جديد
+                property_data = PropertyData()
+                property_data.telegram_message_id = message['message_id']
+                property_data.raw_text = message['text']
+                property_data.status = PropertyStatus.PENDING
+                property_data.serial_number = next_serial + offset
+                properties.append(property_data)
             
             # حفظ في قاعدة البيانات
-            await self.database.save_property(property_data)
+            inserted = await self.database.save_properties_bulk(properties)
             
-            logger.info(f"✅ تم استلام الرسالة {message['message_id']}")
+            for message_id in inserted:
+                logger.info(f"✅ تم استلام الرسالة {message_id}")
+            return True
             
         except Exception as e:
-            logger.error(f"❌ خطأ في معالجة الرسالة {message['message_id']}: {e}")
+            logger.error(f"❌ خطأ في حفظ الرسائل الجديدة: {e}")
+            return False
+    
+    async def _flush_zoho_upserts(self):
+        """إرسال طابور upsert في Zoho وحفظ معرفات السجلات"""
+        
+        if not self.zoho_service:
+            return
+        
+        try:
+            # معرفات السجلات تُحفظ في قاعدة البيانات وتبقى الإخفاقات في الطابور للدفعة التالية
+            async with self.zoho_service as zoho:
+                updated = await zoho.flush_upserts(self.config.MAX_RETRY_ATTEMPTS)
+            
+            logger.info(f"✅ تم تحديث {len(updated)} سجل في Zoho")
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في إرسال طابور Zoho: {e}")
     
     async def _process_pending_properties(self):
         """معالجة العقارات المعلقة"""
@@ -201,6 +284,9 @@ class RealEstateRealSystem:
                         self._print_stats()
                     
                     await asyncio.sleep(1)
+                
+                # إرسال طابور Zoho للدفعة
+                await self._flush_zoho_upserts()
         
         except Exception as e:
             logger.error(f"❌ خطأ في معالجة العقارات المعلقة: {e}")
@@ -213,7 +299,9 @@ class RealEstateRealSystem:
             
             # الخطوة 1: استخراج البيانات بالذكاء الاصطناعي
             if not property_data.ai_extracted:
-                extracted = await self.ai_service.extract_property_data(property_data.raw_text)
+                extracted = await self.ai_service.extract_property_data(
+                    property_data.raw_text, serial_number=property_data.serial_number
+                )
                 
                 if not extracted:
                     logger.error(f"❌ فشل استخراج البيانات للعقار {property_data.telegram_message_id}")
@@ -278,12 +366,19 @@ class RealEstateRealSystem:
         """تصنيف العقار"""
         
         if self.notion_service:
-            # البحث في Notion
-            duplicates = await self.notion_service.search_property(property_data.to_dict())
+            # البحث في المرآة المحلية لـ Notion
+            duplicates = await self.notion_service.find_duplicate_properties(
+                property_data.owner_phone,
+                property_data.region,
+                property_data.unit_type,
+                property_data.unit_condition,
+                property_data.area,
+                property_data.floor
+            )
             if duplicates:
                 return "عقار مكرر"
             
-            owner_properties = await self.notion_service.search_owner(property_data.owner_phone)
+            owner_properties = await self.notion_service.find_owner_properties(property_data.owner_phone)
             if owner_properties:
                 return "عقار متعدد"
         
@@ -312,22 +407,17 @@ class RealEstateRealSystem:
         try:
             # إنشاء في Notion
             if self.notion_service:
-                owner_id = await self.notion_service.create_owner_page(property_data.to_dict())
-                property_data.notion_owner_id = owner_id
-                
-                property_id = await self.notion_service.create_property_page(
-                    property_data.to_dict(), owner_id
+                owner_id, property_id = await self.notion_service.create_owner_and_property(
+                    property_data.to_dict()
                 )
+                property_data.notion_owner_id = owner_id
                 property_data.notion_property_id = property_id
                 
                 logger.info(f"✅ تم إنشاء صفحات Notion: Owner={owner_id}, Property={property_id}")
             
-            # إنشاء في Zoho
+            # إضافة لطابور upsert في Zoho (يُرسل بعد معالجة الدفعة)
             if self.zoho_service:
-                async with self.zoho_service as zoho:
-                    record_id = await zoho.create_record(property_data.to_dict())
-                    property_data.zoho_record_id = record_id
-                    logger.info(f"✅ تم إنشاء سجل Zoho: {record_id}")
+                await self.zoho_service.queue_upsert(property_data)
             
             return True
             
@@ -354,19 +444,9 @@ class RealEstateRealSystem:
                     await self.notion_service.update_owner_properties_count(existing_owner['id'])
                     logger.info(f"✅ تم ربط العقار بالمالك الموجود: {property_id}")
             
-            # تحديث في Zoho
+            # upsert في Zoho بمفتاح رقم المالك (يُرسل بعد معالجة الدفعة)
             if self.zoho_service:
-                async with self.zoho_service as zoho:
-                    existing_record = await zoho.search_record("Owner_Phone", property_data.owner_phone)
-                    
-                    if existing_record:
-                        await zoho.add_property_to_record(existing_record['id'], property_data.to_dict())
-                        property_data.zoho_record_id = existing_record['id']
-                    else:
-                        record_id = await zoho.create_record(property_data.to_dict())
-                        property_data.zoho_record_id = record_id
-                    
-                    logger.info(f"✅ تم تحديث سجل Zoho للعقار المتعدد")
+                await self.zoho_service.queue_upsert(property_data, merge_existing=True)
             
             self.stats["multiple"] += 1
             return True
@@ -426,7 +506,8 @@ class RealEstateRealSystem:
                 if property_data.telegram_message_id:
                     await telegram.add_message_tag(
                         property_data.telegram_message_id, 
-                        self.config.DUPLICATE_TAG
+                        self.config.DUPLICATE_TAG,
+                        property_data.raw_text
                     )
                 
                 # إرسال إشعار التكرار
@@ -494,6 +575,13 @@ class RealEstateRealSystem:
         """تنظيف الموارد"""
         
         self.is_running = False
+        await self._flush_zoho_upserts()
+        if self.zoho_service:
+            await self.zoho_service.close()
+        if self.ai_service:
+            await self.ai_service.close()
+        if self.notion_service:
+            await self.notion_service.close()
         if self.database:
             await self.database.close()
         
@@ -4,21 +4,103 @@
 
 import json
 import asyncio
+import hashlib
+import math
+import random
 import re
-from typing import Dict, Any, Optional, List
+import time
+import unicodedata
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, List, Tuple
 import aiohttp
-from datetime import datetime
+from datetime import datetime, timezone
 import anthropic
 from anthropic import Anthropic
+from services.fast_extractor import FastPathExtractor
+from services.provider_health import ProviderHealthTracker, SUCCESS, FAILURE, PARSE_FAILURE
+from utils.arabic_text import ApprovedTermsMatcher, normalize_arabic
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# التشكيل العربي والتطويل
+_ARABIC_DIACRITICS = re.compile(r'[\u064B-\u0652\u0670\u0640]')
+
+def normalize_listing_text(raw_text: str) -> str:
+    """تطبيع نص الإعلان لحساب البصمة (المسافات والتشكيل والرموز التعبيرية)"""
+
+    text = unicodedata.normalize("NFKC", raw_text or "")
+    text = _ARABIC_DIACRITICS.sub("", text)
+
+    # حذف الرموز التعبيرية والرموز ومحارف التحكم
+    text = "".join(
+        char for char in text
+        if char.isspace() or not unicodedata.category(char).startswith(("S", "C"))
+    )
+
+    return " ".join(text.split()).lower()
+
+def listing_content_hash(raw_text: str) -> str:
+    """بصمة SHA-256 للنص المُطبَّع"""
+    return hashlib.sha256(normalize_listing_text(raw_text).encode("utf-8")).hexdigest()
+
+class ProviderError(Exception):
+    """خطأ من مزود ذكاء اصطناعي"""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status = status
+
+class RateLimitedError(ProviderError):
+    """تجاوز حد المعدل (429) - مع مدة Retry-After إن وُجدت"""
+
+    def __init__(self, provider: str, message: str, status: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(provider, message, status)
+        self.retry_after = retry_after
+
+class TransientProviderError(ProviderError):
+    """خطأ مؤقت (5xx أو انتهاء المهلة أو انقطاع الاتصال) - تُعاد المحاولة بتراجع أسي"""
+
+class PermanentProviderError(ProviderError):
+    """خطأ دائم (مفتاح غير صالح أو طلب مرفوض) - لا فائدة من إعادة المحاولة"""
+
+class BadOutputError(ProviderError):
+    """استجابة لا يمكن تحليلها إلى بيانات عقار - تُعاد فوراً بتعليمات أكثر صرامة"""
+
+# رقم المالك الافتراضي عند عدم وجوده في الإعلان (ليس رقماً حقيقياً)
+DEFAULT_OWNER_PHONE = "01000000000"
+
+# أنماط التحليل المنطقي (على النص المُطبَّع)
+_PHONE_PATTERN = re.compile(r'01[0-9]{9}')
+_PRICE_PATTERNS = [
+    re.compile(r'(\d+)\s*الف'),
+    re.compile(r'(\d+),000'),
+    re.compile(r'(\d{4,})')
+]
+_AREA_PATTERN = re.compile(r'(\d+)\s*متر')
+
+# كلمات مختصرة تدل على منطقة معتمدة
+_REGION_KEYWORDS = {
+    'تجمع': 'احياء تجمع',
+    'جاردينيا': 'جاردينيا هايتس'
+}
+
+# تعليمات إضافية لإعادة المحاولة بعد استجابة غير صالحة
+_STRICT_EXTRACTION_RULES = """
+تنبيه: الاستجابة السابقة لم تكن JSON صالحاً.
+- أرجع كائن JSON واحداً فقط يبدأ بـ { وينتهي بـ } بدون أي شرح أو علامات ```
+- الحقول "المنطقة" و"نوع الوحدة" و"حالة الوحدة" إلزامية ولا تُترك فارغة
+- استخدم علامات تنصيص مزدوجة لجميع المفاتيح والقيم
+"""
+
 class AIService:
     """خدمة معالجة النصوص بالذكاء الاصطناعي مع عدة مزودين"""
 
-    def __init__(self, config):
+    def __init__(self, config, database=None):
         self.config = config
+        self.database = database  # لذاكرة نتائج الاستخراج (اختياري)
 
         # تهيئة جميع مزودي الذكاء الاصطناعي
         self.anthropic_client = None
@@ -26,46 +108,422 @@ class AIService:
             self.anthropic_client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
 
         self.ai_providers = [
-            {"name": "Gemini", "key": config.GEMINI_API_KEY, "method": self._extract_with_gemini},
-            {"name": "OpenAI", "key": config.OPENAI_API_KEY, "method": self._extract_with_openai},
-            {"name": "Copilot", "key": config.COPILOT_API_KEY, "method": self._extract_with_copilot},
-            {"name": "Mistral", "key": config.MISTRAL_API_KEY, "method": self._extract_with_mistral},
-            {"name": "Groq", "key": config.GROQ_API_KEY, "method": self._extract_with_groq}
+            {"name": "Gemini", "key": config.GEMINI_API_KEY, "complete": self._complete_with_gemini},
+            {"name": "OpenAI", "key": config.OPENAI_API_KEY, "complete": self._complete_with_openai},
+            {"name": "Copilot", "key": config.COPILOT_API_KEY, "complete": self._complete_with_copilot},
+            {"name": "Mistral", "key": config.MISTRAL_API_KEY, "complete": self._complete_with_mistral},
+            {"name": "Groq", "key": config.GROQ_API_KEY, "complete": self._complete_with_groq}
         ]
 
         # فلترة المزودين المتاحين فقط
         self.available_providers = [p for p in self.ai_providers if p["key"]]
 
-    async def extract_property_data(self, raw_text: str, allow_logical_analysis: bool = True) -> Optional[Dict[str, Any]]:
+        # صحة المزودين: نسب النجاح وأزمنة الاستجابة وقاطع الدائرة (لترتيب المزودين ومهلة التحوط)
+        self.provider_health = ProviderHealthTracker(
+            [p["name"] for p in self.ai_providers],
+            window=config.AI_HEALTH_WINDOW,
+            failure_threshold=config.AI_CIRCUIT_FAILURE_THRESHOLD,
+            cooldown=config.AI_CIRCUIT_COOLDOWN
+        )
+        self._health_saved_at = 0.0
+
+        # مطابق المناطق والموظفين والمميزات المعتمدة (مرور واحد على النص)
+        self.approved_terms = ApprovedTermsMatcher(
+            config, region_aliases={**config.REGION_ALIASES, **_REGION_KEYWORDS}
+        )
+
+        # المسار السريع بالقواعد لإعلانات القالب (قبل أي مزود)
+        self.fast_path = FastPathExtractor(self.approved_terms) if config.FAST_PATH_ENABLED else None
+        self.fast_path_stats = {"listings": 0, "hits": 0, "ai_calls_saved": 0}
+
+        # الوقت الضائع في الانتظار بين المحاولات
+        self.retry_stats = {
+            "listings": 0,
+            "listings_with_sleep": 0,
+            "sleep_seconds": 0.0,
+            "max_sleep_seconds": 0.0
+        }
+
+        # جلسة HTTP مشتركة طويلة العمر (تُنشأ عند start أو عند أول طلب)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """إنشاء جلسة HTTP المشتركة مع تجميع الاتصالات"""
+
+        if self.session and not self.session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.config.AI_HTTP_POOL_LIMIT,
+            limit_per_host=self.config.AI_HTTP_LIMIT_PER_HOST,
+            keepalive_timeout=self.config.AI_HTTP_KEEPALIVE,
+            ttl_dns_cache=self.config.AI_HTTP_DNS_TTL,
+            use_dns_cache=True
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=self.config.AI_HTTP_TIMEOUT,
+            connect=self.config.AI_HTTP_CONNECT_TIMEOUT
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.info("🔌 تم إنشاء جلسة HTTP المشتركة لمزودي الذكاء الاصطناعي")
+
+        # استعادة صحة المزودين المحفوظة حتى لا يبدأ التشغيل البارد من الصفر
+        if self.database:
+            self.provider_health.load_json(await self.database.get_setting("ai_provider_health"))
+
+    async def close(self):
+        """إغلاق جلسة HTTP المشتركة"""
+
+        await self._save_provider_health(force=True)
+
+        if self.session and not self.session.closed:
+            await self.session.close()
+            logger.info("🔌 تم إغلاق جلسة HTTP لمزودي الذكاء الاصطناعي")
+        self.session = None
+
+    async def _save_provider_health(self, force: bool = False):
+        """حفظ صحة المزودين في إعدادات النظام (مرة كل AI_HEALTH_PERSIST_INTERVAL ثانية)"""
+
+        if not self.database:
+            return
+        now = time.monotonic()
+        if not force and now - self._health_saved_at < self.config.AI_HEALTH_PERSIST_INTERVAL:
+            return
+        self._health_saved_at = now
+        await self.database.set_setting("ai_provider_health", self.provider_health.to_json())
+
+    def get_fast_path_stats(self) -> Dict[str, Any]:
+        """إحصائيات المسار السريع ونسبة الإعلانات التي لم تحتج مزوداً"""
+
+        stats = dict(self.fast_path_stats)
+        stats["hit_rate"] = round(stats["hits"] / stats["listings"], 3) if stats["listings"] else 0.0
+        return stats
+
+    def _extract_with_fast_path(self, raw_text: str) -> Optional[Dict[str, Any]]:
+        """الاستخراج بالقواعد إذا تجاوزت الثقة FAST_PATH_MIN_CONFIDENCE (وإلا None للتصعيد للمزودين)"""
+
+        if not self.fast_path:
+            return None
+
+        self.fast_path_stats["listings"] += 1
+        result, confidence = self.fast_path.extract(raw_text)
+        if not result or confidence < self.config.FAST_PATH_MIN_CONFIDENCE:
+            logger.info(f"🧩 ثقة المسار السريع {confidence:.2f} - التصعيد لمزودي الذكاء الاصطناعي")
+            return None
+
+        self.fast_path_stats["hits"] += 1
+        self._fill_default_values(result)
+        result["كود الوحدة"] = self._generate_unit_code(result)
+        logger.info(f"⚡ استخراج سريع بالقواعد (ثقة {confidence:.2f}) - بدون استدعاء أي مزود")
+        return result
+
+    def get_retry_stats(self) -> Dict[str, Any]:
+        """إحصائيات الانتظار بين المحاولات لكل إعلان"""
+
+        stats = dict(self.retry_stats)
+        stats["sleep_seconds"] = round(stats["sleep_seconds"], 2)
+        stats["max_sleep_seconds"] = round(stats["max_sleep_seconds"], 2)
+        stats["avg_sleep_per_listing"] = (
+            round(self.retry_stats["sleep_seconds"] / stats["listings"], 2) if stats["listings"] else 0.0
+        )
+        return stats
+
+    def _record_retry_sleep(self, sleep_seconds: float):
+        """تسجيل وقت الانتظار الكلي لإعلان واحد"""
+
+        self.retry_stats["listings"] += 1
+        if sleep_seconds > 0:
+            self.retry_stats["listings_with_sleep"] += 1
+            self.retry_stats["sleep_seconds"] += sleep_seconds
+            self.retry_stats["max_sleep_seconds"] = max(self.retry_stats["max_sleep_seconds"], sleep_seconds)
+            logger.info(f"⏱️ انتظار {sleep_seconds:.1f} ثانية بين المحاولات لهذا الإعلان")
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """تراجع أسي مع تشويش كامل: عشوائي بين 0 و min(الحد الأقصى، الأساس × 2^المحاولة)"""
+        ceiling = min(self.config.AI_RETRY_DELAY, self.config.AI_RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def get_provider_health(self) -> Dict[str, Dict[str, Any]]:
+        """ملخص صحة المزودين المتاحين"""
+        snapshot = self.provider_health.snapshot()
+        return {p["name"]: snapshot[p["name"]] for p in self.available_providers}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """الحصول على الجلسة المشتركة (إنشاؤها عند الحاجة)"""
+
+        if not self.session or self.session.closed:
+            await self.start()
+        return self.session
+
+    async def extract_property_data(self, raw_text: str, allow_logical_analysis: bool = True,
+                                    cache_text: Optional[str] = None,
+                                    serial_number: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """استخراج بيانات العقار من النص الخام مع سلسلة المزودين"""
 
+        # serial_number: الرقم التسلسلي للإعلان الحالي (يدخل في كود الوحدة)
+        # إعلانات القالب لا تحتاج ذاكرة مؤقتة ولا مزوداً
+        result = self._extract_with_fast_path(raw_text)
+        if result:
+            self.fast_path_stats["ai_calls_saved"] += 1
+            return self._finalize_extraction(result, serial_number)
+
+        # cache_text: النص الذي تُحسب منه بصمة الذاكرة المؤقتة (افتراضياً raw_text)
+        content_hash = None
+        if self.database:
+            content_hash = listing_content_hash(cache_text if cache_text is not None else raw_text)
+            cached = await self.database.get_cached_extraction(
+                content_hash, self.config.EXTRACTION_CACHE_TTL
+            )
+            if cached:
+                logger.info("💾 تم استخدام نتيجة استخراج محفوظة - بدون استدعاء أي مزود")
+                return self._finalize_extraction(cached, serial_number)
+
         logger.info("🤖 بدء سلسلة استخراج البيانات بالذكاء الاصطناعي")
 
-        # تجربة كل مزود بالتتابع
-        for provider in self.available_providers:
-            logger.info(f"🔄 تجربة {provider['name']}...")
+        result = await self._extract_with_providers(raw_text)
+        if result:
+            if content_hash:
+                await self._save_cached_extraction(content_hash, result)
+            return self._finalize_extraction(result, serial_number)
 
-            # 3 محاولات لكل مزود
-            for attempt in range(3):
-                try:
-                    logger.info(f"📝 المحاولة {attempt + 1}/3 مع {provider['name']}")
+        result = await self._fallback_after_providers(raw_text, allow_logical_analysis)
+        return self._finalize_extraction(result, serial_number) if result else None
 
-                    result = await provider["method"](raw_text)
-                    if result:
-                        logger.info(f"✅ نجح استخراج البيانات مع {provider['name']}")
+    def _finalize_extraction(self, result: Dict[str, Any], serial_number: Optional[int]) -> Dict[str, Any]:
+        """ربط النتيجة بالإعلان الحالي: الرقم التسلسلي وكود الوحدة والبيان المدمج"""
+
+        result["serial_number"] = serial_number or 1
+        result["كود الوحدة"] = self._generate_unit_code(result)
+        result["البيان"] = self._generate_property_statement(result)
+        return result
+
+    async def _save_cached_extraction(self, content_hash: str, result: Dict[str, Any]):
+        """حفظ النتيجة في الذاكرة المؤقتة بدون الحقول الخاصة بالإعلان"""
+
+        # الإعلان المعاد نشره له نفس البصمة لكن رقم تسلسلي وكود وحدة مختلفان
+        payload = {
+            key: value for key, value in result.items()
+            if key not in ("serial_number", "كود الوحدة", "البيان")
+        }
+        await self.database.save_cached_extraction(
+            content_hash, payload,
+            self.config.EXTRACTION_CACHE_TTL,
+            self.config.EXTRACTION_CACHE_MAX_ENTRIES
+        )
+
+    async def _extract_with_providers(self, raw_text: str) -> Optional[Dict[str, Any]]:
+        """تشغيل سلسلة المزودين (بالتتابع أو بوضع السباق) وإرجاع أول نتيجة صالحة"""
+
+        if self.config.AI_RACE_MODE:
+            # وضع السباق: أول استجابة صالحة من أسرع مزود
+            race_result = await self._extract_with_race(raw_text)
+            if race_result:
+                provider_name, result = race_result
+                logger.info(f"✅ نجح استخراج البيانات مع {provider_name} (وضع السباق)")
+                return result
+
+            return None
 
-                        # إضافة حقل البيان المدمج
-                        result["البيان"] = self._generate_property_statement(result)
+        sleep_seconds = 0.0
+        try:
+            # تجربة المزودين بالتتابع - الأسرع بين السليمين أولاً وتخطي الدوائر المفتوحة
+            for provider in self.provider_health.ordered(self.available_providers):
+                logger.info(f"🔄 تجربة {provider['name']}...")
+
+                # 3 محاولات لكل مزود (محاولة اختبار واحدة للدائرة نصف المفتوحة)
+                attempts = 1 if self.provider_health.is_probe(provider["name"]) else 3
+                strict = False
+                for attempt in range(attempts):
+                    try:
+                        logger.info(f"📝 المحاولة {attempt + 1}/{attempts} مع {provider['name']}")
+
+                        result = await self._call_provider(provider, raw_text, strict=strict)
+                        logger.info(f"✅ نجح استخراج البيانات مع {provider['name']}")
                         return result
 
-                except Exception as e:
-                    logger.warning(f"⚠️ فشل {provider['name']} - المحاولة {attempt + 1}: {e}")
+                    except PermanentProviderError as e:
+                        logger.warning(f"⛔ خطأ دائم من {e} - لا فائدة من إعادة المحاولة")
+                        break
+
+                    except BadOutputError as e:
+                        # إعادة فورية بتعليمات أكثر صرامة
+                        logger.warning(f"⚠️ استجابة غير صالحة من {e} - إعادة فورية بتعليمات أكثر صرامة")
+                        strict = True
+                        delay = 0.0
+
+                    except RateLimitedError as e:
+                        delay = e.retry_after if e.retry_after is not None else self._backoff_delay(attempt)
+                        if delay > self.config.AI_RETRY_AFTER_MAX:
+                            logger.warning(f"⏳ {e} - Retry-After {delay:.0f} ثانية أطول من المسموح، الانتقال للمزود التالي")
+                            break
+                        logger.warning(f"⏳ {e} - إعادة المحاولة بعد {delay:.1f} ثانية")
+
+                    except Exception as e:
+                        delay = self._backoff_delay(attempt)
+                        logger.warning(f"⚠️ فشل {provider['name']} - المحاولة {attempt + 1}: {e}")
+
+                    # الدائرة فُتحت - الانتقال للمزود التالي دون انتظار
+                    if self.provider_health.is_open(provider["name"]):
+                        logger.warning(f"⚡ فتح قاطع الدائرة لـ {provider['name']} - تخطيه مؤقتاً")
+                        break
+
+                    # تراجع أسي مع تشويش بين المحاولات (لا انتظار بعد المحاولة الأخيرة)
+                    if attempt < attempts - 1 and delay > 0:
+                        await asyncio.sleep(delay)
+                        sleep_seconds += delay
+
+                logger.error(f"❌ فشل {provider['name']} في جميع المحاولات")
+
+            return None
+
+        finally:
+            self._record_retry_sleep(sleep_seconds)
+
+    async def extract_property_data_batch(self, listings: List[Dict[str, Any]],
+                                          fallback_single: bool = True) -> Dict[int, Optional[Dict[str, Any]]]:
+        """استخراج بيانات عدة إعلانات بطلب واحد لكل دفعة من AI_BATCH_SIZE إعلان"""
+
+        # كل عنصر: telegram_message_id وraw_text وserial_number (اختياري)
+        # العناصر الفاشلة تُعاد بطلبات فردية، أو تُرجع None إذا كان fallback_single معطلاً
+        results: Dict[int, Optional[Dict[str, Any]]] = {}
+        pending: List[Dict[str, Any]] = []
+
+        # إعلانات القالب والإعلانات المحفوظة في الذاكرة المؤقتة لا تدخل الدفعة
+        fast_hits = 0
+        for listing in listings:
+            result = self._extract_with_fast_path(listing["raw_text"])
+            if result:
+                fast_hits += 1
+                results[listing["telegram_message_id"]] = self._finalize_extraction(
+                    result, listing.get("serial_number")
+                )
+                continue
+
+            cached = None
+            if self.database:
+                listing["content_hash"] = listing_content_hash(listing["raw_text"])
+                cached = await self.database.get_cached_extraction(
+                    listing["content_hash"], self.config.EXTRACTION_CACHE_TTL
+                )
+
+            if cached:
+                results[listing["telegram_message_id"]] = self._finalize_extraction(
+                    cached, listing.get("serial_number")
+                )
+            else:
+                pending.append(listing)
+
+        batch_size = max(1, self.config.AI_BATCH_SIZE)
+        if fast_hits:
+            # عدد طلبات الدفعات التي لم تعد لازمة
+            self.fast_path_stats["ai_calls_saved"] += (
+                math.ceil((len(pending) + fast_hits) / batch_size) - math.ceil(len(pending) / batch_size)
+            )
+
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            batch_results = await self._extract_batch_with_providers(batch)
+
+            for listing in batch:
+                message_id = listing["telegram_message_id"]
+                result = batch_results.get(message_id)
+
+                if result and listing.get("content_hash"):
+                    await self._save_cached_extraction(listing["content_hash"], result)
+
+                if result:
+                    result = self._finalize_extraction(result, listing.get("serial_number"))
+                elif fallback_single:
+                    logger.info(f"↩️ إعادة الإعلان {message_id} بطلب فردي")
+                    result = await self.extract_property_data(
+                        f"الرقم التسلسلي: {listing.get('serial_number')}\n\n{listing['raw_text']}",
+                        cache_text=listing["raw_text"],
+                        serial_number=listing.get("serial_number")
+                    )
+
+                results[message_id] = result
+
+        return results
+
+    async def _extract_batch_with_providers(self, batch: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """إرسال دفعة واحدة لأول مزود ينجح وتقسيم مصفوفة JSON الناتجة"""
+
+        prompt = self._get_batch_extraction_prompt(batch)
+        max_tokens = min(1000 * len(batch), 8000)
+
+        for provider in self.provider_health.ordered(self.available_providers):
+            started = time.monotonic()
+            outcome, latency = FAILURE, None
+            try:
+                logger.info(f"📦 إرسال دفعة من {len(batch)} إعلان إلى {provider['name']}")
+                content = await provider["complete"](prompt, max_tokens=max_tokens)
+                if not content:
+                    continue
+
+                results = self._parse_batch_response(content, batch)
+                if not results:
+                    outcome = PARSE_FAILURE
+                    continue
+
+                # زمن الدفعة لا يمثل زمن الإعلان الواحد - يُسجل منفصلاً عن قياسات الترتيب
+                outcome, latency = SUCCESS, time.monotonic() - started
+                logger.info(
+                    f"✅ {provider['name']}: {len(results)}/{len(batch)} إعلان صالح في طلب واحد"
+                )
+                return results
+
+            except BadOutputError as e:
+                outcome = PARSE_FAILURE
+                logger.warning(f"⚠️ استجابة دفعة غير صالحة من {e}")
+
+            except Exception as e:
+                logger.warning(f"⚠️ فشل {provider['name']} في استخراج الدفعة: {e}")
+
+            finally:
+                self.provider_health.record(provider["name"], outcome, latency, batch=True)
+                await self._save_provider_health()
+
+        return {}
+
+    def _parse_batch_response(self, content: str, batch: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """تحليل مصفوفة JSON والتحقق من كل عنصر على حدة"""
+
+        start_idx = content.find('[')
+        end_idx = content.rfind(']') + 1
+        if start_idx == -1 or end_idx == 0:
+            logger.error("❌ لم يتم العثور على مصفوفة JSON في استجابة الدفعة")
+            return {}
+
+        try:
+            elements = json.loads(content[start_idx:end_idx])
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ خطأ في تحليل مصفوفة JSON: {e}")
+            return {}
+
+        serials = {listing["telegram_message_id"]: listing.get("serial_number") for listing in batch}
+        results = {}
 
-                # فاصل زمني 15 ثانية بين المحاولات
-                if attempt < 2:
-                    await asyncio.sleep(15)
+        for element in elements if isinstance(elements, list) else []:
+            if not isinstance(element, dict):
+                continue
 
-            logger.error(f"❌ فشل {provider['name']} في جميع المحاولات")
+            try:
+                message_id = int(element.pop("telegram_message_id", None))
+            except (TypeError, ValueError):
+                continue
+
+            if message_id not in serials:
+                continue
+
+            element["serial_number"] = serials[message_id] or 1
+            property_data = self._validate_extracted_data(element)
+            if property_data:
+                results[message_id] = property_data
+
+        return results
+
+    async def _fallback_after_providers(self, raw_text: str, allow_logical_analysis: bool) -> Optional[Dict[str, Any]]:
+        """المسار الاحتياطي بعد فشل جميع المزودين"""
 
         # في حال فشل جميع المزودين
         logger.warning("⚠️ فشل جميع مزودي الذكاء الاصطناعي")
@@ -80,71 +538,199 @@ class AIService:
 
         return None
 
-    async def _extract_with_gemini(self, raw_text: str) -> Optional[Dict[str, Any]]:
-        """استخراج البيانات باستخدام Gemini"""
+    async def _call_provider(self, provider: Dict[str, Any], raw_text: str,
+                             strict: bool = False) -> Dict[str, Any]:
+        """استدعاء مزود واحد وتسجيل النتيجة وزمن الاستجابة في صحة المزود"""
 
-        if not self.config.GEMINI_API_KEY:
+        # فشل الاتصال يُسجل منفصلاً عن فشل تحليل الاستجابة؛ الفشل يُرفع كخطأ ProviderError
+        started = time.monotonic()
+        outcome, latency = FAILURE, None
+        try:
+            content = await provider["complete"](self._get_extraction_prompt(strict) + "\n\n" + raw_text)
+            if not content:
+                raise PermanentProviderError(provider["name"], "المزود لم يُرجع أي استجابة")
+
+            result = self._parse_json_response(content)
+            if not result:
+                raise BadOutputError(provider["name"], "تعذر تحليل الاستجابة إلى بيانات عقار")
+
+            outcome, latency = SUCCESS, time.monotonic() - started
+            return result
+
+        except BadOutputError:
+            outcome = PARSE_FAILURE
+            raise
+
+        finally:
+            # الإلغاء (خسارة السباق) ليس فشلاً للمزود
+            if not (outcome == FAILURE and asyncio.current_task().cancelling()):
+                self.provider_health.record(provider["name"], outcome, latency)
+                await self._save_provider_health()
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """قراءة Retry-After (ثوانٍ أو تاريخ HTTP)"""
+
+        if not value:
             return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    async def _post_completion(self, provider_name: str, url: str, payload: Dict[str, Any],
+                               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """إرسال طلب إلى مزود وتحويل الفشل إلى خطأ ProviderError مصنف"""
 
+        session = await self._get_session()
         try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.config.GEMINI_API_KEY}"
+            async with session.post(url, json=payload, headers=headers) as response:
+                if response.status == 200:
+                    return await response.json()
 
-            payload = {
-                        "contents": [{
-                            "parts": [{
-                                "text": self._get_extraction_prompt() + "\n\n" + raw_text
-                            }]
-                        }]
-                    }
+                status = response.status
+                body = (await response.text())[:200]
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data["candidates"][0]["content"]["parts"][0]["text"]
-                        return self._parse_json_response(content)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TransientProviderError(provider_name, f"خطأ في الاتصال: {e!r}") from e
 
-        except Exception as e:
-            logger.error(f"خطأ في Gemini: {e}")
+        message = f"HTTP {status}: {body}"
+        if status == 429 or (status == 503 and retry_after is not None):
+            raise RateLimitedError(provider_name, message, status, retry_after)
+        if status in (408, 409, 425) or status >= 500:
+            raise TransientProviderError(provider_name, message, status)
+        raise PermanentProviderError(provider_name, message, status)
+
+    @staticmethod
+    def _response_text(provider_name: str, data: Dict[str, Any], *path) -> str:
+        """قراءة النص من بنية استجابة المزود"""
+
+        try:
+            for key in path:
+                data = data[key]
+        except (KeyError, IndexError, TypeError) as e:
+            raise BadOutputError(provider_name, f"بنية استجابة غير متوقعة: {e!r}") from e
+        return data
+
+    def _hedge_delay(self, provider_name: str) -> float:
+        """مهلة الانتظار قبل التحوط بالمزود التالي (نسبة مئوية من أزمنة الاستجابة)"""
+
+        percentile = self.config.AI_HEDGE_PERCENTILE
+        if percentile <= 0:
+            return 0.0
+
+        health = self.provider_health.get(provider_name)
+        if len(health.latencies) < 5:
+            return self.config.AI_HEDGE_DELAY
+
+        return health.latency_percentile(percentile)
+
+    async def _extract_with_race(self, raw_text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """سباق متحوط بين أفضل N مزودين - أول نتيجة صالحة تفوز ويُلغى الباقي"""
+
+        candidates = self.provider_health.ordered(self.available_providers)
+        candidates = candidates[:max(1, self.config.AI_RACE_PROVIDERS)]
+        running: Dict[asyncio.Task, str] = {}
+        last_launched = None
+
+        def launch_next():
+            nonlocal last_launched
+            provider = candidates.pop(0)
+            logger.info(f"🏁 إطلاق {provider['name']} في السباق")
+            task = asyncio.create_task(self._call_provider(provider, raw_text))
+            running[task] = provider["name"]
+            last_launched = provider["name"]
+
+        launch_next()
+
+        try:
+            while running:
+                timeout = self._hedge_delay(last_launched) if candidates else None
+                done, _ = await asyncio.wait(
+                    running.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # المزود الحالي تجاوز مهلة التحوط - إطلاق المزود التالي بالتوازي
+                    launch_next()
+                    continue
+
+                for task in done:
+                    provider_name = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.warning(f"⚠️ فشل {provider_name} في السباق: {e}")
+                        result = None
+
+                    if result:
+                        return provider_name, result
+
+                # فشل أحد المتسابقين - لا داعي لانتظار مهلة التحوط
+                if candidates:
+                    launch_next()
+        finally:
+            for task in running:
+                task.cancel()
 
         return None
 
-    async def _extract_with_openai(self, raw_text: str) -> Optional[Dict[str, Any]]:
-        """استخراج البيانات باستخدام OpenAI"""
+    async def _complete_with_gemini(self, prompt: str, max_tokens: int = 1000) -> Optional[str]:
+        """إرسال prompt إلى Gemini وإرجاع النص الناتج"""
+
+        if not self.config.GEMINI_API_KEY:
+            return None
+
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.config.GEMINI_API_KEY}"
+
+        payload = {
+                    "contents": [{
+                        "parts": [{
+                            "text": prompt
+                        }]
+                    }],
+                    "generationConfig": {
+                        "maxOutputTokens": max_tokens
+                    }
+                }
+
+        data = await self._post_completion("Gemini", url, payload)
+        return self._response_text("Gemini", data, "candidates", 0, "content", "parts", 0, "text")
+
+    async def _complete_with_openai(self, prompt: str, max_tokens: int = 1000) -> Optional[str]:
+        """إرسال prompt إلى OpenAI وإرجاع النص الناتج"""
 
         if not self.config.OPENAI_API_KEY:
             return None
 
-        try:
-            url = "https://api.openai.com/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.config.OPENAI_API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            payload = {
-                "model": "gpt-4",
-                "messages": [
-                    {"role": "user", "content": self._get_extraction_prompt() + "\n\n" + raw_text}
-                ],
-                "max_tokens": 1000,
-                "temperature": 0.1
-            }
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data["choices"][0]["message"]["content"]
-                        return self._parse_json_response(content)
+        url = "https://api.openai.com/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.config.OPENAI_API_KEY}",
+            "Content-Type": "application/json"
+        }
 
-        except Exception as e:
-            logger.error(f"خطأ في OpenAI: {e}")
+        payload = {
+            "model": "gpt-4",
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.1
+        }
 
-        return None
+        data = await self._post_completion("OpenAI", url, payload, headers)
+        return self._response_text("OpenAI", data, "choices", 0, "message", "content")
 
-    async def _extract_with_copilot(self, raw_text: str) -> Optional[Dict[str, Any]]:
-        """استخراج البيانات باستخدام Copilot"""
+    async def _complete_with_copilot(self, prompt: str, max_tokens: int = 1000) -> Optional[str]:
+        """إرسال prompt إلى Copilot وإرجاع النص الناتج"""
 
         if not self.config.COPILOT_API_KEY:
             return None
@@ -159,73 +745,53 @@ class AIService:
 
         return None
 
-    async def _extract_with_mistral(self, raw_text: str) -> Optional[Dict[str, Any]]:
-        """استخراج البيانات باستخدام Mistral"""
+    async def _complete_with_mistral(self, prompt: str, max_tokens: int = 1000) -> Optional[str]:
+        """إرسال prompt إلى Mistral وإرجاع النص الناتج"""
 
         if not self.config.MISTRAL_API_KEY:
             return None
 
-        try:
-            url = "https://api.mistral.ai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.config.MISTRAL_API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            payload = {
-                "model": "mistral-large-latest",
-                "messages": [
-                    {"role": "user", "content": self._get_extraction_prompt() + "\n\n" + raw_text}
-                ],
-                "max_tokens": 1000,
-                "temperature": 0.1
-            }
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data["choices"][0]["message"]["content"]
-                        return self._parse_json_response(content)
+        url = "https://api.mistral.ai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.config.MISTRAL_API_KEY}",
+            "Content-Type": "application/json"
+        }
 
-        except Exception as e:
-            logger.error(f"خطأ في Mistral: {e}")
+        payload = {
+            "model": "mistral-large-latest",
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.1
+        }
 
-        return None
+        data = await self._post_completion("Mistral", url, payload, headers)
+        return self._response_text("Mistral", data, "choices", 0, "message", "content")
 
-    async def _extract_with_groq(self, raw_text: str) -> Optional[Dict[str, Any]]:
-        """استخراج البيانات باستخدام Groq"""
+    async def _complete_with_groq(self, prompt: str, max_tokens: int = 1000) -> Optional[str]:
+        """إرسال prompt إلى Groq وإرجاع النص الناتج"""
 
         if not self.config.GROQ_API_KEY:
             return None
 
-        try:
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.config.GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            payload = {
-                "model": "llama-3.1-70b-versatile",
-                "messages": [
-                    {"role": "user", "content": self._get_extraction_prompt() + "\n\n" + raw_text}
-                ],
-                "max_tokens": 1000,
-                "temperature": 0.1
-            }
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data["choices"][0]["message"]["content"]
-                        return self._parse_json_response(content)
+        url = "https://api.groq.com/openai/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.config.GROQ_API_KEY}",
+            "Content-Type": "application/json"
+        }
 
-        except Exception as e:
-            logger.error(f"خطأ في Groq: {e}")
+        payload = {
+            "model": "llama-3.1-70b-versatile",
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.1
+        }
 
-        return None
+        data = await self._post_completion("Groq", url, payload, headers)
+        return self._response_text("Groq", data, "choices", 0, "message", "content")
 
     async def _logical_analysis(self, raw_text: str) -> Optional[Dict[str, Any]]:
         """التحليل المنطقي للنص كحل أخير"""
@@ -233,65 +799,53 @@ class AIService:
         logger.info("🧠 بدء التحليل المنطقي...")
 
         try:
-            # تحليل منطقي بسيط باستخدام regex وقواعد النص
+            # تحليل منطقي بسيط باستخدام regex وقواعد النص (على النص المُطبَّع)
             extracted_data = {}
+            text = normalize_arabic(raw_text)
 
             # استخراج رقم الهاتف
-            phone_pattern = r'01[0-9]{9}'
-            phone_match = re.search(phone_pattern, raw_text)
+            phone_match = _PHONE_PATTERN.search(text)
             if phone_match:
                 extracted_data["رقم المالك"] = phone_match.group()
 
             # استخراج الأسعار
-            price_patterns = [
-                r'(\d+)\s*ألف',
-                r'(\d+)\s*الف',
-                r'(\d+),000',
-                r'(\d{4,})'
-            ]
-
-            for pattern in price_patterns:
-                price_match = re.search(pattern, raw_text)
+            for pattern in _PRICE_PATTERNS:
+                price_match = pattern.search(text)
                 if price_match:
                     price = price_match.group(1)
-                    if 'ألف' in price_match.group() or 'الف' in price_match.group():
+                    if 'الف' in price_match.group():
                         price = str(int(price) * 1000)
                     extracted_data["السعر"] = price
                     break
 
             # استخراج المساحة
-            area_pattern = r'(\d+)\s*متر'
-            area_match = re.search(area_pattern, raw_text)
+            area_match = _AREA_PATTERN.search(text)
             if area_match:
                 extracted_data["المساحة"] = area_match.group(1)
 
-            # تحديد المنطقة من النص
-            regions_map = {
-                'تجمع': 'احياء تجمع',
-                'اندلس': 'اندلس',
-                'رحاب': 'رحاب',
-                'جاردينيا': 'جاردينيا هايتس'
-            }
-
-            for keyword, region in regions_map.items():
-                if keyword in raw_text:
-                    extracted_data["المنطقة"] = region
-                    break
+            # المناطق والموظفون والمميزات المعتمدة في مرور واحد
+            terms = self.approved_terms.match(text)
+            if terms[ApprovedTermsMatcher.REGION]:
+                extracted_data["المنطقة"] = terms[ApprovedTermsMatcher.REGION][0]
+            if terms[ApprovedTermsMatcher.EMPLOYEE]:
+                extracted_data["اسم الموظف"] = terms[ApprovedTermsMatcher.EMPLOYEE][0]
+            if terms[ApprovedTermsMatcher.FEATURE]:
+                extracted_data["المميزات"] = ", ".join(terms[ApprovedTermsMatcher.FEATURE])
 
             # تحديد نوع الوحدة
-            if 'شقة' in raw_text or 'شقه' in raw_text:
+            if 'شقه' in text:
                 extracted_data["نوع الوحدة"] = "شقة"
-            elif 'فيلا' in raw_text:
+            elif 'فيلا' in text:
                 extracted_data["نوع الوحدة"] = "فيلا"
-            elif 'دوبلكس' in raw_text:
+            elif 'دوبلكس' in text:
                 extracted_data["نوع الوحدة"] = "دوبلكس"
 
             # تحديد حالة الوحدة
-            if 'مفروش' in raw_text:
+            if 'مفروش' in text:
                 extracted_data["حالة الوحدة"] = "مفروش"
-            elif 'فاضي' in raw_text or 'فاضية'in raw_text:
+            elif 'فاضي' in text:
                 extracted_data["حالة الوحدة"] = "فاضي"
-            elif 'تمليك' in raw_text:
+            elif 'تمليك' in text:
                 extracted_data["حالة الوحدة"] = "تمليك"
 
             # إكمال الحقول الناقصة بالقيم الافتراضية
@@ -311,7 +865,7 @@ class AIService:
 
         return None
 
-    def _get_extraction_prompt(self) -> str:
+    def _get_extraction_prompt(self, strict: bool = False) -> str:
         """الحصول على prompt استخراج البيانات المحدث وفقاً للدليل الجديد"""
 
         # البروميت المحدث حسب الدليل الجديد
@@ -341,6 +895,28 @@ class AIService:
 
 استخرج البيانات من النص التالي وأرجع JSON فقط بدون أي نص إضافي:
 """
+        if strict:
+            prompt = _STRICT_EXTRACTION_RULES + prompt
+        return prompt
+
+    def _get_batch_extraction_prompt(self, batch: List[Dict[str, Any]]) -> str:
+        """prompt دفعة: الدليل مرة واحدة ثم الإعلانات موسومة بأرقامها"""
+
+        guide = self._get_extraction_prompt().rsplit("استخرج البيانات", 1)[0]
+
+        prompt = guide + (
+            f"ستجد أدناه {len(batch)} إعلان، كل إعلان يبدأ بسطر \"### الإعلان <رقم الرسالة>\".\n"
+            "أرجع مصفوفة JSON فقط بدون أي نص إضافي، تحتوي عنصراً واحداً لكل إعلان بنفس التنسيق أعلاه، "
+            "مع إضافة الحقل \"telegram_message_id\" بقيمة رقم الرسالة كرقم.\n"
+        )
+
+        for listing in batch:
+            prompt += (
+                f"\n### الإعلان {listing['telegram_message_id']}\n"
+                f"الرقم التسلسلي: {listing.get('serial_number')}\n"
+                f"{listing['raw_text']}\n"
+            )
+
         return prompt
 
     def _parse_json_response(self, content: str) -> Optional[Dict[str, Any]]:
@@ -355,20 +931,7 @@ class AIService:
                 json_str = content[start_idx:end_idx]
                 property_data = json.loads(json_str)
 
-                # التحقق من الحقول الإلزامية
-                required_fields = ["المنطقة", "نوع الوحدة", "حالة الوحدة"]
-                for field in required_fields:
-                    if not property_data.get(field):
-                        logger.warning(f"⚠️ حقل إلزامي مفقود: {field}")
-                        return None
-
-                # إكمال الحقول الناقصة
-                self._fill_default_values(property_data)
-
-                # إنشاء كود الوحدة
-                property_data["كود الوحدة"] = self._generate_unit_code(property_data)
-
-                return property_data
+                return self._validate_extracted_data(property_data)
             else:
                 logger.error("❌ لم يتم العثور على JSON صالح في الاستجابة")
 
@@ -379,6 +942,31 @@ class AIService:
 
         return None
 
+    def _validate_extracted_data(self, property_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """التحقق من الحقول الإلزامية وإكمال الباقي لعنصر مستخرج واحد"""
+
+        # التحقق من الحقول الإلزامية
+        required_fields = ["المنطقة", "نوع الوحدة", "حالة الوحدة"]
+        for field in required_fields:
+            if not property_data.get(field):
+                logger.warning(f"⚠️ حقل إلزامي مفقود: {field}")
+                return None
+
+        # توحيد اسم المنطقة مع القائمة المعتمدة (الأسماء البديلة والأخطاء الإملائية)
+        region = self.config.region_index.resolve(property_data["المنطقة"])
+        if region:
+            property_data["المنطقة"] = region
+        else:
+            logger.warning(f"⚠️ منطقة غير معتمدة: {property_data['المنطقة']}")
+
+        # إكمال الحقول الناقصة
+        self._fill_default_values(property_data)
+
+        # إنشاء كود الوحدة
+        property_data["كود الوحدة"] = self._generate_unit_code(property_data)
+
+        return property_data
+
     def _fill_default_values(self, property_data: Dict[str, Any]):
         """إكمال القيم الافتراضية للحقول المفقودة"""
 
@@ -390,7 +978,7 @@ class AIService:
             "العنوان": "غير محدد",
             "اسم الموظف": "غير محدد",
             "اسم المالك": "غير محدد",
-            "رقم المالك": "01000000000",
+            "رقم المالك": DEFAULT_OWNER_PHONE,
             "اتاحة العقار": "غير محدد",
             "حالة الصور": "صور غير محددة",
             "تفاصيل كاملة": property_data.get("raw_text", "غير محدد")
@@ -410,23 +998,9 @@ class AIService:
             "تمليك": "3"     # t3 → 3
         }
 
-        # خريطة المناطق الجديدة وفقاً للدليل
-        region_map = {
-            # z1
-            "دار قرنفل": "1", "قرنفل فيلات": "1", "بنفسج": "1", "ياسمين": "1", "ج ش اكاديميه": "1",
-            # z3  
-            "سكن شباب": "3", "اسكان شباب": "3", "مستقبل": "3", "هناجر": "3", "نزهه ثالث": "3",
-            # z4
-            "رحاب": "4", "جاردينيا سيتي": "4",
-            # z5
-            "كمباوندات": "5", "احياء تجمع": "5", "بيت وطن": "5", "نرجس": "5", "لوتس": "5", 
-            "شويفات": "5", "زيزينيا": "5", "اندلس": "5", "دار اندلس": "5", "سكن اندلس": "5", 
-            "سكن معارض": "5", "جنه": "5", "جاردينيا هايتس": "5"
-        }
-
-        # الحصول على رموز الكود
+        # الحصول على رموز الكود (زون المنطقة من فهرس المناطق المعتمدة)
         condition_code = condition_map.get(property_data.get("حالة الوحدة"), "1")
-        region_code = region_map.get(property_data.get("المنطقة"), "5")
+        region_code = self.config.region_index.zone(property_data.get("المنطقة"))
 
         # التاريخ الحالي بصيغة DDMMYY
         current_date = datetime.now().strftime("%d%m%y")
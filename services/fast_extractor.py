@@ -0,0 +1,210 @@
+"""
+المستخرج السريع بالقواعد - Rule-based Fast-path Extractor
+"""
+
+import re
+from typing import Dict, Any, Optional, List, Tuple
+from utils.arabic_text import ApprovedTermsMatcher, normalize_arabic
+
+_TEMPLATE_LINE = re.compile(r'^[^\w]*([\w\s]{2,25}?)\s*[:：]\s*(.+?)\s*$')
+_PHONE = re.compile(r'(?<!\d)01[0125]\d{8}(?!\d)')
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_SERIAL = re.compile(r'^الرقم التسلسلي:\s*(\d+)\s*$', re.MULTILINE)
+_EMPLOYEE_LINE = re.compile(r'^[^\w]*تبع\s+(.+?)\s*$', re.MULTILINE)
+
+# عناوين سطور القالب → الحقل (بعد التوحيد)
+TEMPLATE_LABELS = {
+    "المنطقه": "المنطقة",
+    "النوع": "نوع الوحدة",
+    "نوع الوحده": "نوع الوحدة",
+    "الحاله": "حالة الوحدة",
+    "حاله الوحده": "حالة الوحدة",
+    "المساحه": "المساحة",
+    "الدور": "الدور",
+    "الادوار": "الدور",
+    "السعر": "السعر",
+    "المميزات": "المميزات",
+    "العنوان": "العنوان",
+    "المالك": "اسم المالك",
+    "اسم المالك": "اسم المالك",
+    "التليفون": "رقم المالك",
+    "الهاتف": "رقم المالك",
+    "الموبايل": "رقم المالك",
+    "رقم الهاتف": "رقم المالك",
+    "رقم المالك": "رقم المالك",
+    "الموظف": "اسم الموظف",
+    "اسم الموظف": "اسم الموظف"
+}
+
+# أنواع الوحدات (الكلمة بعد التوحيد → القيمة المعتمدة)
+UNIT_TYPES = {
+    "شقه": "شقة",
+    "فيلا": "فيلا",
+    "دوبلكس": "دوبلكس",
+    "دوبليكس": "دوبلكس",
+    "روف": "روف",
+    "ستوديو": "ستوديو",
+    "بنتهاوس": "بنتهاوس"
+}
+
+# حالات الوحدة بالأولوية ("غير مفروش" قبل "مفروش")
+UNIT_CONDITIONS = [
+    ("غير مفروش", "فاضي"),
+    ("مفروش", "مفروش"),
+    ("فاضي", "فاضي"),
+    ("تمليك", "تمليك"),
+    ("للبيع", "تمليك")
+]
+
+# وزن كل حقل في درجة الثقة (المجموع 1)
+CONFIDENCE_WEIGHTS = {
+    "المنطقة": 0.25,
+    "نوع الوحدة": 0.2,
+    "حالة الوحدة": 0.2,
+    "رقم المالك": 0.15,
+    "المساحة": 0.1,
+    "السعر": 0.1
+}
+
+# بدونها لا يُقبل الاستخراج السريع مهما كانت الدرجة
+REQUIRED_FIELDS = ("المنطقة", "نوع الوحدة", "حالة الوحدة", "رقم المالك")
+
+# أقل عدد من سطور القالب المعروفة ليُعتبر الإعلان مطابقاً للقالب
+MIN_TEMPLATE_LINES = 3
+
+class FastPathExtractor:
+    """استخراج حتمي عالي الدقة لإعلانات القالب شبه المنظم قبل استدعاء مزودي الذكاء الاصطناعي"""
+
+    def __init__(self, terms: ApprovedTermsMatcher):
+        self.terms = terms  # المناطق والموظفون والمميزات المعتمدة
+
+    @staticmethod
+    def _parse_template(raw_text: str) -> Tuple[Dict[str, str], List[str]]:
+        """تقسيم الإعلان إلى سطور "العنوان: القيمة" وسطور حرة"""
+
+        fields, free_lines = {}, []
+        for line in raw_text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            match = _TEMPLATE_LINE.match(line)
+            field = TEMPLATE_LABELS.get(normalize_arabic(match.group(1))) if match else None
+            if field and field not in fields:
+                fields[field] = match.group(2)
+            else:
+                free_lines.append(line)
+        return fields, free_lines
+
+    @staticmethod
+    def _number(value: str) -> Optional[str]:
+        """أول رقم في القيمة مع مضاعفات ألف/مليون"""
+
+        value = normalize_arabic(value).replace(",", "")
+        match = _NUMBER.search(value)
+        if not match:
+            return None
+        number = float(match.group())
+        rest = value[match.end():]
+        if re.match(r'\s*مليون', rest):
+            number *= 1_000_000
+        elif re.match(r'\s*الف', rest):
+            number *= 1000
+        return str(int(number))
+
+    @staticmethod
+    def _unit_type(value: str) -> Optional[str]:
+        """أول نوع وحدة معروف في القيمة"""
+
+        folded = normalize_arabic(value)
+        positions = [(folded.find(word), unit_type) for word, unit_type in UNIT_TYPES.items() if word in folded]
+        return min(positions)[1] if positions else None
+
+    @staticmethod
+    def _unit_condition(text: str) -> Optional[str]:
+        """حالة الوحدة إذا ذُكرت حالة واحدة فقط في النص"""
+
+        found = set()
+        for keyword, condition in UNIT_CONDITIONS:
+            if keyword in text:
+                found.add(condition)
+                text = text.replace(keyword, " ")
+        return found.pop() if len(found) == 1 else None
+
+    def extract(self, raw_text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """استخراج بيانات العقار مع درجة ثقة بين 0 و1 (None إذا لم تُستوفَ الحقول الإلزامية)"""
+
+        fields, free_lines = self._parse_template(raw_text)
+        if len(fields) < MIN_TEMPLATE_LINES:
+            return None, 0.0
+
+        folded_text = normalize_arabic(raw_text)
+        data: Dict[str, Any] = {}
+
+        # المنطقة: منطقة معتمدة واحدة فقط في سطر المنطقة
+        regions = self.terms.regions(fields.get("المنطقة", ""))
+        if len(regions) == 1:
+            data["المنطقة"] = regions[0]
+
+        unit_type = self._unit_type(fields.get("نوع الوحدة", "")) or self._unit_type(" ".join(free_lines))
+        if unit_type:
+            data["نوع الوحدة"] = unit_type
+
+        condition = self._unit_condition(normalize_arabic(fields.get("حالة الوحدة", ""))) or self._unit_condition(folded_text)
+        if condition:
+            data["حالة الوحدة"] = condition
+
+        # رقم المالك: سطر الهاتف أو رقم وحيد في النص
+        phones = set(_PHONE.findall(re.sub(r'[\s\-]', '', normalize_arabic(fields.get("رقم المالك", "")))))
+        if not phones:
+            phones = set(_PHONE.findall(folded_text))
+        if len(phones) == 1:
+            data["رقم المالك"] = phones.pop()
+
+        for field in ("المساحة", "السعر"):
+            number = self._number(fields.get(field, ""))
+            if number and int(number) > 0:
+                data[field] = number
+
+        confidence = round(sum(CONFIDENCE_WEIGHTS[field] for field in data), 3)
+        if any(field not in data for field in REQUIRED_FIELDS):
+            return None, confidence
+
+        # الحقول الوصفية لا تدخل في درجة الثقة
+        if fields.get("الدور"):
+            data["الدور"] = fields["الدور"]
+        if fields.get("العنوان"):
+            data["العنوان"] = fields["العنوان"]
+        if fields.get("اسم المالك"):
+            data["اسم المالك"] = fields["اسم المالك"]
+
+        features = self.terms.features(fields.get("المميزات", ""))
+        if features:
+            data["المميزات"] = ", ".join(features)
+        elif fields.get("المميزات"):
+            data["المميزات"] = ", ".join(part.strip() for part in re.split(r'[،,]', fields["المميزات"]) if part.strip())
+
+        employee_match = _EMPLOYEE_LINE.search(raw_text)
+        employee_text = fields.get("اسم الموظف") or (employee_match.group(1) if employee_match else "")
+        employees = self.terms.employees(employee_text)
+        if len(employees) == 1:
+            data["اسم الموظف"] = employees[0]
+        elif employee_text:
+            data["اسم الموظف"] = employee_text
+
+        if "غير متاح" in folded_text:
+            data["اتاحة العقار"] = "غير متاح"
+        elif "متاح" in folded_text:
+            data["اتاحة العقار"] = "متاح"
+
+        if "بدون صور" in folded_text:
+            data["حالة الصور"] = "بدون صور"
+        elif "صور" in folded_text:
+            data["حالة الصور"] = "صور متاحة"
+
+        serial = _SERIAL.search(raw_text)
+        if serial:
+            data["serial_number"] = serial.group(1)
+
+        data["تفاصيل كاملة"] = _SERIAL.sub("", raw_text).strip()
+
+        return data, confidence
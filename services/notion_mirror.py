@@ -0,0 +1,181 @@
+"""
+مرآة Notion المحلية - Local Notion Mirror
+"""
+
+from typing import Dict, Any, Optional, List, Set
+from models.property import PropertyData
+
+class NotionMirror:
+    """نسخة محلية من قاعدتي العقارات والملاك مع فهارس للتصنيف الفوري"""
+    
+    def __init__(self):
+        # الصفحات حسب المعرف
+        self.properties: Dict[str, Dict[str, Any]] = {}
+        self.owners: Dict[str, Dict[str, Any]] = {}
+        
+        # الفهارس: توقيع التكرار ورقم المالك
+        self._properties_by_signature: Dict[str, Set[str]] = {}
+        self._properties_by_phone: Dict[str, Set[str]] = {}
+        self._owners_by_phone: Dict[str, str] = {}
+        
+        # مفاتيح الفهارس الحالية لكل صفحة (لإزالتها عند التحديث)
+        self._property_keys: Dict[str, tuple] = {}
+        self._owner_keys: Dict[str, str] = {}
+        
+        # أحدث last_edited_time تمت مزامنته لكل قاعدة
+        self.properties_cursor: Optional[str] = None
+        self.owners_cursor: Optional[str] = None
+    
+    @staticmethod
+    def _phone_key(phone: Optional[str]) -> str:
+        """مفتاح رقم الهاتف في الفهارس"""
+        return (phone or "").strip().lower()
+    
+    @staticmethod
+    def _plain_text(prop: Dict[str, Any]) -> str:
+        """استخراج النص من خاصية title أو rich_text"""
+        parts = prop.get("title") or prop.get("rich_text") or []
+        return "".join(
+            part.get("plain_text") or part.get("text", {}).get("content", "")
+            for part in parts
+        )
+    
+    @classmethod
+    def _property_value(cls, page: Dict[str, Any], name: str) -> str:
+        """قراءة قيمة خاصية من صفحة Notion كنص"""
+        
+        prop = page.get("properties", {}).get(name) or {}
+        prop_type = prop.get("type")
+        
+        if prop_type == "select" or (prop_type is None and "select" in prop):
+            return (prop.get("select") or {}).get("name", "")
+        if prop_type == "phone_number" or (prop_type is None and "phone_number" in prop):
+            return prop.get("phone_number") or ""
+        if prop_type == "number" or (prop_type is None and "number" in prop):
+            number = prop.get("number")
+            # المساحة 0 تعني غير محددة عند الإنشاء
+            return str(int(number)) if number else ""
+        if prop_type in ("title", "rich_text") or "title" in prop or "rich_text" in prop:
+            return cls._plain_text(prop)
+        return ""
+    
+    @classmethod
+    def property_signature(cls, page: Dict[str, Any]) -> str:
+        """توقيع التكرار لصفحة عقار بنفس صيغة PropertyData"""
+        
+        property_data = PropertyData()
+        property_data.owner_phone = cls._property_value(page, "رقم المالك")
+        property_data.region = cls._property_value(page, "المنطقة")
+        property_data.unit_type = cls._property_value(page, "نوع الوحدة")
+        property_data.unit_condition = cls._property_value(page, "حالة الوحدة")
+        property_data.area = cls._property_value(page, "المساحة")
+        property_data.floor = cls._property_value(page, "الدور")
+        return property_data.get_duplicate_check_signature()
+    
+    @staticmethod
+    def _advance(cursor: Optional[str], page: Dict[str, Any]) -> Optional[str]:
+        """تحديث مؤشر المزامنة بأحدث last_edited_time (صيغة ISO قابلة للمقارنة نصياً)"""
+        edited = page.get("last_edited_time")
+        if edited and (cursor is None or edited > cursor):
+            return edited
+        return cursor
+    
+    def upsert_property(self, page: Dict[str, Any]):
+        """إضافة أو تحديث صفحة عقار في المرآة"""
+        
+        page_id = page["id"]
+        self._remove_property(page_id)
+        self.properties_cursor = self._advance(self.properties_cursor, page)
+        
+        if page.get("archived") or page.get("in_trash"):
+            return
+        
+        signature = self.property_signature(page)
+        phone = self._phone_key(self._property_value(page, "رقم المالك"))
+        
+        self.properties[page_id] = page
+        self._property_keys[page_id] = (signature, phone)
+        if signature:
+            self._properties_by_signature.setdefault(signature, set()).add(page_id)
+        if phone:
+            self._properties_by_phone.setdefault(phone, set()).add(page_id)
+    
+    def upsert_owner(self, page: Dict[str, Any]):
+        """إضافة أو تحديث صفحة مالك في المرآة"""
+        
+        page_id = page["id"]
+        self._remove_owner(page_id)
+        self.owners_cursor = self._advance(self.owners_cursor, page)
+        
+        if page.get("archived") or page.get("in_trash"):
+            return
+        
+        phone = self._phone_key(self._property_value(page, "رقم الهاتف"))
+        
+        self.owners[page_id] = page
+        self._owner_keys[page_id] = phone
+        if phone:
+            self._owners_by_phone[phone] = page_id
+    
+    def _remove_property(self, page_id: str):
+        """إزالة صفحة عقار من المرآة والفهارس"""
+        
+        self.properties.pop(page_id, None)
+        keys = self._property_keys.pop(page_id, None)
+        if not keys:
+            return
+        
+        for index, key in zip((self._properties_by_signature, self._properties_by_phone), keys):
+            ids = index.get(key)
+            if ids:
+                ids.discard(page_id)
+                if not ids:
+                    del index[key]
+    
+    def _remove_owner(self, page_id: str):
+        """إزالة صفحة مالك من المرآة والفهرس"""
+        
+        self.owners.pop(page_id, None)
+        phone = self._owner_keys.pop(page_id, None)
+        if phone and self._owners_by_phone.get(phone) == page_id:
+            del self._owners_by_phone[phone]
+    
+    def prune_properties(self, page_ids: Set[str]) -> int:
+        """إزالة صفحات عقارات لم تعد موجودة في Notion (محذوفة أو مؤرشفة)"""
+        removed = [page_id for page_id in page_ids if page_id in self.properties]
+        for page_id in removed:
+            self._remove_property(page_id)
+        return len(removed)
+    
+    def prune_owners(self, page_ids: Set[str]) -> int:
+        """إزالة صفحات ملاك لم تعد موجودة في Notion (محذوفة أو مؤرشفة)"""
+        removed = [page_id for page_id in page_ids if page_id in self.owners]
+        for page_id in removed:
+            self._remove_owner(page_id)
+        return len(removed)
+    
+    def find_duplicates(self, signature: str) -> List[Dict[str, Any]]:
+        """العقارات المطابقة لتوقيع التكرار"""
+        if not signature:
+            return []
+        return [self.properties[i] for i in self._properties_by_signature.get(signature, ())]
+    
+    def find_owner_properties(self, owner_phone: str) -> List[Dict[str, Any]]:
+        """عقارات المالك حسب رقم الهاتف"""
+        phone = self._phone_key(owner_phone)
+        if not phone:
+            return []
+        return [self.properties[i] for i in self._properties_by_phone.get(phone, ())]
+    
+    def owner_property_count(self, owner_id: str) -> Optional[int]:
+        """قيمة "عدد العقارات" المسجلة في صفحة المالك (None إذا لم تكن في المرآة)"""
+        page = self.owners.get(owner_id)
+        if page is None:
+            return None
+        value = self._property_value(page, "عدد العقارات")
+        return int(value) if value else 0
+    
+    def find_owner(self, owner_phone: str) -> Optional[Dict[str, Any]]:
+        """صفحة المالك حسب رقم الهاتف"""
+        page_id = self._owners_by_phone.get(self._phone_key(owner_phone))
+        return self.owners.get(page_id) if page_id else None
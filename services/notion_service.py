@@ -3,9 +3,14 @@
 """
 
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from datetime import datetime
-from notion_client import Client
+import httpx
+from notion_client import AsyncClient, APIResponseError, APIErrorCode
+from models.property import PropertyData
+from services.notion_mirror import NotionMirror
+from utils.rate_limiter import TokenBucket
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -13,11 +18,159 @@ logger = setup_logger(__name__)
 class NotionService:
     """خدمة التعامل مع قاعدة بيانات Notion"""
     
-    def __init__(self, integration_secret: str, properties_db_id: str, owners_db_id: str):
-        self.client = Client(auth=integration_secret)
+    def __init__(self, integration_secret: str, properties_db_id: str, owners_db_id: str,
+                 mirror_sync_interval: int = 60, rate_limit: float = 3.0, rate_burst: int = 3,
+                 pool_limit: int = 10, max_retries: int = 3, base_url: str = "https://api.notion.com",
+                 database=None):
+        # عميل غير متزامن بمجمع اتصالات مشترك (بدون حجز خيط لكل طلب)
+        self.client = AsyncClient(
+            client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_limit,
+                    max_keepalive_connections=pool_limit
+                )
+            ),
+            auth=integration_secret,
+            base_url=base_url
+        )
         self.properties_db_id = properties_db_id
         self.owners_db_id = owners_db_id
         
+        # قاعدة البيانات المحلية لعدادات عقارات الملاك (اختيارية)
+        self.database = database
+        
+        # حد معدل Notion (3 طلبات/ثانية في المتوسط)
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst)
+        self.max_retries = max_retries
+        
+        # عدد الطلبات البعيدة حسب نقطة النهاية
+        self.request_counts: Dict[str, int] = {}
+        
+        # المرآة المحلية للتصنيف بدون استعلامات بعيدة
+        self.mirror = NotionMirror()
+        self.mirror_sync_interval = mirror_sync_interval
+        self._mirror_synced_at: Optional[float] = None
+        self._mirror_lock = asyncio.Lock()
+        
+    async def close(self):
+        """إغلاق مجمع الاتصالات"""
+        await self.client.aclose()
+    
+    async def _request(self, endpoint, **kwargs) -> Dict[str, Any]:
+        """تنفيذ طلب Notion عبر محدد المعدل مع احترام Retry-After عند 429"""
+        
+        name = getattr(endpoint, "__qualname__", str(endpoint))
+        
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            self.request_counts[name] = self.request_counts.get(name, 0) + 1
+            
+            try:
+                return await endpoint(**kwargs)
+                
+            except APIResponseError as e:
+                if e.code != APIErrorCode.RateLimited or attempt == self.max_retries:
+                    raise
+                
+                try:
+                    retry_after = float(e.headers.get("Retry-After", 1))
+                except (TypeError, ValueError):
+                    retry_after = 1.0
+                
+                # إيقاف جميع الطلبات المنتظرة وليس هذا الطلب فقط
+                self.rate_limiter.pause(retry_after)
+                logger.warning(f"⏳ Notion: تجاوز حد المعدل - إعادة المحاولة بعد {retry_after:.1f} ثانية")
+    
+    async def sync_mirror(self, force: bool = False) -> bool:
+        """مزامنة المرآة المحلية تزايدياً حسب last_edited_time"""
+        
+        async with self._mirror_lock:
+            if not force and not self._mirror_is_stale():
+                return True
+            
+            try:
+                started = time.monotonic()
+                
+                properties_count = await self._sync_database(
+                    self.properties_db_id, self.mirror.properties_cursor, self.mirror.upsert_property
+                )
+                owners_count = await self._sync_database(
+                    self.owners_db_id, self.mirror.owners_cursor, self.mirror.upsert_owner
+                )
+                
+                self._mirror_synced_at = time.monotonic()
+                
+                if properties_count or owners_count:
+                    logger.info(
+                        f"🔄 مزامنة مرآة Notion: {properties_count} عقار و {owners_count} مالك "
+                        f"({time.monotonic() - started:.1f} ثانية)"
+                    )
+                return True
+                
+            except Exception as e:
+                logger.error(f"❌ خطأ في مزامنة مرآة Notion: {e}")
+                return False
+    
+    def _mirror_is_stale(self) -> bool:
+        """هل انتهت صلاحية المرآة المحلية"""
+        return (
+            self._mirror_synced_at is None or
+            time.monotonic() - self._mirror_synced_at >= self.mirror_sync_interval
+        )
+    
+    async def _sync_database(self, database_id: str, cursor: Optional[str], upsert) -> int:
+        """جلب الصفحات المعدلة منذ المؤشر مع التصفح بـ start_cursor"""
+        
+        query = {"database_id": database_id}
+        if cursor:
+            # دقة last_edited_time بالدقيقة لذا نعيد جلب الدقيقة الأخيرة (upsert متكرر آمن)
+            query["filter"] = {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": cursor}
+            }
+        
+        count = 0
+        async for page in self._query_pages(**query):
+            upsert(page)
+            count += 1
+        return count
+    
+    async def _query_pages(self, **query) -> AsyncIterator[Dict[str, Any]]:
+        """استعلام قاعدة بيانات مع التصفح بـ start_cursor حتى آخر صفحة"""
+        
+        query.setdefault("page_size", 100)
+        while True:
+            results = await self._request(self.client.databases.query, **query)
+            
+            for page in results.get("results", []):
+                yield page
+            
+            if not results.get("has_more"):
+                return
+            query["start_cursor"] = results.get("next_cursor")
+    
+    async def find_duplicate_properties(self, owner_phone: str, region: str, unit_type: str,
+                                        unit_condition: str, area: str, floor: str) -> List[Dict[str, Any]]:
+        """البحث عن العقارات المكررة في المرآة المحلية (تطابق جميع الشروط)"""
+        
+        await self.sync_mirror()
+        
+        property_data = PropertyData()
+        property_data.owner_phone = owner_phone
+        property_data.region = region
+        property_data.unit_type = unit_type
+        property_data.unit_condition = unit_condition
+        property_data.area = area
+        property_data.floor = floor
+        
+        return self.mirror.find_duplicates(property_data.get_duplicate_check_signature())
+    
+    async def find_owner_properties(self, owner_phone: str) -> List[Dict[str, Any]]:
+        """البحث عن عقارات المالك في المرآة المحلية"""
+        
+        await self.sync_mirror()
+        return self.mirror.find_owner_properties(owner_phone)
+    
     async def search_property(self, property_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """البحث عن عقار موجود"""
         
@@ -30,7 +183,7 @@ class NotionService:
                 }
             }
             
-            results = await asyncio.to_thread(
+            results = await self._request(
                 self.client.databases.query,
                 database_id=self.properties_db_id,
                 filter=code_filter
@@ -64,7 +217,7 @@ class NotionService:
                 ]
             }
             
-            results = await asyncio.to_thread(
+            results = await self._request(
                 self.client.databases.query,
                 database_id=self.properties_db_id,
                 filter=complex_filter
@@ -80,6 +233,13 @@ class NotionService:
         """البحث عن مالك موجود"""
         
         try:
+            # المرآة المحلية أولاً
+            await self.sync_mirror()
+            owner = self.mirror.find_owner(owner_phone)
+            if owner:
+                logger.info("✅ تم العثور على مالك موجود")
+                return owner
+            
             owner_filter = {
                 "property": "رقم الهاتف",
                 "phone_number": {
@@ -87,7 +247,7 @@ class NotionService:
                 }
             }
             
-            results = await asyncio.to_thread(
+            results = await self._request(
                 self.client.databases.query,
                 database_id=self.owners_db_id,
                 filter=owner_filter
@@ -95,6 +255,7 @@ class NotionService:
             
             if results.get("results"):
                 logger.info("✅ تم العثور على مالك موجود")
+                self.mirror.upsert_owner(results["results"][0])
                 return results["results"][0]
                 
             return None
@@ -215,17 +376,16 @@ class NotionService:
                     ]
                 }
             
-            # إنشاء الصفحة
-            page = await asyncio.to_thread(
+            # إنشاء الصفحة مع محتواها في طلب واحد
+            page = await self._request(
                 self.client.pages.create,
                 parent={"database_id": self.properties_db_id},
-                properties=properties
+                properties=properties,
+                children=self._property_content_blocks(property_data)
             )
             
             page_id = page["id"]
-            
-            # إضافة المحتوى إلى الصفحة
-            await self._add_property_content(page_id, property_data)
+            self.mirror.upsert_property(page)
             
             logger.info(f"✅ تم إنشاء صفحة العقار: {page_id}")
             return page_id
@@ -261,13 +421,16 @@ class NotionService:
                 }
             }
             
-            page = await asyncio.to_thread(
+            page = await self._request(
                 self.client.pages.create,
                 parent={"database_id": self.owners_db_id},
                 properties=properties
             )
             
             page_id = page["id"]
+            self.mirror.upsert_owner(page)
+            if self.database:
+                await self.database.set_owner_property_counts({page_id: 1})
             logger.info(f"✅ تم إنشاء صفحة المالك: {page_id}")
             return page_id
             
@@ -275,36 +438,26 @@ class NotionService:
             logger.error(f"❌ خطأ في إنشاء صفحة المالك: {e}")
             return None
     
+    async def create_owner_and_property(self, property_data: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """إنشاء صفحة المالك ثم صفحة العقار المرتبطة به (طلبان فقط)"""
+        
+        owner_id = await self.create_owner_page(property_data)
+        property_id = await self.create_property_page(property_data, owner_id)
+        return owner_id, property_id
+    
     async def update_owner_properties_count(self, owner_id: str) -> bool:
-        """تحديث عدد عقارات المالك"""
+        """زيادة عدد عقارات المالك بعد إضافة عقار ودفعه إلى Notion بطلب واحد"""
         
         try:
-            # البحث عن عقارات المالك
-            owner_filter = {
-                "property": "المالك",
-                "relation": {
-                    "contains": owner_id
-                }
-            }
+            if self.database:
+                # عداد محلي تزايدي (القيمة الحالية في Notion هي البداية للمالك غير المسجل)
+                properties_count = await self.database.increment_owner_property_count(
+                    owner_id, self.mirror.owner_property_count(owner_id) or 0
+                )
+            else:
+                properties_count = await self._count_owner_properties(owner_id)
             
-            results = await asyncio.to_thread(
-                self.client.databases.query,
-                database_id=self.properties_db_id,
-                filter=owner_filter
-            )
-            
-            properties_count = len(results.get("results", []))
-            
-            # تحديث العدد
-            await asyncio.to_thread(
-                self.client.pages.update,
-                page_id=owner_id,
-                properties={
-                    "عدد العقارات": {
-                        "number": properties_count
-                    }
-                }
-            )
+            await self._push_owner_count(owner_id, properties_count)
             
             logger.info(f"✅ تم تحديث عدد العقارات للمالك: {properties_count}")
             return True
@@ -313,49 +466,128 @@ class NotionService:
             logger.error(f"❌ خطأ في تحديث عدد العقارات: {e}")
             return False
     
-    async def _add_property_content(self, page_id: str, property_data: Dict[str, Any]):
-        """إضافة محتوى تفصيلي لصفحة العقار"""
+    async def _count_owner_properties(self, owner_id: str) -> int:
+        """عدّ عقارات المالك من Notion مع التصفح الكامل"""
         
-        try:
-            children = [
-                {
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "تفاصيل العقار"
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": property_data.get("تفاصيل كاملة", "لا توجد تفاصيل متاحة")
-                                }
-                            }
-                        ]
-                    }
+        owner_filter = {
+            "property": "المالك",
+            "relation": {
+                "contains": owner_id
+            }
+        }
+        
+        count = 0
+        async for _ in self._query_pages(database_id=self.properties_db_id, filter=owner_filter):
+            count += 1
+        return count
+    
+    async def _push_owner_count(self, owner_id: str, properties_count: int):
+        """تحديث حقل عدد العقارات في صفحة المالك"""
+        
+        page = await self._request(
+            self.client.pages.update,
+            page_id=owner_id,
+            properties={
+                "عدد العقارات": {
+                    "number": properties_count
                 }
-            ]
+            }
+        )
+        self.mirror.upsert_owner(page)
+    
+    async def reconcile_owner_counts(self) -> int:
+        """مطابقة دورية لأعداد عقارات الملاك بمسح قاعدتي العقارات والملاك كاملتين مرة واحدة"""
+        
+        try:
+            # المزامنة التزايدية لا تُرجع الصفحات المحذوفة - المسح الكامل يزيل ما لم يعد موجوداً
+            # (تُزال فقط الصفحات التي كانت في المرآة قبل المسح حتى لا تُحذف صفحات أُنشئت أثناءه)
+            stale_owners = set(self.mirror.owners)
+            async for page in self._query_pages(database_id=self.owners_db_id):
+                self.mirror.upsert_owner(page)
+                stale_owners.discard(page["id"])
             
-            await asyncio.to_thread(
-                self.client.blocks.children.append,
-                block_id=page_id,
-                children=children
-            )
+            # عدّ العقارات لكل مالك من علاقة "المالك"
+            stale_properties = set(self.mirror.properties)
+            actual_counts: Dict[str, int] = {}
+            async for page in self._query_pages(database_id=self.properties_db_id):
+                self.mirror.upsert_property(page)
+                stale_properties.discard(page["id"])
+                relation = page.get("properties", {}).get("المالك", {}).get("relation") or []
+                for owner in relation:
+                    actual_counts[owner["id"]] = actual_counts.get(owner["id"], 0) + 1
+            
+            removed_owners = self.mirror.prune_owners(stale_owners)
+            removed_properties = self.mirror.prune_properties(stale_properties)
+            if removed_owners or removed_properties:
+                logger.info(
+                    f"🧹 إزالة {removed_properties} عقار و {removed_owners} مالك "
+                    f"محذوفين من Notion من المرآة المحلية"
+                )
+            
+            local_counts = await self.database.get_owner_property_counts() if self.database else {}
+            owner_ids = set(actual_counts) | set(local_counts) | set(self.mirror.owners)
+            
+            fixed = 0
+            for owner_id in owner_ids:
+                actual = actual_counts.get(owner_id, 0)
+                notion_count = self.mirror.owner_property_count(owner_id)
+                
+                if notion_count is not None and notion_count != actual:
+                    await self._push_owner_count(owner_id, actual)
+                    fixed += 1
+            
+            if self.database:
+                await self.database.set_owner_property_counts(
+                    {owner_id: actual_counts.get(owner_id, 0) for owner_id in owner_ids}
+                )
+            
+            logger.info(f"✅ مطابقة أعداد عقارات الملاك: {len(owner_ids)} مالك - تم تصحيح {fixed}")
+            return fixed
             
         except Exception as e:
-            logger.error(f"❌ خطأ في إضافة المحتوى: {e}")
+            logger.error(f"❌ خطأ في مطابقة أعداد عقارات الملاك: {e}")
+            return 0
+    
+    # حد Notion لطول عنصر rich_text واحد
+    _RICH_TEXT_LIMIT = 2000
+    
+    def _property_content_blocks(self, property_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """محتوى صفحة العقار التفصيلي (يُرسل مع pages.create)"""
+        
+        details = property_data.get("تفاصيل كاملة") or "لا توجد تفاصيل متاحة"
+        
+        return [
+            {
+                "object": "block",
+                "type": "heading_2",
+                "heading_2": {
+                    "rich_text": [
+                        {
+                            "type": "text",
+                            "text": {
+                                "content": "تفاصيل العقار"
+                            }
+                        }
+                    ]
+                }
+            },
+            {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {
+                    # تقسيم النص الطويل حتى لا يُرفض إنشاء الصفحة كاملة
+                    "rich_text": [
+                        {
+                            "type": "text",
+                            "text": {
+                                "content": details[i:i + self._RICH_TEXT_LIMIT]
+                            }
+                        }
+                        for i in range(0, len(details), self._RICH_TEXT_LIMIT)
+                    ]
+                }
+            }
+        ]
     
     def get_property_url(self, page_id: str) -> str:
         """الحصول على رابط صفحة العقار"""
@@ -0,0 +1,216 @@
+"""
+صحة مزودي الذكاء الاصطناعي - Provider Health & Circuit Breaker
+"""
+
+import json
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+# حالات قاطع الدائرة
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# نتائج الاستدعاء
+SUCCESS = "success"
+FAILURE = "failure"
+PARSE_FAILURE = "parse_failure"
+
+def _percentile(samples: List[float], percentile: float) -> Optional[float]:
+    """النسبة المئوية من عينات مرتبة"""
+    if not samples:
+        return None
+    index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+    return samples[index]
+
+class ProviderHealth:
+    """نافذة متحركة لنتائج مزود واحد مع قاطع دائرة"""
+
+    def __init__(self, name: str, window: int = 50):
+        self.name = name
+        self.outcomes = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)  # أزمنة الاستجابات الناجحة فقط
+        self.batch_latencies = deque(maxlen=window)  # أزمنة طلبات الدفعات الناجحة (لا تدخل في الترتيب)
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0  # وقت فعلي (time.time) ليبقى صالحاً بعد إعادة التشغيل
+        self.probe_started = 0.0  # وقت منح محاولة الاختبار نصف المفتوحة الحالية
+
+    def record(self, outcome: str, latency: Optional[float] = None, batch: bool = False):
+        """تسجيل نتيجة استدعاء"""
+
+        self.outcomes.append(outcome)
+        if outcome == SUCCESS:
+            if latency is not None:
+                (self.batch_latencies if batch else self.latencies).append(latency)
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return self.outcomes.count(SUCCESS) / len(self.outcomes)
+
+    @property
+    def parse_failure_rate(self) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return self.outcomes.count(PARSE_FAILURE) / len(self.outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """نسبة مئوية من أزمنة الاستجابة الناجحة"""
+        return _percentile(sorted(self.latencies), percentile)
+
+    def batch_latency_percentile(self, percentile: float) -> Optional[float]:
+        """نسبة مئوية من أزمنة طلبات الدفعات الناجحة"""
+        return _percentile(sorted(self.batch_latencies), percentile)
+
+    def expected_cost(self) -> float:
+        """الزمن المتوقع للحصول على نتيجة صالحة (الوسيط ÷ نسبة النجاح)"""
+
+        p50 = self.latency_percentile(50)
+        success_rate = self.success_rate
+        if p50 is None or not success_rate:
+            return float("inf")
+        return p50 / success_rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        """الحالة القابلة للحفظ"""
+        return {
+            "outcomes": list(self.outcomes),
+            "latencies": [round(latency, 3) for latency in self.latencies],
+            "batch_latencies": [round(latency, 3) for latency in self.batch_latencies],
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_at": self.opened_at
+        }
+
+    def load(self, data: Dict[str, Any]):
+        """استعادة الحالة المحفوظة"""
+
+        self.outcomes.extend(data.get("outcomes", []))
+        self.latencies.extend(data.get("latencies", []))
+        self.batch_latencies.extend(data.get("batch_latencies", []))
+        self.state = data.get("state", CLOSED)
+        self.consecutive_failures = data.get("consecutive_failures", 0)
+        self.opened_at = data.get("opened_at", 0.0)
+
+        # اختبار نصف مفتوح لم يكتمل قبل الإيقاف يعود مفتوحاً
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+
+class ProviderHealthTracker:
+    """تتبع صحة المزودين وترتيبهم ديناميكياً حسب الأسرع بين السليمين"""
+
+    def __init__(self, names: List[str], window: int = 50,
+                 failure_threshold: int = 3, cooldown: float = 120.0):
+        self.window = window
+        self.failure_threshold = max(1, failure_threshold)  # إخفاقات متتالية تفتح الدائرة
+        self.cooldown = cooldown  # ثوانٍ قبل محاولة الاختبار
+        self.providers: Dict[str, ProviderHealth] = {
+            name: ProviderHealth(name, window) for name in names
+        }
+
+    def get(self, name: str) -> ProviderHealth:
+        if name not in self.providers:
+            self.providers[name] = ProviderHealth(name, self.window)
+        return self.providers[name]
+
+    def record(self, name: str, outcome: str, latency: Optional[float] = None, batch: bool = False):
+        """تسجيل نتيجة وتحديث حالة قاطع الدائرة (batch: زمن طلب دفعة كاملة)"""
+
+        health = self.get(name)
+        health.record(outcome, latency, batch)
+
+        if health.state == HALF_OPEN:
+            health.probe_started = 0.0
+            if outcome == SUCCESS:
+                health.state = CLOSED
+            else:
+                self._open(health)
+        elif health.state == CLOSED and health.consecutive_failures >= self.failure_threshold:
+            self._open(health)
+
+    def _open(self, health: ProviderHealth):
+        health.state = OPEN
+        health.opened_at = time.time()
+
+    def _refresh(self, health: ProviderHealth):
+        """الانتقال من مفتوح إلى نصف مفتوح بعد انقضاء مهلة التبريد"""
+        if health.state == OPEN and time.time() - health.opened_at >= self.cooldown:
+            health.state = HALF_OPEN
+            health.probe_started = 0.0
+
+    def is_open(self, name: str) -> bool:
+        return self.get(name).state == OPEN
+
+    def is_probe(self, name: str) -> bool:
+        """هل استدعاء المزود الحالي محاولة اختبار نصف مفتوحة"""
+        return self.get(name).state == HALF_OPEN
+
+    def ordered(self, providers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """ترتيب المزودين: اختبارات نصف مفتوحة أولاً ثم السليمون حسب الزمن المتوقع"""
+
+        # المزودون بلا قياسات يحتفظون بترتيب الإعدادات بعد المقاسين (الترتيب مستقر)
+        probes, closed = [], []
+        for provider in providers:
+            health = self.get(provider["name"])
+            self._refresh(health)
+            if health.state == HALF_OPEN:
+                # محاولة اختبار واحدة في كل مرة؛ تُمنح من جديد إذا لم تُستخدم خلال مهلة التبريد
+                now = time.time()
+                if now - health.probe_started >= self.cooldown:
+                    health.probe_started = now
+                    probes.append(provider)
+            elif health.state == CLOSED:
+                closed.append(provider)
+
+        closed.sort(key=lambda provider: self.get(provider["name"]).expected_cost())
+        return probes + closed
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """ملخص صحة المزودين للعرض"""
+
+        snapshot = {}
+        for name, health in self.providers.items():
+            self._refresh(health)
+            success_rate = health.success_rate
+            parse_failure_rate = health.parse_failure_rate
+            p50 = health.latency_percentile(50)
+            p95 = health.latency_percentile(95)
+            batch_p50 = health.batch_latency_percentile(50)
+            snapshot[name] = {
+                "state": health.state,
+                "samples": len(health.outcomes),
+                "success_rate": round(success_rate, 3) if success_rate is not None else None,
+                "parse_failure_rate": round(parse_failure_rate, 3) if parse_failure_rate is not None else None,
+                "latency_p50": round(p50, 3) if p50 is not None else None,
+                "latency_p95": round(p95, 3) if p95 is not None else None,
+                "batch_latency_p50": round(batch_p50, 3) if batch_p50 is not None else None,
+                "consecutive_failures": health.consecutive_failures
+            }
+        return snapshot
+
+    def to_json(self) -> str:
+        """تسلسل الحالة للحفظ في قاعدة البيانات"""
+        return json.dumps(
+            {name: health.to_dict() for name, health in self.providers.items()},
+            ensure_ascii=False
+        )
+
+    def load_json(self, value: Optional[str]):
+        """استعادة الحالة المحفوظة (تُتجاهل البيانات التالفة)"""
+
+        if not value:
+            return
+        try:
+            data = json.loads(value)
+        except json.JSONDecodeError:
+            return
+        for name, provider_data in data.items():
+            if isinstance(provider_data, dict):
+                self.get(name).load(provider_data)
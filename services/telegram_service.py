@@ -32,6 +32,9 @@ class TelegramService:
         
         self.session = None
         
+        # أكبر update_id تم استلامه في آخر استدعاء لـ getUpdates
+        self.last_update_id: Optional[int] = None
+        
     async def __aenter__(self):
         """Context manager entry"""
         self.session = aiohttp.ClientSession()
@@ -42,22 +45,39 @@ class TelegramService:
         if self.session:
             await self.session.close()
     
-    async def get_channel_messages(self, limit: int = 100, apply_filter: bool = True) -> List[Dict[str, Any]]:
-        """الحصول على رسائل القناة مع تطبيق فلتر الوسم"""
+    async def get_channel_messages(self, limit: int = 100, apply_filter: bool = True,
+                                   offset: Optional[int] = None, timeout: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """الحصول على رسائل القناة مع تطبيق فلتر الوسم (None عند فشل الجلب)"""
         
+        # offset: أول update_id مطلوب (التحديثات الأقدم تُعتبر مؤكدة ولا تُعاد)
+        # timeout: مدة الانتظار الطويل بالثواني حتى وصول تحديث جديد (0 = بدون انتظار)
         try:
             if not self.session:
                 self.session = aiohttp.ClientSession()
                 
             url = f"{self.main_bot_url}/getUpdates"
-            params = {"limit": limit, "allowed_updates": ["channel_post"]}
+            params = {
+                "limit": limit,
+                "timeout": timeout,
+                "allowed_updates": json.dumps(["channel_post"])
+            }
+            if offset is not None:
+                params["offset"] = offset
             
-            async with self.session.get(url, params=params) as response:
+            # مهلة الطلب يجب أن تتجاوز مدة الانتظار الطويل
+            request_timeout = aiohttp.ClientTimeout(total=timeout + 30)
+            
+            async with self.session.get(url, params=params, timeout=request_timeout) as response:
                 if response.status == 200:
                     data = await response.json()
                     if data.get("ok"):
                         messages = []
                         for update in data.get("result", []):
+                            # تتبع آخر تحديث حتى للتحديثات المستبعدة بالفلتر
+                            update_id = update.get("update_id")
+                            if update_id is not None and (self.last_update_id is None or update_id > self.last_update_id):
+                                self.last_update_id = update_id
+                            
                             if "channel_post" in update:
                                 channel_post = update["channel_post"]
                                 if str(channel_post.get("chat", {}).get("id")) == self.channel_id:
@@ -78,8 +98,31 @@ class TelegramService:
                     
         except Exception as e:
             logger.error(f"❌ خطأ في الحصول على الرسائل: {e}")
+        
+        # فشل HTTP أو API أو الشبكة - يختلف عن استطلاع فارغ ([]) حتى يطبق المستدعي التراجع
+        return None
+    
+    async def acknowledge_updates(self, last_update_id: int) -> bool:
+        """تأكيد استلام التحديثات حتى last_update_id حتى لا يعيدها Telegram"""
+        
+        try:
+            if not self.session:
+                self.session = aiohttp.ClientSession()
             
-        return []
+            url = f"{self.main_bot_url}/getUpdates"
+            params = {"offset": last_update_id + 1, "limit": 1, "timeout": 0}
+            
+            async with self.session.get(url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return bool(data.get("ok"))
+                
+                logger.error(f"❌ خطأ HTTP في تأكيد التحديثات: {response.status}")
+                
+        except Exception as e:
+            logger.error(f"❌ خطأ في تأكيد التحديثات: {e}")
+            
+        return False
     
     def _should_process_message(self, message: Dict[str, Any]) -> bool:
         """تحديد ما إذا كان يجب معالجة الرسالة أم لا بناءً على الفلترة"""
@@ -226,12 +269,13 @@ class TelegramService:
             
         return False
     
-    async def add_message_tag(self, message_id: int, tag: str) -> bool:
+    async def add_message_tag(self, message_id: int, tag: str, original_text: Optional[str] = None) -> bool:
         """إضافة وسم للرسالة عبر التعديل"""
         
         try:
-            # الحصول على النص الأصلي للرسالة
-            original_text = await self._get_message_text(message_id)
+            # الحصول على النص الأصلي للرسالة (التحديثات المؤكدة لا تُعاد من getUpdates)
+            if not original_text:
+                original_text = await self._get_message_text(message_id)
             if not original_text:
                 return False
             
@@ -253,7 +297,7 @@ class TelegramService:
             # لذا نحصل على آخر الرسائل ونبحث عن المطلوبة
             messages = await self.get_channel_messages(limit=100, apply_filter=False)
             
-            for message in messages:
+            for message in messages or []:
                 if message["message_id"] == message_id:
                     return message["text"]
             
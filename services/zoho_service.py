@@ -5,9 +5,11 @@
 
 import asyncio
 import json
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, AsyncIterator
 import aiohttp
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from models.property import PropertyData
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -15,8 +17,21 @@ logger = setup_logger(__name__)
 class ZohoService:
     """خدمة التعامل مع Zoho CRM - موديول Aqar الجديد"""
     
+    # حد Zoho لعدد السجلات في طلب واحد
+    UPSERT_CHUNK_SIZE = 100
+    
+    # حقول منع التكرار في upsert (سجل واحد لكل مالك، ثم لكل وحدة)
+    DUPLICATE_CHECK_FIELDS = ["Owner_Phone", "Unit_Code"]
+    
+    # حقول سجل المالك الموجود التي تُلحق بها الوحدات الجديدة بدلاً من استبدالها (عقار متعدد)
+    APPEND_FIELDS = ["Unit_Code", "Full_Details", "Features", "Address"]
+    
+    # تحديث التوكن قبل انتهائه بهذه المدة (ثواني)
+    TOKEN_REFRESH_MARGIN = 300
+    
     def __init__(self, client_id: str, client_secret: str, 
-                 refresh_token: str, access_token: str, module_name: str = "Aqar"):
+                 refresh_token: str, access_token: str, module_name: str = "Aqar",
+                 pool_limit: int = 10, database=None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.refresh_token = refresh_token
@@ -26,6 +41,18 @@ class ZohoService:
         self.base_url = "https://www.zohoapis.com/crm/v2"
         self.token_url = "https://accounts.zoho.com/oauth/v2/token"
         self.session = None
+        self.pool_limit = pool_limit
+        
+        # التوكن المخزن وموعد انتهائه (time.monotonic)، التوكن الممرر بدون مدة يُحدَّث عند أول استخدام
+        self.token_expires_at = 0.0
+        self.token_refreshes = 0
+        self._token_lock = asyncio.Lock()
+        
+        # هل أُنشئت الجلسة داخل async with (تُغلق عند الخروج)
+        self._close_on_exit = False
+        
+        # قاعدة البيانات المحلية لطابور upsert الدفعي (يُرسل في نهاية دورة المعالجة)
+        self.database = database
         
         # خريطة الحقول المحدثة لموديول Aqar
         self.field_map = {
@@ -53,21 +80,59 @@ class ZohoService:
         
     async def __aenter__(self):
         """Context manager entry"""
-        self.session = aiohttp.ClientSession()
-        await self.refresh_access_token()
+        # العميل طويل العمر (بعد start) يحتفظ بجلسته وتوكنه بين الاستخدامات
+        self._close_on_exit = not self.session or self.session.closed
+        await self.start()
+        await self.ensure_access_token()
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
-        if self.session:
+        if self._close_on_exit:
+            await self.close()
+    
+    async def start(self):
+        """إنشاء جلسة HTTP المشتركة مع تجميع الاتصالات"""
+        
+        if self.session and not self.session.closed:
+            return
+        
+        connector = aiohttp.TCPConnector(limit=self.pool_limit, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector)
+    
+    async def close(self):
+        """إغلاق جلسة HTTP"""
+        
+        if self.session and not self.session.closed:
             await self.session.close()
+        self.session = None
+    
+    def _token_is_fresh(self) -> bool:
+        """هل التوكن صالح ولم يقترب من الانتهاء"""
+        return bool(self.access_token) and time.monotonic() < self.token_expires_at - self.TOKEN_REFRESH_MARGIN
+    
+    async def ensure_access_token(self) -> bool:
+        """التأكد من صلاحية التوكن وتحديثه مسبقاً قبل انتهائه"""
+        
+        if self._token_is_fresh():
+            return True
+        return await self.refresh_access_token()
     
     async def refresh_access_token(self) -> bool:
-        """تحديث access token"""
+        """تحديث access token (طلب واحد فقط للطالبين المتزامنين)"""
+        
+        stale_token = self.access_token
+        async with self._token_lock:
+            # طالب آخر حدّث التوكن أثناء الانتظار
+            if self.access_token != stale_token and self._token_is_fresh():
+                return True
+            return await self._request_access_token()
+    
+    async def _request_access_token(self) -> bool:
+        """طلب access token جديد من Zoho"""
         
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            await self.start()
                 
             data = {
                 "refresh_token": self.refresh_token,
@@ -81,6 +146,8 @@ class ZohoService:
                     result = await response.json()
                     if "access_token" in result:
                         self.access_token = result["access_token"]
+                        self.token_expires_at = time.monotonic() + int(result.get("expires_in", 3600))
+                        self.token_refreshes += 1
                         logger.info("✅ تم تحديث Zoho access token")
                         return True
                     else:
@@ -97,8 +164,7 @@ class ZohoService:
         """إنشاء سجل جديد في موديول Aqar"""
         
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            await self.start()
             
             # تحويل البيانات إلى تنسيق Zoho
             zoho_data = self._convert_to_zoho_format(property_data)
@@ -135,56 +201,171 @@ class ZohoService:
             
         return None
     
-    async def search_record(self, field_name: str, field_value: str) -> Optional[Dict[str, Any]]:
-        """البحث عن سجل بواسطة حقل معين"""
+    async def queue_upsert(self, property_data: PropertyData, merge_existing: bool = False):
+        """إضافة عقار لطابور upsert الدفعي في قاعدة البيانات (merge_existing: دمج مع سجل المالك الموجود)"""
+        await self.database.queue_zoho_upsert(property_data.telegram_message_id, merge_existing)
+    
+    async def flush_upserts(self, max_attempts: int = 3) -> List[PropertyData]:
+        """إرسال طابور upsert بدفعات من 100 سجل وإرجاع العقارات التي حصلت على zoho_lead_id"""
         
-        try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+        queue = await self.database.get_zoho_upsert_queue(max_attempts)
+        if not queue:
+            return []
+        
+        # دمج عقارات نفس المالك في سجل واحد (Zoho يرفض تكرار مفتاح upsert في نفس الطلب)
+        groups: Dict[str, List[PropertyData]] = {}
+        merge_owners = set()
+        for property_data, merge_existing in queue:
+            key = property_data.owner_phone or property_data.unit_code or f"id-{property_data.telegram_message_id}"
+            groups.setdefault(key, []).append(property_data)
+            if merge_existing and property_data.owner_phone:
+                merge_owners.add(key)
+        
+        records = []
+        owners = []
+        for key, group in groups.items():
+            existing = None
+            if key in merge_owners:
+                # العقار المتعدد يُلحق بسجل المالك الموجود؛ فشل البحث يؤجل المالك بدلاً من استبدال سجله
+                try:
+                    existing = await self._search(f"Owner_Phone:equals:{key}")
+                except Exception as e:
+                    logger.error(f"❌ خطأ في البحث عن سجل المالك {key} في Zoho: {e}")
+                    await self.database.fail_zoho_upserts(
+                        [p.telegram_message_id for p in group], str(e), count_attempt=False
+                    )
+                    continue
+            records.append(self._build_upsert_record(group, existing))
+            owners.append(group)
+        
+        updated: List[PropertyData] = []
+        for start in range(0, len(records), self.UPSERT_CHUNK_SIZE):
+            chunk_records = records[start:start + self.UPSERT_CHUNK_SIZE]
+            chunk_owners = owners[start:start + self.UPSERT_CHUNK_SIZE]
             
-            # تحويل اسم الحقل إلى تنسيق Zoho
-            zoho_field = self.field_map.get(field_name, field_name)
+            results = await self._upsert_chunk(chunk_records)
+            if results is None:
+                # خطأ في الطلب كاملاً: تبقى العقارات في الطابور للدورة التالية بدون احتساب محاولة
+                await self.database.fail_zoho_upserts(
+                    [p.telegram_message_id for group in chunk_owners for p in group],
+                    "خطأ في طلب upsert", count_attempt=False
+                )
+                continue
+            
+            # نتائج Zoho بنفس ترتيب السجلات المرسلة
+            record_ids: Dict[int, str] = {}
+            for group, result in zip(chunk_owners, results):
+                if result.get("status") == "success":
+                    record_id = result["details"]["id"]
+                    for property_data in group:
+                        property_data.zoho_lead_id = record_id
+                        record_ids[property_data.telegram_message_id] = record_id
+                    updated.extend(group)
+                else:
+                    error = f"{result.get('code')} - {result.get('message')}"
+                    logger.error(f"❌ فشل upsert سجل في Zoho: {error}")
+                    await self.database.fail_zoho_upserts([p.telegram_message_id for p in group], error)
             
-            url = f"{self.base_url}/{self.module_name}/search"
+            await self.database.complete_zoho_upserts(record_ids)
+        
+        logger.info(f"✅ Zoho upsert: {len(updated)}/{len(queue)} عقار في {len(records)} سجل")
+        return updated
+    
+    def _build_upsert_record(self, group: List[PropertyData],
+                             existing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """سجل upsert واحد لعقارات مالك واحد (مع الإلحاق بسجله الموجود في Zoho إن وُجد)"""
+        
+        record = self._convert_to_zoho_format(group[0].to_dict())
+        if existing:
+            kept = {field: existing[field] for field in self.APPEND_FIELDS if existing.get(field)}
+            record.update(self._merge_property_data(kept, group[0].to_dict()))
+        for extra in group[1:]:
+            record = self._merge_property_data(record, extra.to_dict())
+        return record
+    
+    async def _upsert_chunk(self, records: List[Dict[str, Any]], retry: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """طلب upsert واحد لدفعة سجلات"""
+        
+        try:
+            await self.start()
+            
+            url = f"{self.base_url}/{self.module_name}/upsert"
             headers = {
                 "Authorization": f"Zoho-oauthtoken {self.access_token}",
                 "Content-Type": "application/json"
             }
             
-            params = {
-                "criteria": f"{zoho_field}:equals:{field_value}"
+            payload = {
+                "data": records,
+                "duplicate_check_fields": self.DUPLICATE_CHECK_FIELDS
             }
             
-            async with self.session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
+            async with self.session.post(url, json=payload, headers=headers) as response:
+                if response.status in (200, 201, 202, 207):
                     result = await response.json()
-                    if result.get("data") and len(result["data"]) > 0:
-                        record = result["data"][0]
-                        logger.info(f"✅ تم العثور على السجل في Zoho: {record['id']}")
-                        return record
-                elif response.status == 204:
-                    # لا توجد نتائج
-                    logger.info(f"📝 لم يتم العثور على سجل بـ {field_name}: {field_value}")
-                    return None
-                elif response.status == 401:
+                    return result.get("data", [])
+                elif response.status == 401 and retry:
                     # إعادة تحديث التوكن والمحاولة مرة أخرى
                     if await self.refresh_access_token():
-                        return await self.search_record(field_name, field_value)
+                        return await self._upsert_chunk(records, retry=False)
                 else:
                     error_text = await response.text()
-                    logger.error(f"❌ خطأ HTTP في البحث: {response.status} - {error_text}")
+                    logger.error(f"❌ خطأ HTTP في upsert: {response.status} - {error_text}")
+                    
+        except Exception as e:
+            logger.error(f"❌ خطأ في upsert: {e}")
+            
+        return None
+    
+    async def search_record(self, field_name: str, field_value: str) -> Optional[Dict[str, Any]]:
+        """البحث عن سجل بواسطة حقل معين"""
+        
+        try:
+            # تحويل اسم الحقل إلى تنسيق Zoho
+            zoho_field = self.field_map.get(field_name, field_name)
+            
+            record = await self._search(f"{zoho_field}:equals:{field_value}")
+            if record:
+                logger.info(f"✅ تم العثور على السجل في Zoho: {record['id']}")
+            else:
+                logger.info(f"📝 لم يتم العثور على سجل بـ {field_name}: {field_value}")
+            return record
                     
         except Exception as e:
             logger.error(f"❌ خطأ في البحث: {e}")
             
         return None
     
+    async def _search(self, criteria: str, retry: bool = True) -> Optional[Dict[str, Any]]:
+        """أول سجل مطابق لشرط البحث (None إذا لم يوجد، واستثناء عند خطأ الطلب)"""
+        
+        await self.start()
+        
+        url = f"{self.base_url}/{self.module_name}/search"
+        headers = {
+            "Authorization": f"Zoho-oauthtoken {self.access_token}",
+            "Content-Type": "application/json"
+        }
+        
+        async with self.session.get(url, params={"criteria": criteria}, headers=headers) as response:
+            if response.status == 200:
+                result = await response.json()
+                return result["data"][0] if result.get("data") else None
+            elif response.status == 204:
+                # لا توجد نتائج
+                return None
+            elif response.status == 401 and retry and await self.refresh_access_token():
+                # إعادة تحديث التوكن والمحاولة مرة أخرى
+                return await self._search(criteria, retry=False)
+            
+            error_text = await response.text()
+            raise Exception(f"خطأ HTTP في البحث: {response.status} - {error_text}")
+    
     async def update_record(self, record_id: str, property_data: Dict[str, Any]) -> bool:
         """تحديث سجل موجود"""
         
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            await self.start()
             
             # تحويل البيانات إلى تنسيق Zoho
             zoho_data = self._convert_to_zoho_format(property_data)
@@ -244,8 +425,7 @@ class ZohoService:
         """الحصول على سجل بواسطة ID"""
         
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
+            await self.start()
             
             url = f"{self.base_url}/{self.module_name}/{record_id}"
             headers = {
@@ -321,7 +501,8 @@ class ZohoService:
             existing_value = existing_record.get(field, "")
             new_value = new_property_data.get(self._get_arabic_field(field), "")
             
-            if new_value and new_value != existing_value:
+            # الاحتواء بدلاً من المساواة حتى لا تتكرر القيمة عند إعادة إرسال نفس الطابور
+            if new_value and new_value not in existing_value:
                 if existing_value:
                     merged_data[field] = f"{existing_value} | {new_value}"
                 else:
@@ -347,68 +528,112 @@ class ZohoService:
         reverse_map = {v: k for k, v in self.field_map.items()}
         return reverse_map.get(english_field, english_field)
     
-    async def get_daily_report_data(self, date: datetime) -> Dict[str, Any]:
-        """الحصول على بيانات التقرير اليومي"""
+    # حد Zoho لعدد السجلات في الصفحة الواحدة
+    REPORT_PAGE_SIZE = 200
+    
+    async def iter_records(self, criteria: str, per_page: int = REPORT_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """المرور على جميع السجلات المطابقة صفحة بصفحة بدون تحميلها كاملة"""
         
-        try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
-            # تحديد نطاق التاريخ
-            start_date = date.strftime("%Y-%m-%d")
-            end_date = (date + timedelta(days=1)).strftime("%Y-%m-%d")
-            
-            url = f"{self.base_url}/{self.module_name}"
+        await self.start()
+        await self.ensure_access_token()
+        
+        url = f"{self.base_url}/{self.module_name}/search"
+        params = {"criteria": criteria, "per_page": per_page, "page": 1}
+        refreshed = False
+        
+        while True:
             headers = {
                 "Authorization": f"Zoho-oauthtoken {self.access_token}",
                 "Content-Type": "application/json"
             }
             
-            params = {
-                "criteria": f"Created_Time:between:{start_date}T00:00:00+00:00,{end_date}T00:00:00+00:00"
-            }
-            
             async with self.session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    records = result.get("data", [])
-                    
-                    # تحليل البيانات لإنشاء التقرير
-                    report_data = {
-                        "total_records": len(records),
-                        "by_employee": {},
-                        "by_region": {},
-                        "by_status": {},
-                        "records": records
-                    }
-                    
-                    for record in records:
-                        # حسب الموظف
-                        employee = record.get("Employee_Name", "غير محدد")
-                        report_data["by_employee"][employee] = report_data["by_employee"].get(employee, 0) + 1
-                        
-                        # حسب المنطقة
-                        region = record.get("Region", "غير محدد")
-                        report_data["by_region"][region] = report_data["by_region"].get(region, 0) + 1
-                        
-                        # حسب الحالة
-                        status = record.get("Status", ["غير محدد"])
-                        if isinstance(status, str):
-                            status = [status]
-                        for s in status:
-                            report_data["by_status"][s] = report_data["by_status"].get(s, 0) + 1
-                    
-                    logger.info(f"✅ تم الحصول على بيانات التقرير: {len(records)} سجل")
-                    return report_data
-                    
-                elif response.status == 401:
+                if response.status == 204:
+                    # لا توجد نتائج
+                    return
+                elif response.status == 401 and not refreshed:
+                    refreshed = True
                     if await self.refresh_access_token():
-                        return await self.get_daily_report_data(date)
-                else:
+                        continue
+                    return
+                elif response.status != 200:
                     error_text = await response.text()
-                    logger.error(f"❌ خطأ في الحصول على بيانات التقرير: {response.status} - {error_text}")
-                    
+                    raise Exception(f"خطأ HTTP في جلب السجلات: {response.status} - {error_text}")
+                
+                result = await response.json()
+            
+            refreshed = False
+            for record in result.get("data", []):
+                yield record
+            
+            info = result.get("info", {})
+            if not info.get("more_records"):
+                return
+            
+            # نقطة البحث تُقسَّم برقم الصفحة فقط (page_token خاص بجلب السجلات بدون بحث)
+            params["page"] += 1
+    
+    async def iter_records_between(self, start_date: datetime, end_date: datetime) -> AsyncIterator[Dict[str, Any]]:
+        """المرور على السجلات المنشأة في نطاق تاريخ (يوماً بيوم لتجنب حد نتائج البحث)"""
+        
+        # التواريخ بدون منطقة زمنية تُعامل كوقت محلي وتُحوَّل إلى UTC قبل إرسالها
+        day = datetime(start_date.year, start_date.month, start_date.day, tzinfo=start_date.tzinfo)
+        while day < end_date:
+            next_day = min(day + timedelta(days=1), end_date)
+            criteria = (
+                f"Created_Time:between:{self._format_utc(day)},"
+                f"{self._format_utc(next_day)}"
+            )
+            async for record in self.iter_records(criteria):
+                yield record
+            day = next_day
+    
+    @staticmethod
+    def _format_utc(value: datetime) -> str:
+        """تنسيق وقت Zoho بتوقيت UTC (الوقت بدون منطقة زمنية يُعتبر محلياً)"""
+        return value.astimezone(timezone.utc).isoformat(timespec="seconds")
+    
+    async def get_report_data(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """بيانات تقرير نطاق تاريخ مجمعة تدريجياً (بدون الاحتفاظ بالسجلات الخام)"""
+        
+        report_data = {
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "total_records": 0,
+            "by_employee": {},
+            "by_region": {},
+            "by_status": {}
+        }
+        
+        try:
+            async for record in self.iter_records_between(start_date, end_date):
+                report_data["total_records"] += 1
+                
+                # حسب الموظف
+                employee = record.get("Employee_Name") or "غير محدد"
+                report_data["by_employee"][employee] = report_data["by_employee"].get(employee, 0) + 1
+                
+                # حسب المنطقة
+                region = record.get("Region") or "غير محدد"
+                report_data["by_region"][region] = report_data["by_region"].get(region, 0) + 1
+                
+                # حسب الحالة
+                status = record.get("Status") or ["غير محدد"]
+                if isinstance(status, str):
+                    status = [status]
+                for s in status:
+                    report_data["by_status"][s] = report_data["by_status"].get(s, 0) + 1
+            
+            logger.info(f"✅ تم الحصول على بيانات التقرير: {report_data['total_records']} سجل")
+            return report_data
+            
         except Exception as e:
             logger.error(f"❌ خطأ في إنشاء التقرير: {e}")
             
         return {}
+    
+    async def get_daily_report_data(self, date: datetime) -> Dict[str, Any]:
+        """الحصول على بيانات التقرير اليومي"""
+        
+        start_date = datetime(date.year, date.month, date.day)
+        return await self.get_report_data(start_date, start_date + timedelta(days=1))
@@ -118,17 +118,20 @@ function animateCounter(element, targetValue) {
 }
 
 // تحميل العقارات
-async function loadProperties(status = '', limit = 50, offset = 0) {
+async function loadProperties(status = '', limit = 50, cursor = '') {
     try {
         const params = new URLSearchParams({
-            limit: limit.toString(),
-            offset: offset.toString()
+            limit: limit.toString()
         });
         
         if (status) {
             params.append('status', status);
         }
         
+        if (cursor) {
+            params.append('cursor', cursor);
+        }
+        
         const response = await fetch(`/api/properties?${params}`);
         if (!response.ok) throw new Error('فشل في تحميل العقارات');
         
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+اختبار مطابقة القيم المعتمدة في نصوص الإعلانات (الكلمات الكاملة فقط)
+"""
+
+from config import Config
+from utils.arabic_text import ApprovedTermsMatcher, KeywordMatcher
+
+def test_partial_word_is_not_matched():
+    """"ايمن" داخل "الأيمن" ليس اسم الموظف"""
+
+    terms = ApprovedTermsMatcher(Config())
+    result = terms.match("شقة في الجانب الأيمن من العمارة، مكيفة، تبع بلبل")
+
+    assert result[ApprovedTermsMatcher.EMPLOYEE] == ["بلبل"]
+    assert result[ApprovedTermsMatcher.FEATURE] == ["مكيفه"]
+
+def test_whole_words_are_matched():
+    """الكلمة الكاملة تُطابق بأي شكل إملائي وبعد علامات الترقيم"""
+
+    matcher = KeywordMatcher()
+    matcher.add("ايمن")
+    matcher.add("حديقه")
+
+    assert matcher.values("تبع أيمن") == ["ايمن"]
+    assert matcher.values("(حديقة)") == ["حديقه"]
+    assert matcher.values("حديقتين، حديقهم، الأيمنى") == []
+
+def test_definite_article_for_regions_and_features_only():
+    """"الرحاب" و"الحديقة" تطابق المنطقة والميزة، و"الأيمن" لا تطابق الموظف"""
+
+    terms = ApprovedTermsMatcher(Config())
+    result = terms.match("شقة في الرحاب بالحديقة، الدور الأيمن")
+
+    assert result[ApprovedTermsMatcher.REGION] == ["رحاب"]
+    assert result[ApprovedTermsMatcher.FEATURE] == ["حديقه"]
+    assert result[ApprovedTermsMatcher.EMPLOYEE] == []
+
+def test_attached_conjunction_is_matched():
+    """حرف العطف أو الجر المتصل في بداية الكلمة لا يمنع المطابقة"""
+
+    matcher = KeywordMatcher()
+    matcher.add("حديقه")
+    matcher.add("التجمع الخامس")
+
+    assert matcher.values("مكيفة وحديقة بالتجمع الخامس") == ["حديقه", "التجمع الخامس"]
+
+if __name__ == "__main__":
+    test_partial_word_is_not_matched()
+    test_whole_words_are_matched()
+    test_definite_article_for_regions_and_features_only()
+    test_attached_conjunction_is_matched()
+    print("✅ نجحت جميع اختبارات مطابقة الكلمات")
@@ -54,7 +54,7 @@ async def test_fixed_system():
     try:
         async with TelegramService(config) as telegram:
             # اختبار جلب الرسائل
-            messages = await telegram.get_channel_messages(limit=5, apply_filter=False)
+            messages = await telegram.get_channel_messages(limit=5, apply_filter=False) or []
             print(f"✅ تم جلب {len(messages)} رسالة من القناة")
             
             # اختبار إرسال رسالة تجريبية بسيطة
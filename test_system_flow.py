@@ -56,7 +56,7 @@ async def test_system():
     try:
         async with TelegramService(config) as telegram:
             # جلب آخر الرسائل
-            messages = await telegram.get_channel_messages(limit=5, apply_filter=False)
+            messages = await telegram.get_channel_messages(limit=5, apply_filter=False) or []
             print(f"✅ تم جلب {len(messages)} رسالة من القناة")
             
             # إرسال رسالة تجريبية
@@ -141,7 +141,7 @@ async def test_system():
                 await asyncio.sleep(2)
                 
                 # جلب الرسائل الجديدة ومعالجتها
-                new_messages = await telegram.get_channel_messages(limit=10, apply_filter=True)
+                new_messages = await telegram.get_channel_messages(limit=10, apply_filter=True) or []
                 print(f"📨 تم جلب {len(new_messages)} رسالة جديدة للمعالجة")
                 
                 if new_messages:
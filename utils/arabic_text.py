@@ -0,0 +1,186 @@
+"""
+مطابقة النصوص العربية - Arabic Normalization & Multi-pattern Matching
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# جدول توحيد حرف بحرف (ترجمة واحدة عبر النص): أشكال الألف والياء والتاء المربوطة
+# والأرقام العربية الهندية والفارسية، وحذف التشكيل والتطويل
+_FOLD_TABLE = {
+    **{ord(c): "ا" for c in "أإآٱ"},
+    ord("ى"): "ي",
+    ord("ئ"): "ي",
+    ord("ؤ"): "و",
+    ord("ة"): "ه",
+    **{0x0660 + d: str(d) for d in range(10)},  # ٠-٩
+    **{0x06F0 + d: str(d) for d in range(10)},  # ۰-۹ (فارسي)
+    **{c: None for c in range(0x064B, 0x0653)},  # التشكيل
+    0x0670: None,  # الألف الخنجرية
+    0x0640: None,  # التطويل
+    ord("٬"): ",",
+    ord("،"): ","
+}
+
+# حروف العطف والجر المتصلة المسموح بها قبل الكلمة المطابقة (وحديقه، بالتجمع)
+_PROCLITICS = frozenset("وبفلك")
+
+def normalize_arabic(text: Optional[str]) -> str:
+    """توحيد النص العربي للمقارنة: الحروف والأرقام والتشكيل والمسافات والأحرف اللاتينية الصغيرة"""
+    return " ".join((text or "").translate(_FOLD_TABLE).lower().split())
+
+def is_whole_word(text: str, start: int, end: int) -> bool:
+    """هل المطابقة [start:end] كلمة كاملة: لا حرف أو رقم بعدها، ولا قبلها إلا حرف عطف/جر متصل في بداية الكلمة"""
+    
+    if end < len(text) and text[end].isalnum():
+        return False
+    if start == 0 or not text[start - 1].isalnum():
+        return True
+    return text[start - 1] in _PROCLITICS and (start == 1 or not text[start - 2].isalnum())
+
+class KeywordMatcher:
+    """مطابقة متعددة الأنماط بخوارزمية Aho-Corasick - مرور واحد على النص مهما كان حجم القاموس"""
+    
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        self._patterns: List[Tuple[int, Any]] = []  # (طول النمط المُطبَّع، القيمة المرتبطة)
+        self._built = False
+    
+    def __len__(self) -> int:
+        return len(self._patterns)
+    
+    def add(self, pattern: str, value: Any = None):
+        """إضافة نمط (يُطبَّع) مع القيمة التي تُرجع عند مطابقته"""
+        
+        pattern = normalize_arabic(pattern)
+        if not pattern:
+            return
+        
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        
+        self._outputs[state].append(len(self._patterns))
+        self._patterns.append((len(pattern), pattern if value is None else value))
+        self._built = False
+    
+    def add_all(self, patterns: Iterable[str], value: Any = None):
+        for pattern in patterns:
+            self.add(pattern, value)
+    
+    def build(self):
+        """بناء روابط الفشل بالعرض أولاً ودمج مخرجات اللواحق"""
+        
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        
+        self._built = True
+    
+    def iter_matches(self, normalized_text: str):
+        """كل المطابقات (بداية، نهاية، القيمة) في نص مُطبَّع مسبقاً"""
+        
+        if not self._built:
+            self.build()
+        
+        goto, fail, outputs, patterns = self._goto, self._fail, self._outputs, self._patterns
+        state = 0
+        for index, char in enumerate(normalized_text):
+            next_state = goto[state].get(char)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(char)
+            state = next_state or 0
+            if outputs[state]:
+                for pattern_id in outputs[state]:
+                    length, value = patterns[pattern_id]
+                    yield index + 1 - length, index + 1, value
+    
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """مطابقات الكلمات الكاملة غير المتداخلة في النص (الأسبق ثم الأطول)"""
+        
+        # "ايمن" لا يطابق "الايمن" ولا "حديقه" يطابق "حديقهم"
+        normalized = normalize_arabic(text)
+        matches = sorted(
+            (match for match in self.iter_matches(normalized) if is_whole_word(normalized, match[0], match[1])),
+            key=lambda m: (m[0], -m[1])
+        )
+        selected, last_end = [], 0
+        for start, end, value in matches:
+            if start >= last_end:
+                selected.append((start, end, value))
+                last_end = end
+        return selected
+    
+    def values(self, text: str) -> List[Any]:
+        """القيم المطابقة بترتيب ظهورها بدون تكرار"""
+        
+        found = []
+        for _, _, value in self.find_all(text):
+            if value not in found:
+                found.append(value)
+        return found
+
+class ApprovedTermsMatcher:
+    """مطابق واحد للمناطق والموظفين والمميزات المعتمدة"""
+    
+    REGION = "region"
+    EMPLOYEE = "employee"
+    FEATURE = "feature"
+    
+    def __init__(self, config, region_aliases: Optional[Dict[str, str]] = None):
+        self.matcher = KeywordMatcher()
+        
+        # المناطق والمميزات تُكتب أيضاً بـ"ال" التعريف (الرحاب، الحديقه)؛ أسماء الموظفين لا ("الايمن" ليست "ايمن")
+        for regions in config.APPROVED_REGIONS.values():
+            for region in regions:
+                self._add_with_article(region, (self.REGION, region))
+        for alias, region in (region_aliases or {}).items():
+            self._add_with_article(alias, (self.REGION, region))
+        for employee in config.APPROVED_EMPLOYEES:
+            self.matcher.add(employee, (self.EMPLOYEE, employee))
+        for feature in config.APPROVED_FEATURES:
+            self._add_with_article(feature, (self.FEATURE, feature))
+        
+        self.matcher.build()
+    
+    def _add_with_article(self, term: str, value: Any):
+        self.matcher.add(term, value)
+        if not normalize_arabic(term).startswith("ال"):
+            self.matcher.add("ال" + term, value)
+    
+    def match(self, text: str) -> Dict[str, List[str]]:
+        """القيم المعتمدة في النص حسب الفئة بترتيب ظهورها"""
+        
+        result = {self.REGION: [], self.EMPLOYEE: [], self.FEATURE: []}
+        for category, value in self.matcher.values(text):
+            if value not in result[category]:
+                result[category].append(value)
+        return result
+    
+    def regions(self, text: str) -> List[str]:
+        return self.match(text)[self.REGION]
+    
+    def employees(self, text: str) -> List[str]:
+        return self.match(text)[self.EMPLOYEE]
+    
+    def features(self, text: str) -> List[str]:
+        return self.match(text)[self.FEATURE]
@@ -6,38 +6,218 @@ import sqlite3
 import json
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from models.property import PropertyData, PropertyStatus
+from models.property import (
+    PropertyData, PropertyStatus, PROPERTY_COLUMNS, FIELD_TO_ARABIC, decode_error_messages
+)
 from utils.logger import setup_logger
+from utils.sqlite_pool import SQLiteWriter, SQLiteReadPool
 
 logger = setup_logger(__name__)
 
+class _RowColumn:
+    """واصف عمود في PropertyRow: يقرأ القيمة من الصف ويحولها (مع حفظ التحويلات المكلفة)"""
+    
+    __slots__ = ("name", "decoder", "cached")
+    
+    def __init__(self, name: str, decoder=None, cached: bool = False):
+        self.name = name
+        self.decoder = decoder
+        self.cached = cached
+    
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        
+        try:
+            value = view._row[self.name]
+        except IndexError:
+            raise AttributeError(f"العمود '{self.name}' غير محمل في هذا الاستعلام") from None
+        
+        if self.decoder is None:
+            return value
+        if not self.cached:
+            return self.decoder(value)
+        
+        decoded = view._decoded
+        if decoded is None:
+            decoded = view._decoded = {}
+        if self.name not in decoded:
+            decoded[self.name] = self.decoder(value)
+        return decoded[self.name]
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """تحويل طابع SQLite إلى datetime"""
+    return datetime.fromisoformat(value) if value else None
+
+class PropertyRow:
+    """عرض خفيف لصف عقار: يقرأ الأعمدة المحملة فقط ويحلل التواريخ و JSON عند الوصول"""
+    
+    __slots__ = ("_row", "_decoded")
+    
+    # تحويل القيم الخام: (الدالة، حفظ النتيجة) - بقية الأعمدة النصية تُعاد "" بدل NULL
+    _DECODERS = {
+        "id": (None, False),
+        "telegram_message_id": (None, False),
+        "notion_property_id": (None, False),
+        "notion_owner_id": (None, False),
+        "zoho_lead_id": (None, False),
+        "status": (PropertyStatus, True),
+        "created_at": (_parse_timestamp, True),
+        "updated_at": (_parse_timestamp, True),
+        "error_messages": (decode_error_messages, True),
+        "ai_extracted": (bool, False),
+        "processing_attempts": (lambda value: value or 0, False),
+        "availability": (lambda value: value or "متاح", False),
+        "photos_status": (lambda value: value or "بدون صور", False)
+    }
+    
+    # أسماء الحقول في PropertyData.to_dict
+    _DICT_KEYS = FIELD_TO_ARABIC
+    
+    def __init__(self, row: sqlite3.Row):
+        self._row = row
+        self._decoded = None
+    
+    def keys(self) -> List[str]:
+        """الأعمدة المحملة"""
+        return self._row.keys()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """الحقول المحملة بنفس مفاتيح PropertyData.to_dict"""
+        loaded = self._row.keys()
+        return {
+            arabic: getattr(self, column)
+            for column, arabic in self._DICT_KEYS.items()
+            if column in loaded
+        }
+    
+    def to_property_data(self) -> PropertyData:
+        """إنشاء PropertyData من الأعمدة المحملة"""
+        property_data = PropertyData()
+        for column in self._row.keys():
+            if column not in ("id", "duplicate_signature"):
+                setattr(property_data, column, getattr(self, column))
+        return property_data
+
+for _column in PROPERTY_COLUMNS:
+    _decoder, _cached = PropertyRow._DECODERS.get(_column, (lambda value: value or "", False))
+    setattr(PropertyRow, _column, _RowColumn(_column, _decoder, _cached))
+
 class DatabaseManager:
     """مدير قاعدة البيانات المحلية"""
     
-    def __init__(self, db_path: str = "real_estate.db"):
+    # ملفات إعدادات الأداء (PRAGMA) المطبقة عند فتح الاتصال
+    PRAGMA_PROFILES = {
+        # إعدادات SQLite الافتراضية (journal حذف + fsync لكل معاملة)
+        "default": {},
+        # WAL مع fsync كامل: القراء لا ينتظرون الكُتّاب
+        "safe": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "busy_timeout": 5000
+        },
+        # WAL مع fsync عند نقاط التفتيش فقط + ذاكرة تخزين أكبر
+        "performance": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64000,  # بالكيلوبايت (64MB)
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000
+        }
+    }
+    
+    def __init__(self, db_path: str = "real_estate.db", profile: str = "performance",
+                 flush_interval_ms: int = 0, read_pool_size: int = 4):
         self.db_path = Path(db_path)
-        self.connection = None
+        
+        if profile not in self.PRAGMA_PROFILES:
+            logger.warning(f"⚠️ ملف إعدادات غير معروف '{profile}'، سيتم استخدام performance")
+            profile = "performance"
+        self.profile = profile
+        
+        # خيط كتابة واحد يملك اتصال الكتابة + اتصالات قراءة فقط للاستعلامات
+        self.writer = SQLiteWriter(self._connect_writer, flush_interval=flush_interval_ms / 1000)
+        self.readers = SQLiteReadPool(self._connect_reader, read_pool_size)
+        self._initialized = False
         
     async def initialize(self):
-        """تهيئة قاعدة البيانات"""
+        """تهيئة قاعدة البيانات (مرة واحدة لكل من يشارك نفس المدير)"""
+        if self._initialized:
+            return
         try:
-            self.connection = sqlite3.connect(
-                self.db_path, 
-                check_same_thread=False,
-                isolation_level=None  # autocommit mode
-            )
-            self.connection.row_factory = sqlite3.Row  # للوصول بالأسماء
-            
-            await asyncio.to_thread(self._create_tables)
+            await self.writer.start()
+            await self.writer.submit(self._create_tables)
+            await asyncio.to_thread(self.readers.start)
+            self._initialized = True
             logger.info("✅ تم تهيئة قاعدة البيانات")
             
         except Exception as e:
             logger.error(f"❌ خطأ في تهيئة قاعدة البيانات: {e}")
             raise
     
-    def _create_tables(self):
+    def _connect_writer(self) -> sqlite3.Connection:
+        """اتصال الكتابة (يُفتح داخل خيط الكتابة ولا يُستخدم من غيره)"""
+        
+        connection = sqlite3.connect(
+            self.db_path,
+            isolation_level=None  # المعاملات يديرها خيط الكتابة
+        )
+        connection.row_factory = sqlite3.Row  # للوصول بالأسماء
+        self._apply_pragmas(connection)
+        return connection
+    
+    def _connect_reader(self) -> sqlite3.Connection:
+        """اتصال قراءة فقط"""
+        
+        connection = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,  # يُحجز لخيط واحد في كل مرة عبر SQLiteReadPool
+            isolation_level=None
+        )
+        connection.row_factory = sqlite3.Row
+        self._apply_pragmas(connection, skip=("journal_mode",))
+        return connection
+    
+    def _apply_pragmas(self, connection: sqlite3.Connection, skip: tuple = ()):
+        """تطبيق ملف إعدادات الأداء على الاتصال"""
+        
+        for name, value in self.PRAGMA_PROFILES[self.profile].items():
+            if name not in skip:
+                connection.execute(f"PRAGMA {name} = {value}")
+    
+    async def get_pragma_settings(self) -> Dict[str, Any]:
+        """قيم إعدادات PRAGMA الفعلية على اتصال الكتابة مع إحصائيات التجميع"""
+        
+        def _read(connection):
+            return {
+                name: connection.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+            }
+        
+        settings = {"profile": self.profile}
+        settings.update(await self.writer.submit(_read))
+        settings["read_pool_size"] = self.readers.size
+        settings["write_transactions"] = self.writer.transactions
+        settings["write_operations"] = self.writer.operations
+        return settings
+    
+    async def _fetchall(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """استعلام على اتصال قراءة"""
+        return await self.readers.run(lambda connection: connection.execute(sql, params).fetchall())
+    
+    async def _fetchone(self, sql: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        """استعلام صف واحد على اتصال قراءة"""
+        return await self.readers.run(lambda connection: connection.execute(sql, params).fetchone())
+    
+    async def _execute(self, sql: str, params: tuple = ()) -> int:
+        """تنفيذ عبارة كتابة في خيط الكتابة وإرجاع lastrowid"""
+        return await self.writer.submit(lambda connection: connection.execute(sql, params).lastrowid)
+    
+    def _create_tables(self, connection: sqlite3.Connection):
         """إنشاء الجداول"""
         
         # جدول العقارات
@@ -97,11 +277,56 @@ class DatabaseManager:
         )
         """
         
+        # جدول ذاكرة الاستخراج المؤقتة (مفتاحها بصمة النص الخام المُطبَّع)
+        extraction_cache_table = """
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            content_hash TEXT PRIMARY KEY,
+            extracted_data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        
+        # جدول عدد عقارات كل مالك في Notion (عداد تزايدي)
+        owner_counts_table = """
+        CREATE TABLE IF NOT EXISTS owner_property_counts (
+            owner_id TEXT PRIMARY KEY,
+            property_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        
+        # جدول التقارير المجمعة (يُحدَّث تلقائياً بالمشغلات مع كل حفظ/تحديث عقار)
+        report_rollups_table = """
+        CREATE TABLE IF NOT EXISTS report_rollups (
+            day TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, dimension, key)
+        )
+        """
+        
+        # طابور upsert في Zoho (يبقى بعد إعادة التشغيل حتى يؤكد Zoho حفظ السجل)
+        zoho_upsert_queue_table = """
+        CREATE TABLE IF NOT EXISTS zoho_upsert_queue (
+            telegram_message_id INTEGER PRIMARY KEY,
+            merge_existing BOOLEAN NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+        
         # إنشاء الجداول
-        cursor = self.connection.cursor()
+        cursor = connection.cursor()
         cursor.execute(properties_table)
         cursor.execute(processing_log_table)
         cursor.execute(system_settings_table)
+        cursor.execute(extraction_cache_table)
+        cursor.execute(owner_counts_table)
+        cursor.execute(report_rollups_table)
+        cursor.execute(zoho_upsert_queue_table)
         
         # إنشاء الفهارس
         indexes = [
@@ -109,61 +334,185 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS idx_owner_phone ON properties(owner_phone)",
             "CREATE INDEX IF NOT EXISTS idx_status ON properties(status)",
             "CREATE INDEX IF NOT EXISTS idx_duplicate_signature ON properties(duplicate_signature)",
-            "CREATE INDEX IF NOT EXISTS idx_created_at ON properties(created_at)"
+            "CREATE INDEX IF NOT EXISTS idx_created_at ON properties(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_status_created ON properties(status, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_region_created ON properties(region, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_employee_created ON properties(employee_name, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_cache_last_accessed ON extraction_cache(last_accessed_at)"
         ]
         
         for index_sql in indexes:
             cursor.execute(index_sql)
+        
+        # مشغلات تحديث التقارير المجمعة
+        for trigger_sql in self._report_rollup_triggers():
+            cursor.execute(trigger_sql)
+        
+        # بناء التقارير لأول مرة لقاعدة بيانات موجودة مسبقاً
+        has_rollups = cursor.execute("SELECT 1 FROM report_rollups LIMIT 1").fetchone()
+        has_properties = cursor.execute("SELECT 1 FROM properties LIMIT 1").fetchone()
+        if has_properties and not has_rollups:
+            self._rebuild_report_rollups(cursor)
+    
+    # أبعاد التقارير: (اسم البعد، تعبير المفتاح لصف العقار {row})
+    _REPORT_DIMENSIONS = [
+        ("total", "'الكل'"),
+        ("employee", "COALESCE(NULLIF({row}.employee_name, ''), 'غير محدد')"),
+        ("region", "COALESCE(NULLIF({row}.region, ''), 'غير محدد')"),
+        ("status", "COALESCE(NULLIF({row}.status, ''), 'غير محدد')")
+    ]
+    
+    # يوم التقرير بالتوقيت المحلي (مثل إحصائيات اليوم)
+    _REPORT_DAY = "DATE({row}.created_at, 'localtime')"
+    
+    def _rollup_statements(self, row: str, delta: int) -> str:
+        """تعديل التقارير المجمعة لصف عقار (NEW أو OLD) بمقدار delta"""
+        
+        return "\n".join(
+            f"""
+            INSERT INTO report_rollups (day, dimension, key, count)
+            VALUES ({self._REPORT_DAY.format(row=row)}, '{dimension}', {key.format(row=row)}, {delta})
+            ON CONFLICT(day, dimension, key) DO UPDATE SET count = count + ({delta});
+            """
+            for dimension, key in self._REPORT_DIMENSIONS
+        )
+    
+    def _report_rollup_triggers(self) -> List[str]:
+        """مشغلات الإدراج والتحديث والحذف للتقارير المجمعة"""
+        
+        changed = " OR ".join(
+            f"OLD.{column} IS NOT NEW.{column}"
+            for column in ("employee_name", "region", "status", "created_at")
+        )
+        
+        return [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_report_rollups_insert
+            AFTER INSERT ON properties
+            BEGIN
+                {self._rollup_statements("NEW", 1)}
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_report_rollups_update
+            AFTER UPDATE OF employee_name, region, status, created_at ON properties
+            WHEN {changed}
+            BEGIN
+                {self._rollup_statements("OLD", -1)}
+                {self._rollup_statements("NEW", 1)}
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_report_rollups_delete
+            AFTER DELETE ON properties
+            BEGIN
+                {self._rollup_statements("OLD", -1)}
+            END
+            """
+        ]
+    
+    def _rebuild_report_rollups(self, cursor):
+        """إعادة بناء التقارير المجمعة كاملة من جدول العقارات"""
+        
+        cursor.execute("DELETE FROM report_rollups")
+        for dimension, key in self._REPORT_DIMENSIONS:
+            cursor.execute(f"""
+            INSERT INTO report_rollups (day, dimension, key, count)
+            SELECT {self._REPORT_DAY.format(row="p")}, '{dimension}', {key.format(row="p")}, COUNT(*)
+            FROM properties p
+            GROUP BY 1, 3
+            """)
+    
+    # أعمدة إدراج العقار (بنفس ترتيب _property_insert_values)
+    _PROPERTY_INSERT_SQL = """
+    INSERT {conflict}INTO properties (
+        telegram_message_id, region, unit_code, unit_type, unit_condition,
+        area, floor, price, features, address, employee_name, owner_name,
+        owner_phone, availability, photos_status, full_details, statement,
+        status, notion_property_id, notion_owner_id, zoho_lead_id,
+        processing_attempts, error_messages, raw_text, ai_extracted,
+        duplicate_signature
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    # الحد الأقصى لعدد المعاملات في استعلام IN واحد (حد SQLite الافتراضي 999)
+    _MAX_IN_PARAMS = 500
+    
+    # أعمدة جدول العقارات المسموح بطلبها في الإسقاط
+    PROPERTY_COLUMNS = frozenset(PROPERTY_COLUMNS)
+    
+    # إسقاط قوائم العرض (بدون raw_text و full_details و error_messages)
+    LISTING_COLUMNS = (
+        "telegram_message_id", "region", "unit_code", "unit_type", "unit_condition",
+        "area", "floor", "price", "features", "address", "employee_name", "owner_name",
+        "owner_phone", "availability", "photos_status", "statement", "status",
+        "processing_attempts", "created_at"
+    )
+    
+    # إسقاط التصنيف (المكرر / المتعدد)
+    CLASSIFICATION_COLUMNS = (
+        "telegram_message_id", "owner_phone", "status", "notion_property_id",
+        "notion_owner_id", "created_at"
+    )
+    
+    def _select_list(self, columns: Optional[tuple]) -> str:
+        """قائمة أعمدة SELECT (الكل إذا لم يُحدد إسقاط)"""
+        
+        if columns is None:
+            return "*"
+        
+        unknown = set(columns) - self.PROPERTY_COLUMNS
+        if unknown:
+            raise ValueError(f"أعمدة غير معروفة: {', '.join(sorted(unknown))}")
+        return ", ".join(dict.fromkeys(("id",) + tuple(columns)))
+    
+    def _rows_to_properties(self, rows: List[sqlite3.Row], columns: Optional[tuple]) -> list:
+        """PropertyData كاملة بدون إسقاط، أو عروض PropertyRow خفيفة مع الإسقاط"""
+        
+        if columns is None:
+            return PropertyData.from_rows(rows)
+        return [PropertyRow(row) for row in rows]
+    
+    def _property_insert_values(self, property_data: PropertyData) -> tuple:
+        """قيم إدراج العقار"""
+        
+        return (
+            property_data.telegram_message_id,
+            property_data.region,
+            property_data.unit_code,
+            property_data.unit_type,
+            property_data.unit_condition,
+            property_data.area,
+            property_data.floor,
+            property_data.price,
+            property_data.features,
+            property_data.address,
+            property_data.employee_name,
+            property_data.owner_name,
+            property_data.owner_phone,
+            property_data.availability,
+            property_data.photos_status,
+            property_data.full_details,
+            property_data.statement,
+            property_data.status.value,
+            property_data.notion_property_id,
+            property_data.notion_owner_id,
+            property_data.zoho_lead_id,
+            property_data.processing_attempts,
+            json.dumps(property_data.error_messages, ensure_ascii=False),
+            property_data.raw_text,
+            property_data.ai_extracted,
+            property_data.get_duplicate_check_signature()
+        )
     
     async def save_property(self, property_data: PropertyData) -> int:
         """حفظ عقار في قاعدة البيانات"""
         
         try:
-            # إنشاء توقيع التكرار
-            duplicate_signature = property_data.get_duplicate_check_signature()
-            
-            sql = """
-            INSERT INTO properties (
-                telegram_message_id, region, unit_code, unit_type, unit_condition,
-                area, floor, price, features, address, employee_name, owner_name,
-                owner_phone, availability, photos_status, full_details, statement,
-                status, notion_property_id, notion_owner_id, zoho_lead_id,
-                processing_attempts, error_messages, raw_text, ai_extracted,
-                duplicate_signature
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            values = (
-                property_data.telegram_message_id,
-                property_data.region,
-                property_data.unit_code,
-                property_data.unit_type,
-                property_data.unit_condition,
-                property_data.area,
-                property_data.floor,
-                property_data.price,
-                property_data.features,
-                property_data.address,
-                property_data.employee_name,
-                property_data.owner_name,
-                property_data.owner_phone,
-                property_data.availability,
-                property_data.photos_status,
-                property_data.full_details,
-                property_data.statement,
-                property_data.status.value,
-                property_data.notion_property_id,
-                property_data.notion_owner_id,
-                property_data.zoho_lead_id,
-                property_data.processing_attempts,
-                json.dumps(property_data.error_messages, ensure_ascii=False),
-                property_data.raw_text,
-                property_data.ai_extracted,
-                duplicate_signature
-            )
+            sql = self._PROPERTY_INSERT_SQL.format(conflict="")
+            values = self._property_insert_values(property_data)
             
-            cursor = await asyncio.to_thread(self.connection.execute, sql, values)
-            property_id = cursor.lastrowid
+            property_id = await self._execute(sql, values)
             
             logger.info(f"✅ تم حفظ العقار في قاعدة البيانات: {property_id}")
             return property_id
@@ -172,6 +521,73 @@ class DatabaseManager:
             logger.error(f"❌ خطأ في حفظ العقار: {e}")
             raise
     
+    async def save_properties_bulk(self, properties: List[PropertyData]) -> Dict[int, int]:
+        """حفظ دفعة عقارات في معاملة واحدة وإرجاع {رقم رسالة Telegram: معرف العقار} للمُدرج فقط"""
+        
+        if not properties:
+            return {}
+        
+        try:
+            inserted = await self.writer.submit(self._save_properties_bulk_sync, properties)
+            logger.info(f"✅ تم حفظ {len(inserted)} عقار دفعة واحدة في قاعدة البيانات")
+            return inserted
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في الحفظ الجماعي للعقارات: {e}")
+            raise
+    
+    def _save_properties_bulk_sync(self, connection: sqlite3.Connection,
+                                   properties: List[PropertyData]) -> Dict[int, int]:
+        """إدراج INSERT OR IGNORE جماعي (ضمن معاملة خيط الكتابة)"""
+        
+        telegram_ids = [p.telegram_message_id for p in properties if p.telegram_message_id is not None]
+        sql = self._PROPERTY_INSERT_SQL.format(conflict="OR IGNORE ")
+        
+        existing = self._select_existing_telegram_ids(connection, telegram_ids)
+        connection.executemany(
+            sql, (self._property_insert_values(p) for p in properties)
+        )
+        
+        # المعرفات المخصصة للرسائل التي أُدرجت فعلاً (بدون المتجاهلة بسبب UNIQUE)
+        new_ids = [tid for tid in dict.fromkeys(telegram_ids) if tid not in existing]
+        inserted = {}
+        for i in range(0, len(new_ids), self._MAX_IN_PARAMS):
+            chunk = new_ids[i:i + self._MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = connection.execute(
+                f"SELECT id, telegram_message_id FROM properties "
+                f"WHERE telegram_message_id IN ({placeholders})",
+                chunk
+            )
+            inserted.update({row['telegram_message_id']: row['id'] for row in cursor})
+        
+        return inserted
+    
+    async def get_existing_telegram_ids(self, telegram_ids: List[int]) -> set:
+        """إرجاع أرقام رسائل Telegram الموجودة مسبقاً من القائمة باستعلام IN واحد لكل دفعة"""
+        
+        try:
+            return await self.readers.run(self._select_existing_telegram_ids, telegram_ids)
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في التحقق من الرسائل الموجودة: {e}")
+            raise
+    
+    def _select_existing_telegram_ids(self, connection: sqlite3.Connection, telegram_ids: List[int]) -> set:
+        """استعلام IN مقسم حسب حد المعاملات"""
+        
+        existing = set()
+        for i in range(0, len(telegram_ids), self._MAX_IN_PARAMS):
+            chunk = telegram_ids[i:i + self._MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = connection.execute(
+                f"SELECT telegram_message_id FROM properties "
+                f"WHERE telegram_message_id IN ({placeholders})",
+                chunk
+            )
+            existing.update(row[0] for row in cursor)
+        return existing
+    
     async def update_property(self, property_id: int, property_data: PropertyData) -> bool:
         """تحديث عقار موجود"""
         
@@ -203,7 +619,7 @@ class DatabaseManager:
                 duplicate_signature, property_id
             )
             
-            await asyncio.to_thread(self.connection.execute, sql, values)
+            await self._execute(sql, values)
             logger.info(f"✅ تم تحديث العقار: {property_id}")
             return True
             
@@ -216,8 +632,7 @@ class DatabaseManager:
         
         try:
             sql = "SELECT * FROM properties WHERE id = ?"
-            cursor = await asyncio.to_thread(self.connection.execute, sql, (property_id,))
-            row = cursor.fetchone()
+            row = await self._fetchone(sql, (property_id,))
             
             if row:
                 return self._row_to_property_data(row)
@@ -233,8 +648,7 @@ class DatabaseManager:
         
         try:
             sql = "SELECT * FROM properties WHERE telegram_message_id = ?"
-            cursor = await asyncio.to_thread(self.connection.execute, sql, (telegram_id,))
-            row = cursor.fetchone()
+            row = await self._fetchone(sql, (telegram_id,))
             
             if row:
                 return self._row_to_property_data(row)
@@ -245,65 +659,384 @@ class DatabaseManager:
             logger.error(f"❌ خطأ في البحث بمعرف Telegram: {e}")
             return None
     
-    async def find_duplicate_properties(self, property_data: PropertyData) -> List[PropertyData]:
-        """البحث عن عقارات مكررة"""
+    async def find_duplicate_properties(self, property_data: PropertyData,
+                                        columns: Optional[tuple] = CLASSIFICATION_COLUMNS) -> list:
+        """البحث عن عقارات مكررة (عروض PropertyRow بأعمدة التصنيف افتراضياً)"""
         
         try:
             duplicate_signature = property_data.get_duplicate_check_signature()
             
-            sql = """
-            SELECT * FROM properties 
+            sql = f"""
+            SELECT {self._select_list(columns)} FROM properties 
             WHERE duplicate_signature = ? AND status != 'عقار فاشل'
             ORDER BY created_at DESC
             """
             
-            cursor = await asyncio.to_thread(self.connection.execute, sql, (duplicate_signature,))
-            rows = cursor.fetchall()
+            rows = await self._fetchall(sql, (duplicate_signature,))
             
-            return [self._row_to_property_data(row) for row in rows]
+            return self._rows_to_properties(rows, columns)
             
         except Exception as e:
             logger.error(f"❌ خطأ في البحث عن العقارات المكررة: {e}")
             return []
     
-    async def find_owner_properties(self, owner_phone: str) -> List[PropertyData]:
-        """البحث عن عقارات المالك"""
+    async def find_owner_properties(self, owner_phone: str,
+                                    columns: Optional[tuple] = CLASSIFICATION_COLUMNS) -> list:
+        """البحث عن عقارات المالك (عروض PropertyRow بأعمدة التصنيف افتراضياً)"""
         
         try:
-            sql = """
-            SELECT * FROM properties 
+            sql = f"""
+            SELECT {self._select_list(columns)} FROM properties 
             WHERE owner_phone = ? AND status != 'عقار فاشل'
             ORDER BY created_at DESC
             """
             
-            cursor = await asyncio.to_thread(self.connection.execute, sql, (owner_phone,))
-            rows = cursor.fetchall()
+            rows = await self._fetchall(sql, (owner_phone,))
             
-            return [self._row_to_property_data(row) for row in rows]
+            return self._rows_to_properties(rows, columns)
             
         except Exception as e:
             logger.error(f"❌ خطأ في البحث عن عقارات المالك: {e}")
             return []
     
-    async def get_pending_properties(self) -> List[PropertyData]:
-        """الحصول على العقارات المعلقة"""
+    async def get_pending_properties(self, include_failed: bool = True,
+                                     columns: Optional[tuple] = None) -> list:
+        """الحصول على العقارات المعلقة (PropertyData كاملة للمعالجة، أو عروض PropertyRow مع الإسقاط)"""
+        
+        try:
+            statuses = "('قيد المعالجة', 'عقار فاشل')" if include_failed else "('قيد المعالجة')"
+            sql = f"""
+            SELECT {self._select_list(columns)} FROM properties 
+            WHERE status IN {statuses}
+            ORDER BY created_at ASC
+            """
+            
+            rows = await self._fetchall(sql)
+            
+            return self._rows_to_properties(rows, columns)
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في الحصول على العقارات المعلقة: {e}")
+            return []
+    
+    @staticmethod
+    def parse_cursor(cursor: str) -> tuple:
+        """تحليل مؤشر التصفح "created_at|id" (ValueError إذا كان غير صالح)"""
+        
+        created_at, _, last_id = cursor.rpartition("|")
+        if not created_at or not last_id.isdigit():
+            raise ValueError(f"مؤشر تصفح غير صالح: {cursor}")
+        return created_at, int(last_id)
+    
+    async def query_properties(self, status: Optional[str] = None, region: Optional[str] = None,
+                               employee: Optional[str] = None, start_date: Optional[str] = None,
+                               end_date: Optional[str] = None, newest_first: bool = True,
+                               limit: int = 50, cursor: Optional[str] = None,
+                               with_total: bool = True,
+                               columns: Optional[tuple] = LISTING_COLUMNS) -> Dict[str, Any]:
+        """استعلام العقارات بالفلاتر مع تصفح keyset على (created_at, id) وإسقاط أعمدة العرض افتراضياً"""
+        
+        # التواريخ YYYY-MM-DD بالتوقيت المحلي (شاملة الطرفين)، و cursor هو next_cursor من الصفحة السابقة
+        
+        conditions = []
+        params = []
+        
+        for column, value in (("status", status), ("region", region), ("employee_name", employee)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        
+        # حدود الأيام المحلية محولة إلى UTC (قيمة created_at) ليبقى الفهرس مستخدماً
+        if start_date:
+            conditions.append("created_at >= datetime(?, 'utc')")
+            params.append(start_date)
+        if end_date:
+            conditions.append("created_at < datetime(?, '+1 day', 'utc')")
+            params.append(end_date)
+        
+        filters = list(conditions)
+        filter_params = list(params)
+        
+        if cursor:
+            conditions.append(f"(created_at, id) {'<' if newest_first else '>'} (?, ?)")
+            params.extend(self.parse_cursor(cursor))
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if newest_first else "ASC"
+        select_list = self._select_list(columns)
+        if columns is not None and "created_at" not in columns:
+            select_list += ", created_at"  # لازم لمؤشر التصفح
+        
+        sql = f"""
+        SELECT {select_list} FROM properties {where}
+        ORDER BY created_at {direction}, id {direction}
+        LIMIT ?
+        """
+        
+        rows = await self._fetchall(sql, tuple(params) + (limit,))
+        
+        result = {
+            "properties": self._rows_to_properties(rows, columns),
+            "next_cursor": f"{rows[-1]['created_at']}|{rows[-1]['id']}" if len(rows) == limit else None
+        }
+        
+        if with_total:
+            count_where = f"WHERE {' AND '.join(filters)}" if filters else ""
+            row = await self._fetchone(f"SELECT COUNT(*) AS total FROM properties {count_where}", tuple(filter_params))
+            result["total"] = row['total']
+        
+        return result
+    
+    async def get_failed_properties(self) -> List[PropertyData]:
+        """الحصول على العقارات الفاشلة"""
         
         try:
             sql = """
             SELECT * FROM properties 
-            WHERE status IN ('قيد المعالجة', 'عقار فاشل')
+            WHERE status = 'عقار فاشل'
             ORDER BY created_at ASC
             """
             
-            cursor = await asyncio.to_thread(self.connection.execute, sql)
-            rows = cursor.fetchall()
+            rows = await self._fetchall(sql)
             
-            return [self._row_to_property_data(row) for row in rows]
+            return PropertyData.from_rows(rows)
             
         except Exception as e:
-            logger.error(f"❌ خطأ في الحصول على العقارات المعلقة: {e}")
+            logger.error(f"❌ خطأ في الحصول على العقارات الفاشلة: {e}")
             return []
     
+    async def get_cached_extraction(self, content_hash: str, ttl_seconds: int) -> Optional[Dict[str, Any]]:
+        """الحصول على نتيجة استخراج محفوظة (مع تحديث وقت آخر استخدام)"""
+        
+        try:
+            sql = """
+            SELECT extracted_data FROM extraction_cache
+            WHERE content_hash = ? AND created_at >= datetime('now', ?)
+            """
+            row = await self._fetchone(sql, (content_hash, f"-{ttl_seconds} seconds"))
+            
+            if not row:
+                await self._increment_counter("extraction_cache_misses")
+                return None
+            
+            await self._execute(
+                "UPDATE extraction_cache SET last_accessed_at = CURRENT_TIMESTAMP WHERE content_hash = ?",
+                (content_hash,)
+            )
+            await self._increment_counter("extraction_cache_hits")
+            
+            return json.loads(row['extracted_data'])
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة ذاكرة الاستخراج: {e}")
+            return None
+    
+    async def save_cached_extraction(self, content_hash: str, extracted_data: Dict[str, Any],
+                                     ttl_seconds: int, max_entries: int):
+        """حفظ نتيجة استخراج مع حذف المنتهية وإخلاء الأقدم استخداماً (LRU)"""
+        
+        def _save(connection):
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO extraction_cache (content_hash, extracted_data)
+                VALUES (?, ?)
+                """,
+                (content_hash, json.dumps(extracted_data, ensure_ascii=False))
+            )
+            connection.execute(
+                "DELETE FROM extraction_cache WHERE created_at < datetime('now', ?)",
+                (f"-{ttl_seconds} seconds",)
+            )
+            connection.execute(
+                """
+                DELETE FROM extraction_cache WHERE content_hash NOT IN (
+                    SELECT content_hash FROM extraction_cache
+                    ORDER BY last_accessed_at DESC LIMIT ?
+                )
+                """,
+                (max_entries,)
+            )
+        
+        try:
+            await self.writer.submit(_save)
+        except Exception as e:
+            logger.error(f"❌ خطأ في حفظ ذاكرة الاستخراج: {e}")
+    
+    async def get_setting(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """قراءة قيمة من جدول إعدادات النظام"""
+        
+        try:
+            sql = "SELECT value FROM system_settings WHERE key = ?"
+            row = await self._fetchone(sql, (key,))
+            return row['value'] if row else default
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة الإعداد {key}: {e}")
+            return default
+    
+    async def set_setting(self, key: str, value: str):
+        """حفظ قيمة في جدول إعدادات النظام"""
+        
+        try:
+            sql = """
+            INSERT INTO system_settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                updated_at = CURRENT_TIMESTAMP
+            """
+            await self._execute(sql, (key, value))
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في حفظ الإعداد {key}: {e}")
+    
+    async def queue_zoho_upsert(self, telegram_message_id: int, merge_existing: bool = False):
+        """إضافة عقار لطابور upsert في Zoho (merge_existing: دمج مع سجل المالك الموجود)"""
+        
+        sql = """
+        INSERT INTO zoho_upsert_queue (telegram_message_id, merge_existing) VALUES (?, ?)
+        ON CONFLICT(telegram_message_id) DO UPDATE SET
+            merge_existing = excluded.merge_existing,
+            attempts = 0,
+            last_error = NULL
+        """
+        await self._execute(sql, (telegram_message_id, int(merge_existing)))
+    
+    async def get_zoho_upsert_queue(self, max_attempts: int) -> List[Tuple[PropertyData, bool]]:
+        """عقارات طابور Zoho التي لم تستنفد محاولاتها بترتيب الإضافة: [(العقار، دمج مع الموجود)]"""
+        
+        try:
+            sql = """
+            SELECT p.*, q.merge_existing FROM zoho_upsert_queue q
+            JOIN properties p ON p.telegram_message_id = q.telegram_message_id
+            WHERE q.attempts < ?
+            ORDER BY q.queued_at ASC, q.rowid ASC
+            """
+            rows = await self._fetchall(sql, (max_attempts,))
+            
+            return list(zip(PropertyData.from_rows(rows), (bool(row['merge_existing']) for row in rows)))
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة طابور Zoho: {e}")
+            return []
+    
+    async def complete_zoho_upserts(self, record_ids: Dict[int, str]):
+        """حفظ معرفات سجلات Zoho وحذف العقارات من الطابور في معاملة واحدة"""
+        
+        if not record_ids:
+            return
+        
+        def _complete(connection):
+            connection.executemany(
+                "UPDATE properties SET zoho_lead_id = ?, updated_at = CURRENT_TIMESTAMP WHERE telegram_message_id = ?",
+                [(record_id, telegram_message_id) for telegram_message_id, record_id in record_ids.items()]
+            )
+            connection.executemany(
+                "DELETE FROM zoho_upsert_queue WHERE telegram_message_id = ?",
+                [(telegram_message_id,) for telegram_message_id in record_ids]
+            )
+        
+        await self.writer.submit(_complete)
+    
+    async def fail_zoho_upserts(self, telegram_message_ids: List[int], error: str, count_attempt: bool = True):
+        """تسجيل فشل upsert مع إبقاء العقارات في الطابور (count_attempt=False لأخطاء الاتصال المؤقتة)"""
+        
+        if not telegram_message_ids:
+            return
+        
+        sql = f"""
+        UPDATE zoho_upsert_queue SET
+            attempts = attempts + {1 if count_attempt else 0},
+            last_error = ?
+        WHERE telegram_message_id = ?
+        """
+        await self.writer.submit(
+            lambda connection: connection.executemany(
+                sql, [(error, telegram_message_id) for telegram_message_id in telegram_message_ids]
+            )
+        )
+    
+    async def get_zoho_upsert_queue_stats(self, max_attempts: int) -> Dict[str, int]:
+        """عدد العقارات المنتظرة في طابور Zoho والتي استنفدت محاولاتها"""
+        
+        try:
+            sql = """
+            SELECT
+                COALESCE(SUM(attempts < ?), 0) AS pending,
+                COALESCE(SUM(attempts >= ?), 0) AS exhausted
+            FROM zoho_upsert_queue
+            """
+            row = await self._fetchone(sql, (max_attempts, max_attempts))
+            return {"pending": row['pending'], "exhausted": row['exhausted']}
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة إحصائيات طابور Zoho: {e}")
+            return {"pending": 0, "exhausted": 0}
+    
+    async def increment_owner_property_count(self, owner_id: str, initial: int = 0) -> int:
+        """زيادة عدد عقارات المالك بواحد وإرجاع العدد الجديد (initial: العدد الحالي إن لم يكن مسجلاً)"""
+        
+        try:
+            return await self.writer.submit(self._increment_owner_property_count_sync, owner_id, initial)
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في تحديث عداد عقارات المالك: {e}")
+            raise
+    
+    def _increment_owner_property_count_sync(self, connection: sqlite3.Connection,
+                                             owner_id: str, initial: int) -> int:
+        """الزيادة والقراءة على نفس الاتصال"""
+        
+        connection.execute(
+            """
+            INSERT INTO owner_property_counts (owner_id, property_count) VALUES (?, ?)
+            ON CONFLICT(owner_id) DO UPDATE SET
+                property_count = property_count + 1,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (owner_id, initial + 1)
+        )
+        cursor = connection.execute(
+            "SELECT property_count FROM owner_property_counts WHERE owner_id = ?", (owner_id,)
+        )
+        return cursor.fetchone()[0]
+    
+    async def set_owner_property_counts(self, counts: Dict[str, int]):
+        """تعيين أعداد عقارات الملاك (عند الإنشاء أو المطابقة الدورية)"""
+        
+        try:
+            sql = """
+            INSERT INTO owner_property_counts (owner_id, property_count) VALUES (?, ?)
+            ON CONFLICT(owner_id) DO UPDATE SET
+                property_count = excluded.property_count,
+                updated_at = CURRENT_TIMESTAMP
+            """
+            await self.writer.submit(lambda connection: connection.executemany(sql, list(counts.items())))
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في حفظ أعداد عقارات الملاك: {e}")
+    
+    async def get_owner_property_counts(self) -> Dict[str, int]:
+        """أعداد عقارات جميع الملاك المسجلة محلياً"""
+        
+        try:
+            rows = await self._fetchall("SELECT owner_id, property_count FROM owner_property_counts")
+            return {row['owner_id']: row['property_count'] for row in rows}
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة أعداد عقارات الملاك: {e}")
+            return {}
+    
+    async def _increment_counter(self, key: str):
+        """زيادة عداد محفوظ في جدول إعدادات النظام"""
+        
+        sql = """
+        INSERT INTO system_settings (key, value) VALUES (?, '1')
+        ON CONFLICT(key) DO UPDATE SET
+            value = CAST(value AS INTEGER) + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """
+        await self._execute(sql, (key,))
+    
     async def log_processing_step(self, property_id: int, operation: str, 
                                 status: str, details: str = ""):
         """تسجيل خطوة معالجة"""
@@ -314,64 +1047,59 @@ class DatabaseManager:
             VALUES (?, ?, ?, ?)
             """
             
-            await asyncio.to_thread(
-                self.connection.execute, 
-                sql, 
-                (property_id, operation, status, details)
-            )
+            await self._execute(sql, (property_id, operation, status, details))
             
         except Exception as e:
             logger.error(f"❌ خطأ في تسجيل خطوة المعالجة: {e}")
     
     def _row_to_property_data(self, row) -> PropertyData:
         """تحويل صف قاعدة البيانات إلى PropertyData"""
+        return PropertyData.from_rows((row,))[0]
+    
+    async def get_report(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """تقرير العقارات لنطاق أيام (YYYY-MM-DD شامل الطرفين) من الجداول المجمعة"""
         
-        property_data = PropertyData()
-        
-        # الحقول الأساسية
-        property_data.region = row['region'] or ""
-        property_data.unit_code = row['unit_code'] or ""
-        property_data.unit_type = row['unit_type'] or ""
-        property_data.unit_condition = row['unit_condition'] or ""
-        property_data.area = row['area'] or ""
-        property_data.floor = row['floor'] or ""
-        property_data.price = row['price'] or ""
-        property_data.features = row['features'] or ""
-        property_data.address = row['address'] or ""
-        property_data.employee_name = row['employee_name'] or ""
-        property_data.owner_name = row['owner_name'] or ""
-        property_data.owner_phone = row['owner_phone'] or ""
-        property_data.availability = row['availability'] or "متاح"
-        property_data.photos_status = row['photos_status'] or "بدون صور"
-        property_data.full_details = row['full_details'] or ""
-        property_data.statement = row['statement'] or ""
-        
-        # الحالة والتواريخ
-        property_data.status = PropertyStatus(row['status'])
-        if row['created_at']:
-            property_data.created_at = datetime.fromisoformat(row['created_at'])
-        if row['updated_at']:
-            property_data.updated_at = datetime.fromisoformat(row['updated_at'])
-        
-        # المعرفات
-        property_data.telegram_message_id = row['telegram_message_id']
-        property_data.notion_property_id = row['notion_property_id']
-        property_data.notion_owner_id = row['notion_owner_id']
-        property_data.zoho_lead_id = row['zoho_lead_id']
-        
-        # بيانات المعالجة
-        property_data.processing_attempts = row['processing_attempts'] or 0
-        property_data.raw_text = row['raw_text'] or ""
-        property_data.ai_extracted = bool(row['ai_extracted'])
-        
-        # رسائل الخطأ
-        if row['error_messages']:
-            try:
-                property_data.error_messages = json.loads(row['error_messages'])
-            except:
-                property_data.error_messages = []
+        try:
+            sql = """
+            SELECT day, dimension, key, count FROM report_rollups
+            WHERE day BETWEEN ? AND ? AND count > 0
+            ORDER BY day
+            """
+            rows = await self._fetchall(sql, (start_date, end_date))
+            
+            report = {
+                "start_date": start_date,
+                "end_date": end_date,
+                "total_records": 0,
+                "by_day": {},
+                "by_employee": {},
+                "by_region": {},
+                "by_status": {}
+            }
+            
+            for row in rows:
+                if row['dimension'] == "total":
+                    report["total_records"] += row['count']
+                    report["by_day"][row['day']] = row['count']
+                else:
+                    bucket = report[f"by_{row['dimension']}"]
+                    bucket[row['key']] = bucket.get(row['key'], 0) + row['count']
+            
+            return report
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في إنشاء التقرير: {e}")
+            return {}
+    
+    async def rebuild_report_rollups(self):
+        """إعادة بناء التقارير المجمعة (للصيانة)"""
         
-        return property_data
+        try:
+            await self.writer.submit(lambda connection: self._rebuild_report_rollups(connection.cursor()))
+            logger.info("✅ تم إعادة بناء التقارير المجمعة")
+            
+        except Exception as e:
+            logger.error(f"❌ خطأ في إعادة بناء التقارير: {e}")
     
     async def get_statistics(self) -> Dict[str, Any]:
         """الحصول على إحصائيات النظام"""
@@ -385,8 +1113,8 @@ class DatabaseManager:
             FROM properties 
             GROUP BY status
             """
-            cursor = await asyncio.to_thread(self.connection.execute, sql)
-            status_counts = {row['status']: row['count'] for row in cursor.fetchall()}
+            rows = await self._fetchall(sql)
+            status_counts = {row['status']: row['count'] for row in rows}
             stats['status_counts'] = status_counts
             
             # إحصائيات اليوم
@@ -395,13 +1123,32 @@ class DatabaseManager:
             FROM properties 
             WHERE DATE(created_at) = DATE('now', 'localtime')
             """
-            cursor = await asyncio.to_thread(self.connection.execute, sql)
-            stats['today_count'] = cursor.fetchone()['today_count']
+            stats['today_count'] = (await self._fetchone(sql))['today_count']
             
             # إجمالي العقارات
             sql = "SELECT COUNT(*) as total FROM properties"
-            cursor = await asyncio.to_thread(self.connection.execute, sql)
-            stats['total_properties'] = cursor.fetchone()['total']
+            stats['total_properties'] = (await self._fetchone(sql))['total']
+            
+            # إحصائيات ذاكرة الاستخراج المؤقتة
+            sql = "SELECT COUNT(*) as entries FROM extraction_cache"
+            cache_entries = (await self._fetchone(sql))['entries']
+            
+            sql = """
+            SELECT key, value FROM system_settings
+            WHERE key IN ('extraction_cache_hits', 'extraction_cache_misses')
+            """
+            rows = await self._fetchall(sql)
+            counters = {row['key']: int(row['value']) for row in rows}
+            cache_hits = counters.get('extraction_cache_hits', 0)
+            cache_misses = counters.get('extraction_cache_misses', 0)
+            lookups = cache_hits + cache_misses
+            
+            stats['extraction_cache'] = {
+                'entries': cache_entries,
+                'hits': cache_hits,
+                'misses': cache_misses,
+                'hit_rate': round(cache_hits / lookups * 100, 1) if lookups else 0.0
+            }
             
             return stats
             
@@ -410,7 +1157,8 @@ class DatabaseManager:
             return {}
     
     async def close(self):
-        """إغلاق الاتصال"""
-        if self.connection:
-            self.connection.close()
-            logger.info("✅ تم إغلاق اتصال قاعدة البيانات")
+        """إغلاق الاتصال (بعد تثبيت الكتابات المنتظرة)"""
+        await self.writer.close()
+        self.readers.close()
+        self._initialized = False
+        logger.info("✅ تم إغلاق اتصال قاعدة البيانات")
@@ -0,0 +1,45 @@
+"""
+محدد معدل الطلبات - Rate Limiter
+"""
+
+import asyncio
+import time
+
+class TokenBucket:
+    """محدد معدل بخوارزمية دلو الرموز"""
+    
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate  # رموز في الثانية
+        self.capacity = max(1, capacity)  # أقصى دفعة متتالية
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """انتظار رمز متاح (الطالبون يُخدمون بالترتيب)"""
+        
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                
+                # إيقاف مؤقت بعد Retry-After
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+    
+    def pause(self, seconds: float):
+        """إيقاف جميع الطلبات مدة محددة وتفريغ الدلو"""
+        
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.blocked_until
@@ -0,0 +1,96 @@
+"""
+فهرس المناطق المعتمدة - Region Lookup Index
+"""
+
+from typing import Dict, List, Optional, Tuple
+from utils.arabic_text import normalize_arabic
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """مسافة Levenshtein مع التوقف المبكر عند تجاوز limit (تُرجع limit + 1)"""
+    
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class RegionIndex:
+    """فهرس مُطبَّع للمناطق يُبنى مرة واحدة: منطقة → زون، أسماء بديلة، وأقرب تطابق للأخطاء الإملائية"""
+    
+    def __init__(self, approved_regions: Dict[str, List[str]], aliases: Optional[Dict[str, str]] = None,
+                 default_zone: str = "5", cache_size: int = 4096):
+        self.default_zone = default_zone
+        self.cache_size = cache_size
+        
+        # الاسم المُطبَّع → (الاسم المعتمد، رقم الزون)
+        self._regions: Dict[str, Tuple[str, str]] = {}
+        for zone, regions in approved_regions.items():
+            for region in regions:
+                self._regions[self._key(region)] = (region, zone.replace("z", ""))
+        
+        for alias, region in (aliases or {}).items():
+            target = self._regions.get(self._key(region))
+            if target:
+                self._regions.setdefault(self._key(alias), target)
+        
+        # نتائج البحث التقريبي السابقة (الأخطاء الإملائية تتكرر بنفس الشكل)
+        self._fuzzy_cache: Dict[str, Optional[Tuple[str, str]]] = {}
+    
+    @staticmethod
+    def _key(name: Optional[str]) -> str:
+        """مفتاح الفهرس: النص المُطبَّع بدون "ال" التعريف في بداية الكلمات"""
+        return " ".join(
+            word[2:] if word.startswith("ال") and len(word) > 4 else word
+            for word in normalize_arabic(name).split()
+        )
+    
+    @staticmethod
+    def _max_distance(key: str) -> int:
+        """عدد الأخطاء المسموح حسب طول الاسم"""
+        return 1 if len(key) <= 5 else 2
+    
+    def _lookup(self, name: Optional[str]) -> Optional[Tuple[str, str]]:
+        key = self._key(name)
+        if not key:
+            return None
+        
+        entry = self._regions.get(key)
+        if entry or key in self._fuzzy_cache:
+            return entry or self._fuzzy_cache[key]
+        
+        # أقرب اسم بمسافة تحرير محدودة؛ التعادل بين منطقتين مختلفتين = لا تطابق
+        limit = self._max_distance(key)
+        best, best_distance, tied = None, limit + 1, False
+        for candidate, target in self._regions.items():
+            distance = edit_distance(key, candidate, min(limit, best_distance))
+            if distance < best_distance:
+                best, best_distance, tied = target, distance, False
+            elif distance == best_distance and best and target[0] != best[0]:
+                tied = True
+        
+        entry = None if tied else best
+        if len(self._fuzzy_cache) >= self.cache_size:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[key] = entry
+        return entry
+    
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """الاسم المعتمد للمنطقة (None إذا لم تُعرف)"""
+        entry = self._lookup(name)
+        return entry[0] if entry else None
+    
+    def zone(self, name: Optional[str]) -> str:
+        """رقم زون المنطقة (الافتراضي إذا لم تُعرف)"""
+        entry = self._lookup(name)
+        return entry[1] if entry else self.default_zone
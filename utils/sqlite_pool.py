@@ -0,0 +1,165 @@
+"""
+اتصالات SQLite - كاتب واحد ومجموعة قراء
+"""
+
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Any
+
+class SQLiteWriter:
+    """خيط كتابة مخصص يملك اتصال الكتابة ويجمع العمليات المنتظرة في معاملة واحدة"""
+    
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 flush_interval: float = 0.0, max_batch: int = 1000):
+        self.connect = connect
+        self.flush_interval = flush_interval  # ثوانٍ لانتظار عمليات إضافية قبل التثبيت
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = None
+        
+        # إحصائيات
+        self.transactions = 0
+        self.operations = 0
+    
+    async def start(self):
+        """تشغيل خيط الكتابة وفتح الاتصال داخله"""
+        
+        ready = threading.Event()
+        errors = []
+        self.thread = threading.Thread(
+            target=self._run, args=(ready, errors), name="sqlite-writer", daemon=True
+        )
+        self.thread.start()
+        await asyncio.to_thread(ready.wait)
+        
+        if errors:
+            raise errors[0]
+    
+    async def submit(self, func: Callable[..., Any], *args) -> Any:
+        """تنفيذ func(connection, *args) في خيط الكتابة وانتظار تثبيت المعاملة"""
+        
+        if not self.thread or not self.thread.is_alive():
+            raise RuntimeError("خيط الكتابة غير مشغل")
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.put((func, args, loop, future))
+        return await future
+    
+    async def close(self):
+        """تنفيذ العمليات المتبقية ثم إيقاف الخيط وإغلاق الاتصال"""
+        
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            await asyncio.to_thread(self.thread.join)
+    
+    def _run(self, ready: threading.Event, errors: list):
+        """حلقة خيط الكتابة"""
+        
+        try:
+            connection = self.connect()
+        except Exception as e:
+            errors.append(e)
+            ready.set()
+            return
+        ready.set()
+        
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            
+            # جمع العمليات المنتظرة (وما يصل خلال فترة التجميع)
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    timeout = deadline - time.monotonic()
+                    item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            self._commit_batch(connection, batch)
+        
+        connection.close()
+    
+    def _commit_batch(self, connection: sqlite3.Connection, batch: list):
+        """تنفيذ الدفعة في معاملة واحدة (كل عملية في SAVEPOINT حتى لا يُلغي فشلها الباقي)"""
+        
+        results = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for func, args, _, _ in batch:
+                connection.execute("SAVEPOINT operation")
+                try:
+                    results.append((True, func(connection, *args)))
+                    connection.execute("RELEASE operation")
+                except Exception as e:
+                    connection.execute("ROLLBACK TO operation")
+                    connection.execute("RELEASE operation")
+                    results.append((False, e))
+            connection.execute("COMMIT")
+            self.transactions += 1
+            self.operations += len(batch)
+        
+        except Exception as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            results = [(False, e)] * len(batch)
+        
+        for (_, _, loop, future), (ok, value) in zip(batch, results):
+            try:
+                loop.call_soon_threadsafe(self._resolve, future, ok, value)
+            except RuntimeError:
+                pass  # حلقة الأحداث أُغلقت
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future, ok: bool, value: Any):
+        """تسليم النتيجة للمنتظر"""
+        if future.cancelled():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+class SQLiteReadPool:
+    """مجموعة اتصالات قراءة فقط تُستخدم كل منها من خيط واحد في كل مرة"""
+    
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int = 4):
+        self.connect = connect
+        self.size = max(1, size)
+        self.connections = queue.Queue()
+    
+    def start(self):
+        """فتح الاتصالات"""
+        for _ in range(self.size):
+            self.connections.put(self.connect())
+    
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """تنفيذ func(connection, *args) على اتصال قراءة متاح"""
+        return await asyncio.to_thread(self._run, func, args)
+    
+    def _run(self, func: Callable[..., Any], args: tuple) -> Any:
+        """حجز اتصال طوال تنفيذ الدالة في خيط المجموعة"""
+        connection = self.connections.get()
+        try:
+            return func(connection, *args)
+        finally:
+            self.connections.put(connection)
+    
+    def close(self):
+        """إغلاق الاتصالات"""
+        while True:
+            try:
+                self.connections.get_nowait().close()
+            except queue.Empty:
+                break
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 
 from utils.database import DatabaseManager
 from processors.property_processor import PropertyProcessor
+from services.provider_health import ProviderHealthTracker
 from models.property import PropertyData, PropertyStatus
 from config import Config
 from utils.logger import setup_logger
@@ -31,8 +32,14 @@ templates = Jinja2Templates(directory="templates")
 
 # المتغيرات العامة
 config = Config()
-database = DatabaseManager(config.DATABASE_PATH)
-processor = PropertyProcessor()
+database = DatabaseManager(
+    config.DATABASE_PATH,
+    config.DATABASE_PROFILE,
+    flush_interval_ms=config.DATABASE_FLUSH_INTERVAL_MS,
+    read_pool_size=config.DATABASE_READ_POOL_SIZE
+)
+# المعالج يستخدم نفس المدير: خيط كتابة واحد ومجمع قراءة واحد لملف SQLite في العملية
+processor = PropertyProcessor(database)
 
 @app.on_event("startup")
 async def startup_event():
@@ -43,6 +50,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """أحداث الإغلاق"""
+    # إيقاف المعالج أولاً حتى يكتب ما لديه قبل إغلاق قاعدة البيانات المشتركة
+    if processor.is_running:
+        await processor.stop()
     await database.close()
     logger.info("🌐 تم إغلاق الواجهة الويب")
 
@@ -54,8 +64,8 @@ async def dashboard(request: Request):
         stats = await database.get_statistics()
         
         # الحصول على العقارات الحديثة
-        recent_properties = await database.get_pending_properties()
-        recent_properties = recent_properties[:10]  # أحدث 10 عقارات
+        recent = await database.query_properties(limit=10, with_total=False)  # أحدث 10 عقارات
+        recent_properties = recent["properties"]
         
         return templates.TemplateResponse("index.html", {
             "request": request,
@@ -71,25 +81,44 @@ async def dashboard(request: Request):
 @app.get("/api/properties")
 async def get_properties(
     status: str = None,
+    region: str = None,
+    employee: str = None,
+    start: str = None,
+    end: str = None,
+    order: str = "desc",
     limit: int = 50,
-    offset: int = 0
+    cursor: str = None
 ):
-    """API للحصول على العقارات"""
+    """API للحصول على العقارات (تصفح بالمؤشر next_cursor)"""
     try:
-        # هذا مثال بسيط - يمكن تطويره أكثر
-        properties = await database.get_pending_properties()
-        
-        # فلترة حسب الحالة إذا طُلب ذلك
-        if status:
-            properties = [p for p in properties if p.status.value == status]
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="الترتيب يجب أن يكون asc أو desc")
         
-        # تطبيق التصفح
-        total = len(properties)
-        properties = properties[offset:offset + limit]
+        for value in (start, end):
+            if value:
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="صيغة التاريخ يجب أن تكون YYYY-MM-DD")
+        
+        if cursor:
+            try:
+                DatabaseManager.parse_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        limit = max(1, min(limit, 500))
+        
+        page = await database.query_properties(
+            status=status, region=region, employee=employee,
+            start_date=start, end_date=end, newest_first=order == "desc",
+            limit=limit, cursor=cursor,
+            with_total=not cursor  # العدد الكلي في الصفحة الأولى فقط
+        )
         
         # تحويل إلى قواميس
         properties_dict = []
-        for prop in properties:
+        for prop in page["properties"]:
             prop_dict = prop.to_dict()
             prop_dict["id"] = prop.telegram_message_id
             prop_dict["status"] = prop.status.value
@@ -99,11 +128,13 @@ async def get_properties(
         
         return {
             "properties": properties_dict,
-            "total": total,
+            "total": page.get("total"),
             "limit": limit,
-            "offset": offset
+            "next_cursor": page["next_cursor"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ خطأ في API العقارات: {e}")
         raise HTTPException(status_code=500, detail="خطأ في النظام")
@@ -170,6 +201,19 @@ async def get_system_stats():
         # إضافة معلومات إضافية
         stats["system_status"] = "يعمل" if processor.is_running else "متوقف"
         stats["last_update"] = datetime.now().isoformat()
+        stats["last_cycle_throughput"] = processor.processing_stats["last_cycle_throughput"]
+        stats["last_cycle_fast_path"] = processor.processing_stats["last_cycle_fast_path"]
+        
+        # صحة مزودي الذكاء الاصطناعي (المحفوظة إذا لم يكن المعالج يعمل)
+        if processor.ai_service:
+            stats["ai_providers"] = processor.ai_service.get_provider_health()
+            stats["ai_retries"] = processor.ai_service.get_retry_stats()
+            stats["fast_path"] = processor.ai_service.get_fast_path_stats()
+        else:
+            provider_health = ProviderHealthTracker([], window=config.AI_HEALTH_WINDOW,
+                                                    cooldown=config.AI_CIRCUIT_COOLDOWN)
+            provider_health.load_json(await database.get_setting("ai_provider_health"))
+            stats["ai_providers"] = provider_health.snapshot()
         
         return stats
         
@@ -177,6 +221,31 @@ async def get_system_stats():
         logger.error(f"❌ خطأ في الإحصائيات: {e}")
         raise HTTPException(status_code=500, detail="خطأ في النظام")
 
+@app.get("/api/reports")
+async def get_reports(start: str = None, end: str = None):
+    """تقرير العقارات لنطاق أيام (YYYY-MM-DD) من التقارير المحلية"""
+    try:
+        today = datetime.now().date().isoformat()
+        start = start or today
+        end = end or start
+        
+        try:
+            start_date = datetime.strptime(start, "%Y-%m-%d").date()
+            end_date = datetime.strptime(end, "%Y-%m-%d").date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="صيغة التاريخ يجب أن تكون YYYY-MM-DD")
+        
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="تاريخ البداية بعد تاريخ النهاية")
+        
+        return await database.get_report(start_date.isoformat(), end_date.isoformat())
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ خطأ في التقارير: {e}")
+        raise HTTPException(status_code=500, detail="خطأ في النظام")
+
 @app.post("/api/system/start")
 async def start_system():
     """بدء النظام"""
@@ -296,10 +365,12 @@ async def test_integration_settings():
                 config.NOTION_OWNERS_DB_ID
             )
             # محاولة الاتصال بقاعدة البيانات
-            await asyncio.to_thread(
-                notion_service.client.databases.retrieve,
-                database_id=config.NOTION_PROPERTIES_DB_ID
-            )
+            try:
+                await notion_service.client.databases.retrieve(
+                    database_id=config.NOTION_PROPERTIES_DB_ID
+                )
+            finally:
+                await notion_service.close()
             test_results["notion"] = True
         except Exception as e:
             test_results["errors"].append(f"Notion: {str(e)}")
@@ -379,7 +450,8 @@ async def health_check():
             "timestamp": datetime.now().isoformat(),
             "database": "متصل",
             "processor": processor_status,
-            "total_properties": stats.get("total_properties", 0)
+            "total_properties": stats.get("total_properties", 0),
+            "database_settings": await database.get_pragma_settings()
         }
         
     except Exception as e: